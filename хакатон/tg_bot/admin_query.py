@@ -0,0 +1,104 @@
+import shlex
+import time
+from collections import OrderedDict
+from datetime import date
+
+from rules import SEVERITY_ORDER
+
+SEVERITY_RANK = {level: i for i, level in enumerate(SEVERITY_ORDER)}
+FILTER_KEYS = {'route': 'route', 'aspect': 'aspect', 'severity': 'severity',
+               'from': 'date_from', 'to': 'date_to', 'sort': 'sort'}
+DATE_FILTERS = ('date_from', 'date_to')
+
+
+class QueryCache:
+    """Шағын LRU кэш: жазба `ttl` секунд өмір сүреді және қойма нұсқасы өзгерсе жарамсыз."""
+
+    def __init__(self, maxsize=128, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+
+    def get(self, key, version):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        stored_version, expires, value = item
+        if stored_version != version or expires < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def put(self, key, version, value):
+        self._items[key] = (version, time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+
+class AdminQuery:
+    """/admin беттері: қойманың индекстелген `page` сұрауы + кэш.
+
+    Кэш кілті қойманың `current_version()` мәніне байланған: ол басқа
+    процестердің жазуларын да ескереді (JSONL журналының жаңа жолдары,
+    SQLite `revision`), сондықтан TTL-ды күтпей жарамсыз болады.
+    """
+
+    def __init__(self, store, page_size=5, cache=None):
+        self.store = store
+        self.page_size = page_size
+        self.cache = cache or QueryCache()
+
+    async def page(self, status, filters=None, cursor=None):
+        """(жазбалар, келесі курсор) — filters ішінде sort=severity болса маңыздылық бойынша."""
+        filters = dict(filters or {})
+        rank = SEVERITY_RANK if filters.pop('sort', None) == 'severity' else None
+        key = (status, tuple(sorted(filters.items())), rank is not None, cursor)
+        version = await self.store.current_version()
+        cached = self.cache.get(key, version)
+        if cached is not None:
+            return cached
+        result = await self.store.page(status, filters, rank, parse_cursor(cursor), self.page_size)
+        self.cache.put(key, version, result)
+        return result
+
+    def invalidate(self):
+        self.cache.clear()
+
+
+def parse_filters(text):
+    """`/admin route=12 aspect="Уақытылы келу" severity=Шұғыл from=2025-03-01 to=2025-03-31 sort=severity`
+
+    Күн YYYY-MM-DD болмаса ValueError.
+    """
+    try:
+        parts = shlex.split(text or '')
+    except ValueError:
+        parts = (text or '').split()
+    filters = {}
+    for part in parts[1:]:
+        name, _, value = part.partition('=')
+        if name in FILTER_KEYS and value:
+            filters[FILTER_KEYS[name]] = value.replace('_', ' ')
+    for key in DATE_FILTERS:
+        if key in filters:
+            try:
+                filters[key] = date.fromisoformat(filters[key]).isoformat()
+            except ValueError:
+                raise ValueError(f"Күн форматы қате: {filters[key]} (YYYY-MM-DD керек)") from None
+    return filters
+
+
+def format_cursor(cursor):
+    return '' if cursor is None else f"{cursor[0]}.{-cursor[1]}"
+
+
+def parse_cursor(text):
+    if not text:
+        return None
+    level, _, complaint_id = text.partition('.')
+    return int(level), -int(complaint_id)
@@ -0,0 +1,159 @@
+import json
+import os
+from collections import Counter
+
+from reader import iter_records
+from schema import normalize_record
+from storage import file_lock, read_tail, write_atomic
+
+# Санауыштар: атауы -> жазбадағы өріс
+DIMENSIONS = {
+    'route': 'object',
+    'aspect': 'aspect',
+    'severity': 'severty',
+    'status': 'status',
+}
+
+
+class Aggregates:
+    """Дашбордқа арналған инкременталды санауыштар.
+
+    Шағымдар журналы мен статус оқиғалары журналының соңғы өңделген байт
+    позициясы state-файлда сақталады, сондықтан әр жаңартуда тек жаңа
+    жолдар оқылады. Журнал ықшамдалса (inode ауысса) санауыштар нөлден
+    қайта есептеледі.
+    """
+
+    def __init__(self, db_path, state_path='dashboard_state.json'):
+        self.db_path = db_path
+        self.events_path = os.path.splitext(db_path)[0] + '.events.jsonl'
+        self.lock_path = db_path + '.lock'
+        self.state_path = state_path
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.counters = {name: Counter() for name in DIMENSIONS}
+        self.total = 0
+        self.log_state = (0, None)
+        self.events_state = (0, None)
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        self.counters = {name: Counter(state['counters'].get(name, {})) for name in DIMENSIONS}
+        self.total = state['total']
+        self.log_state = tuple(state['log'])
+        self.events_state = tuple(state['events'])
+
+    def save(self):
+        state = {
+            'counters': {name: dict(c) for name, c in self.counters.items()},
+            'total': self.total,
+            'log': list(self.log_state),
+            'events': list(self.events_state),
+        }
+        write_atomic(self.state_path, [json.dumps(state, ensure_ascii=False)])
+
+    def refresh(self):
+        """Журналдардың жаңа бөлігін өңдеп, өңделген жолдар санын қайтарады."""
+        with file_lock(self.lock_path, exclusive=False):
+            events = read_tail(self.events_path, *self.events_state)
+            pos, ino = self.log_state
+            try:
+                st = os.stat(self.db_path)
+            except FileNotFoundError:
+                st = None
+            if events[3] or (st is not None and ino is not None and (st.st_ino != ino or st.st_size < pos)):
+                self._reset()
+                pos = 0
+                events = read_tail(self.events_path, 0, None)
+            processed = 0
+            # Жаңа жолдар ағынмен оқылады, жады көлемі журнал өлшеміне тәуелсіз
+            for pos, record in iter_records(self.db_path, start=pos, with_offsets=True, events=False):
+                self.add(record)
+                processed += 1
+        for event in events[0]:
+            self.apply_event(event)
+        processed += len(events[0])
+        self.log_state = (pos, st.st_ino if st is not None else None)
+        self.events_state = (events[1], events[2])
+        if processed:
+            self.save()
+        return processed
+
+    def add(self, record):
+        self._count(self._dimensions(record), 1)
+
+    @staticmethod
+    def _dimensions(record):
+        record = normalize_record(record)
+        return tuple(str(record.get(field)) for field in DIMENSIONS.values())
+
+    def _count(self, dimensions, delta):
+        self.total += delta
+        for name, value in zip(DIMENSIONS, dimensions):
+            self.counters[name][value] += delta
+            if self.counters[name][value] <= 0:
+                del self.counters[name][value]
+
+    def apply_event(self, event):
+        prev = event.get('prev', {})
+        for name, field in DIMENSIONS.items():
+            if field in event.get('set', {}) and field in prev:
+                old = str(prev[field])
+                self.counters[name][old] -= 1
+                if self.counters[name][old] <= 0:
+                    del self.counters[name][old]
+                self.counters[name][str(event['set'][field])] += 1
+
+
+class SqliteAggregates(Aggregates):
+    """SQLite қоймасы үшін инкременталды санауыштар.
+
+    Әр жолдың `revision` мәні қосылғанда/өзгергенде өседі (sqlite_store
+    триггерлері), сондықтан әр жаңартуда тек соңғы су белгісінен кейінгі
+    жолдар оқылады. Өзгерген жолдың ескі мәндерін азайту үшін әр шағымның
+    санауыш кілттері жадта сақталады (бірдей кортеждер ортақ).
+    """
+
+    def __init__(self, sqlite_path):
+        self.sqlite_path = sqlite_path
+        self._conn = None
+        self._reset()
+
+    def _reset(self):
+        super()._reset()
+        # revision бағанынан бұрынғы жолдарда 0 тұрады
+        self.revision = -1
+        self._seen = {}
+        self._shared = {}
+
+    def refresh(self):
+        """Соңғы су белгісінен кейін қосылған/өзгерген жолдар санын қайтарады."""
+        from sqlite_store import connect
+
+        if self._conn is None:
+            self._conn = connect(self.sqlite_path)
+        rows = self._conn.execute(
+            "SELECT complaint_id, data, revision FROM complaints WHERE revision > ? ORDER BY revision",
+            (self.revision,),
+        ).fetchall()
+        for complaint_id, data, revision in rows:
+            old = self._seen.get(complaint_id)
+            if old is not None:
+                self._count(old, -1)
+            dimensions = self._dimensions(json.loads(data))
+            dimensions = self._shared.setdefault(dimensions, dimensions)
+            self._seen[complaint_id] = dimensions
+            self._count(dimensions, 1)
+            self.revision = revision
+        return len(rows)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,353 @@
+"""Шағым конвейерінің end-to-end бенчмаркі.
+
+Әр көлем (10k/100k/1M сақталған шағым) бөлек процесте өлшенеді: синтетикалық
+қойма жасалады, бот жалған Bot API мен жалған webhook (Make.com) серверіне
+бағытталады, ComplaintFSM толық сценарийі aiogram Dispatcher арқылы өтеді.
+Өлшенетіндер: шағым тіркеу, /admin тізімі, статус өзгерту және create_visuals
+(суық/жылы) — өткізу қабілеті, p50/p99. Бір реттік сценарийлер (қойма жүктеу,
+create_visuals) `--repeat` рет қайталанып, baseline-мен медианасы салыстырылады.
+
+    python benchmark.py --scales 10000,100000 --save-baseline
+    python benchmark.py --scales 10000,100000          # baseline-мен салыстыру, регрессия болса exit 1
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, 'benchmark_baseline.json')
+ADMIN_ID = 1
+
+TEXTS = {
+    'Уақытылы келу': [
+        "Автобус үнемі кешігеді, аялдамада {m} минут күттік",
+        "{r}-автобус кестеге сай келмейді, жұмысқа кешіктім",
+        "Автобус постоянно опаздывает, ждали {m} минут",
+        "Расписание не соблюдается, автобус {r} не пришёл вовремя",
+    ],
+    'Автобус толымдылығы': [
+        "Автобус толы, адам көп, кіре алмадық",
+        "Күнде таңертең {r} маршрутында ығы-жығы",
+        "Каждый день давка, автобус переполнен",
+        "В час пик невозможно зайти в автобус {r}",
+    ],
+    'Қызметкер әрекеті': [
+        "Кондуктор дөрекі сөйледі",
+        "Жүргізуші есікті ашпай кетіп қалды",
+        "Водитель нагрубил пассажиру",
+        "Водитель разговаривал по телефону всю дорогу",
+    ],
+    'Төлем': [
+        "Терминал картаны оқымайды, төлем өтпеді",
+        "Валидатор не работает, оплата не прошла",
+        "Кондуктор қайтарымды бермеді",
+    ],
+    'Автобус жағдайы': [
+        "Салон лас, орындықтар сынған",
+        "В салоне грязно и холодно",
+        "Кондиционер жұмыс істемейді, іші ыстық",
+    ],
+    'Қауіпсіздік': [
+        "Жүргізуші қауіпті жүргізді, апат болуға сәл қалды",
+        "Водитель гонит на красный светофор, это угроза жизни",
+    ],
+    'Басқа': [
+        "Аялдамада кесте ілінбеген",
+        "Нет информации о маршруте на остановке",
+    ],
+}
+ASPECT_WEIGHTS = {'Уақытылы келу': 35, 'Автобус толымдылығы': 20, 'Қызметкер әрекеті': 15, 'Төлем': 10,
+                  'Автобус жағдайы': 10, 'Қауіпсіздік': 5, 'Басқа': 5}
+STOPS = ['Керуен', 'Астана Балет', 'Бәйтерек', 'Хан Шатыр', 'Назарбаев Университеті', 'Вокзал', 'Сарыарқа']
+
+
+class ComplaintGenerator:
+    """Қазақ/орыс мәтіндері, Zipf-тәрізді маршрут таралуы, 90 күндік тіркелу уақыты."""
+
+    def __init__(self, seed=42, routes=120):
+        self.rng = random.Random(seed)
+        self.routes = [str(r) for r in range(1, routes + 1)]
+        self.route_weights = [1 / r for r in range(1, routes + 1)]
+        self.aspects = list(ASPECT_WEIGHTS)
+        self.aspect_weights = list(ASPECT_WEIGHTS.values())
+
+    def complaint(self):
+        rng = self.rng
+        route = rng.choices(self.routes, self.route_weights)[0]
+        aspect = rng.choices(self.aspects, self.aspect_weights)[0]
+        text = rng.choice(TEXTS[aspect]).format(m=rng.randint(10, 60), r=route)
+        return route, aspect, rng.choice(STOPS), text
+
+    def records(self, n):
+        from rules import analyze_complaint, recommendation_for
+
+        rng = self.rng
+        started = datetime(2025, 1, 1)
+        step = timedelta(days=90) / max(n, 1)
+        statuses = ["✅ Шешілді", "❌ Бас тартылды", "⏳ Қабылданды (Өңделуде)"]
+        for i in range(n):
+            route, aspect, stop, text = self.complaint()
+            filed = started + step * i
+            incident = filed - timedelta(minutes=rng.randint(5, 600))
+            severity, _ = analyze_complaint(text, aspect)
+            yield {
+                'complaint_id': i + 1, 'жалобщик': f"user{i % 50000}", 'user_id': 100000 + i % 50000,
+                'object': f"Маршрут {route}", 'route_number': route,
+                'date_time': incident.strftime('%Y-%m-%d %H:%M'), 'location': f"Аялдама: {stop}",
+                'aspect': aspect, 'description': text, 'severty': severity,
+                'full_complaint': f"Маршрут: {route}. Проблема: {aspect}. Сипаттамасы: {text}",
+                'status': rng.choices(statuses, (60, 10, 30))[0],
+                'recommendation_kz': recommendation_for(aspect), 'timestamp_filed': filed.isoformat(),
+            }
+
+
+def build_dataset(n, seed, cache_dir):
+    path = os.path.join(cache_dir, f"dataset-{n}-{seed}.jsonl")
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for record in ComplaintGenerator(seed).records(n):
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(tmp, path)
+    return path
+
+
+def summarize(latencies, seconds):
+    latencies = sorted(latencies)
+    return {
+        'ops': len(latencies), 'seconds': seconds, 'throughput': len(latencies) / seconds if seconds else 0.0,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.99) - 1)] * 1000,
+    }
+
+
+async def _fake_webhook():
+    from aiohttp import web
+
+    received = []
+
+    async def handle(request):
+        received.append(await request.read())
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_post('/hook', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return f'http://127.0.0.1:{port}/hook', runner, received
+
+
+def summarize_repeats(timings):
+    """Бір реттік сценарийдің қайталаулары: салыстыру медиана (p50) бойынша жүреді."""
+    return {**summarize(timings, sum(timings)), 'repeats': len(timings)}
+
+
+async def run_scale(n, users, admin_ops, seed, dataset, repeat=5):
+    """Бір көлемді өлшеу (бөлек процесте, ағымдағы каталог — уақытша)."""
+    repeat = max(1, repeat)
+    from loadtest import FAKE_TOKEN, FakeTelegramAPI, _callback, _message, synthetic_flow
+
+    api = await FakeTelegramAPI().start()
+    hook_url, hook_runner, received = await _fake_webhook()
+    shutil.copy(dataset, 'complaints_db.jsonl')
+    os.environ.update({
+        'BOT_TOKEN': FAKE_TOKEN, 'ADMIN_CHAT_ID': str(ADMIN_ID), 'TELEGRAM_API_URL': api.url,
+        'WEBHOOK_URL': hook_url, 'FSM_STORAGE': 'memory', 'METRICS_PORT': '0', 'DB_BACKEND': 'jsonl',
+        # Бенчмарк ағынының жіберуі шектелмейді, тек конвейер өлшенеді
+        'NOTIFY_GLOBAL_RATE': '100000', 'NOTIFY_CHAT_RATE': '100000',
+    })
+    import bot as bot_module
+    from aiogram.types import Update
+    from storage import open_store
+
+    bot, dp, store = bot_module.bot, bot_module.dp, bot_module.store
+    results = {}
+    timings = []
+    # Алдыңғы қайталаулар бөлек данамен, соңғысы — боттың өз қоймасы
+    for _ in range(repeat - 1):
+        probe = open_store('complaints_db.jsonl')
+        started = time.perf_counter()
+        await probe.start()
+        timings.append(time.perf_counter() - started)
+        await probe.close()
+    started = time.perf_counter()
+    await store.start()
+    timings.append(time.perf_counter() - started)
+    results['store_load'] = summarize_repeats(timings)
+    await bot_module.webhooks.start()
+    await bot_module.notifier.start()
+
+    async def feed(raw):
+        update = Update.model_validate(raw, context={'bot': bot})
+        t = time.perf_counter()
+        await dp.feed_update(bot, update)
+        return time.perf_counter() - t
+
+    try:
+        # 1. Шағым тіркеу: әр пайдаланушы өз сценарийін ретімен, пайдаланушылар қатар
+        generator = ComplaintGenerator(seed + 1)
+        update_ids = itertools.count(1)
+        flows = []
+        for i in range(users):
+            route, aspect, stop, text = generator.complaint()
+            flows.append(synthetic_flow(200000 + i, update_ids, route, aspect, stop, text))
+        latencies = []
+
+        async def run_flow(flow):
+            t = time.perf_counter()
+            for raw in flow:
+                await feed(raw)
+            latencies.append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        await asyncio.gather(*(run_flow(flow) for flow in flows))
+        results['submission'] = summarize(latencies, time.perf_counter() - t)
+
+        # 2-3. /admin тізімі (сүзгілермен) және статус өзгерту кезектесіп
+        queries = ['/admin', '/admin sort=severity', '/admin route=1', '/admin aspect=Төлем from=2025-02-01',
+                   '/admin severity=Шұғыл sort=severity']
+        listing, changes = [], []
+        pending = [r['complaint_id'] for r in await store.by_status(bot_module.STATUS_NEW, limit=admin_ops)]
+        t_list = t_change = 0.0
+        for i in range(admin_ops):
+            raw = _message(next(update_ids), ADMIN_ID, queries[i % len(queries)])
+            latency = await feed(raw)
+            listing.append(latency)
+            t_list += latency
+            if i < len(pending):
+                action = 'admin_resolve' if i % 2 else 'admin_reject'
+                latency = await feed(_callback(next(update_ids), ADMIN_ID, f"{action}:{pending[i]}"))
+                changes.append(latency)
+                t_change += latency
+        results['admin_listing'] = summarize(listing, t_list)
+        if changes:
+            results['status_change'] = summarize(changes, t_change)
+        await store.close()
+        await bot_module.webhooks.close()
+        await bot_module.notifier.close()
+    finally:
+        await bot.session.close()
+        await api.stop()
+        await hook_runner.cleanup()
+
+    # 4. Дашборд: суық (күй файлы жоқ) және жылы (инкременттік) жаңарту
+    import matplotlib
+    matplotlib.use('Agg')
+    import create_dashboard
+    for name in ('visuals_cold', 'visuals_warm'):
+        timings = []
+        for _ in range(repeat):
+            if name == 'visuals_cold' and os.path.exists('dashboard_state.json'):
+                os.remove('dashboard_state.json')
+            t = time.perf_counter()
+            await asyncio.to_thread(create_dashboard.create_visuals)
+            timings.append(time.perf_counter() - t)
+        results[name] = summarize_repeats(timings)
+    results['webhook_posts'] = {'ops': len(received)}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Регрессиялар тізімі: өткізу қабілеті төмендесе немесе p99 өссе (tolerance үлесінен көп)."""
+    regressions = []
+    for scale, scenarios in results.items():
+        for name, current in scenarios.items():
+            base = baseline.get(scale, {}).get(name)
+            if not base or 'p99_ms' not in base:
+                continue
+            if 'repeats' in current:
+                # Бір реттік сценарий: өткізу/p99 бір өлшеуге тең, тек медиана тұрақты
+                if current['p50_ms'] > base['p50_ms'] * (1 + tolerance):
+                    regressions.append(f"{scale}/{name}: медиана {current['p50_ms']:.1f} мс > "
+                                       f"{base['p50_ms']:.1f} мс")
+                continue
+            if current['throughput'] < base['throughput'] * (1 - tolerance):
+                regressions.append(f"{scale}/{name}: өткізу {current['throughput']:.1f} < {base['throughput']:.1f}")
+            if current['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+                regressions.append(f"{scale}/{name}: p99 {current['p99_ms']:.1f} мс > {base['p99_ms']:.1f} мс")
+    return regressions
+
+
+def _child(args):
+    os.chdir(tempfile.mkdtemp(prefix=f'bench-{args.child}-'))
+    dataset = build_dataset(args.child, args.seed, args.data_dir)
+    results = asyncio.run(run_scale(args.child, args.users, args.admin_ops, args.seed, dataset, args.repeat))
+    print('BENCHMARK_RESULT ' + json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Шағым конвейерінің бенчмаркі")
+    parser.add_argument('--scales', default='10000,100000,1000000')
+    parser.add_argument('--users', type=int, default=200, help="Қатар тіркелетін шағымдар саны")
+    parser.add_argument('--admin-ops', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'complaints-benchmark'))
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--repeat', type=int, default=5, help="Бір реттік сценарийлердің қайталану саны")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+    args.data_dir = os.path.abspath(args.data_dir)
+    if args.child:
+        sys.path.insert(0, HERE)
+        _child(args)
+        return
+
+    results = {}
+    for scale in [int(s) for s in args.scales.split(',') if s]:
+        print(f"--- {scale:,} шағым ---", flush=True)
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', str(scale), '--users', str(args.users),
+             '--admin-ops', str(args.admin_ops), '--seed', str(args.seed), '--data-dir', args.data_dir,
+             '--repeat', str(args.repeat)],
+            capture_output=True, text=True,
+        )
+        line = next((l for l in proc.stdout.splitlines() if l.startswith('BENCHMARK_RESULT ')), None)
+        if proc.returncode or line is None:
+            print(proc.stderr[-3000:])
+            sys.exit(f"{scale} көлемінде бенчмарк сәтсіз аяқталды.")
+        results[str(scale)] = json.loads(line.split(' ', 1)[1])
+        for name, r in results[str(scale)].items():
+            if 'p99_ms' in r:
+                print(f"  {name:15} {r['ops']:6} оп  {r['throughput']:10.1f} оп/с  "
+                      f"p50 {r['p50_ms']:9.2f} мс  p99 {r['p99_ms']:9.2f} мс", flush=True)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"Baseline сақталды: '{args.baseline}'")
+        return
+    if not os.path.exists(args.baseline):
+        print("Baseline жоқ — салыстыру өткізілді (--save-baseline).")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"РЕГРЕССИЯ: {regression}")
+    if regressions:
+        sys.exit(1)
+    print("Регрессия жоқ.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,7 @@
 import asyncio
+import html
 import logging
 import re
-import json
-import aiohttp
 import os
 from datetime import datetime, timedelta, timezone
 from aiogram import Bot, Dispatcher, F, types
@@ -14,8 +13,22 @@ from aiogram.types import (
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.client.bot import Bot, DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from dotenv import load_dotenv
 
+from admin_query import AdminQuery, format_cursor, parse_filters
+from dedup import DedupIndex
+from evidence import EvidenceArchive, extract_media, link_evidence, media_batches, send_single
+from fsm_storage import create_storage, shared_across_processes
+from ids import new_complaint_id
+from metrics import instrument, register_component, setup_middleware, start_metrics_server
+from notifier import Notifier
+from rules import analyze_complaint, recommendation_for
+from storage import open_store
+from webhook_queue import WebhookDispatcher
+from webhook_server import UpdateWorkerPool, consume, create_app, run_processes, serve
+
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
@@ -23,6 +36,19 @@ ADMIN_CHAT_ID = int(os.getenv("ADMIN_CHAT_ID"))
 DB_FILE = 'complaints_db.jsonl'
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
 VIDEO_GUIDE_FILE_ID = os.getenv("VIDEO_GUIDE_FILE_ID", "СІЗДІҢ_ВИДЕО_FILE_ID_ОСЫНДА") 
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+BOT_WEBHOOK_BASE = os.getenv("BOT_WEBHOOK_BASE")
+BOT_WEBHOOK_PATH = os.getenv("BOT_WEBHOOK_PATH", "/telegram")
+BOT_WEBHOOK_SECRET = os.getenv("BOT_WEBHOOK_SECRET")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+WEBHOOK_PROCESSES = int(os.getenv("WEBHOOK_PROCESSES", "1"))
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "16"))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "32"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+EVIDENCE_ARCHIVE = os.getenv("EVIDENCE_ARCHIVE", "0") == "1"
 
 STATUS_NEW = "⏳ Қабылданды (Өңделуде)"
 STATUS_RESOLVED = "✅ Шешілді"
@@ -30,28 +56,36 @@ STATUS_REJECTED = "❌ Бас тартылды"
 
 logging.basicConfig(level=logging.INFO)
 
-bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-dp = Dispatcher()
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+bot = Bot(token=BOT_TOKEN, session=session, default=DefaultBotProperties(parse_mode="HTML"))
+dp = Dispatcher(storage=create_storage())
+store = open_store(DB_FILE)
+webhooks = WebhookDispatcher(WEBHOOK_URL, batch_size=int(os.getenv("WEBHOOK_BATCH_SIZE", "1")))
+# Telegram шегі бүкіл бот үшін ортақ: webhook процестері оны тең бөліседі
+BOT_PROCESSES = WEBHOOK_PROCESSES if BOT_MODE == "webhook" else 1
+notifier = Notifier(bot, global_rate=float(os.getenv("NOTIFY_GLOBAL_RATE", "25")) / BOT_PROCESSES,
+                    chat_rate=float(os.getenv("NOTIFY_CHAT_RATE", "1")))
+admin_query = AdminQuery(store, page_size=int(os.getenv("ADMIN_PAGE_SIZE", "5")))
+duplicates = DedupIndex(window=int(os.getenv("DEDUP_WINDOW", str(2 * 3600))),
+                        threshold=float(os.getenv("DEDUP_THRESHOLD", "0.5")))
+DEDUP_SYNC_LIMIT = int(os.getenv("DEDUP_SYNC_LIMIT", "500"))
+archive = EvidenceArchive(bot, root=os.getenv("EVIDENCE_DIR", "evidence_store"),
+                          concurrency=int(os.getenv("EVIDENCE_WORKERS", "3")),
+                          quota_bytes=int(os.getenv("EVIDENCE_QUOTA_MB", "1024")) << 20)
+
+setup_middleware(dp)
+instrument(store, 'store', ['append', 'update', 'get', 'page', 'count', 'by_status', 'all_records'])
+instrument(webhooks, 'webhook', ['_deliver'])
+instrument(notifier, 'notify', ['_deliver'])
+register_component('webhook', webhooks.metrics)
+register_component('notifier', notifier.metrics)
+if EVIDENCE_ARCHIVE:
+    register_component('evidence', archive.metrics)
 
 ASPECT_KEYWORDS = {
     'Қызметкер әрекеті': [], 'Уақытылы келу': [], 'Автобус толымдылығы': [],
     'Автобус жағдайы': [], 'Қауіпсіздік': [], 'Төлем': [], 'Басқа': []
 }
-RECOMMENDATIONS_DB = {
-    'Қызметкер әрекеті': 'Персоналмен (жүргізушілермен/кондукторлармен) мотивациялық және түсіндіру жұмыстарын күшейту.',
-    'Уақытылы келу': 'Осы маршруттағы автобустар санын көбейту немесе кестені қайта қарастыру.',
-    'Автобус толымдылығы': 'Пик сағаттарында маршрутқа қосымша, сыйымдылығы жоғары автобустарды қосу.',
-    'Автобус жағдайы': 'Автобус паркінің санитарлық және техникалық жағдайын дереу тексеру.',
-    'Қауіпсіздік': 'Жүргізушілерге қауіпсіз жүргізу бойынша қосымша нұсқаулық өткізу.',
-    'Төлем': 'Төлем терминалдарының жұмысын тексеріп, ақауларды жою.',
-    'Басқа': 'Жағдайды нақтылау үшін қосымша тексеру жүргізу.'
-}
-def get_priority(text, aspekt):
-    text_lower = str(text).lower()
-    if any(kw in text_lower for kw in ['апат', 'қауіпті', 'денсаулыққа', 'угроза']): return 'Шұғыл'
-    if any(kw in text_lower for kw in ['үнемі', 'жиі', 'күнде', 'постоянно', 'всегда']): return 'Жоғары'
-    if aspekt not in ['Басқа', 'Уақытылы келу']: return 'Орташа'
-    return 'Төмен'
 
 class ComplaintFSM(StatesGroup):
     waiting_for_route = State()
@@ -94,38 +128,6 @@ def get_time_keyboard():
     )
     return builder
 
-def read_db():
-    try:
-        with open(DB_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            return [json.loads(line) for line in lines]
-    except FileNotFoundError:
-        return []
-
-def write_db(complaints):
-    try:
-        with open(DB_FILE, 'w', encoding='utf-8') as f:
-            for complaint in complaints:
-                f.write(json.dumps(complaint, ensure_ascii=False) + '\n')
-    except Exception as e:
-        logging.error(f"DB жазу қатесі (write_db): {e}")
-
-async def send_to_webhook(data: dict):
-    if not WEBHOOK_URL:
-        logging.warning("WEBHOOK_URL .env файлында орнатылмаған. Webhook жіберілмеді.")
-        return
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(WEBHOOK_URL, json=data) as response:
-                if response.status == 200:
-                    logging.info(f"Webhook-қа сәтті жіберілді (ID: {data.get('complaint_id')})")
-                else:
-                    logging.warning(f"Webhook қатесі: {response.status} - {await response.text()}")
-    except aiohttp.ClientError as e:
-        logging.error(f"Webhook-қа қосылу қатесі: {e}")
-    except Exception as e:
-        logging.error(f"Webhook-та күтпеген қате: {e}")
-
 @dp.message(CommandStart(), StateFilter("*"))
 async def send_welcome(message: Message, state: FSMContext):
     await state.clear()
@@ -137,40 +139,166 @@ async def send_welcome(message: Message, state: FSMContext):
         reply_markup=get_start_keyboard()
     )
 
+def format_filters(filters):
+    names = {'route': 'маршрут', 'aspect': 'аспект', 'severity': 'маңыздылық',
+             'date_from': 'бастап', 'date_to': 'дейін', 'sort': 'сұрыптау'}
+    return ", ".join(f"{names[k]}: {html.escape(str(v))}" for k, v in filters.items()) or "жоқ"
+
+ADMIN_USAGE = ("Сүзу: /admin route=12 aspect=Уақытылы_келу severity=Шұғыл "
+               "from=2025-01-01 to=2025-01-31 sort=severity")
+
+async def render_admin_page(filters, cursor=None):
+    complaints, next_cursor = await admin_query.page(STATUS_NEW, filters, cursor)
+    if not complaints:
+        if cursor:
+            # Беттегі соңғы шағым өңделді: алдыңғы беттерде әлі шағым болуы мүмкін
+            back = [[InlineKeyboardButton(text="⏮ Басына", callback_data="admin_page:")]]
+            return "Бұл бетте өңделуде тұрған шағым қалмады.", InlineKeyboardMarkup(inline_keyboard=back)
+        return "Бұл сүзгілер бойынша өңделуде тұрған шағым жоқ.", None
+    lines = [f"<b>--- 🛡️ БАСҚАРУ ПАНЕЛІ ---</b>\n<b>Сүзгілер:</b> {format_filters(filters)}\n"]
+    buttons = []
+    for i, complaint in enumerate(complaints, 1):
+        field = lambda name, default=None: html.escape(str(complaint.get(name, default)))
+        user = html.escape(str(complaint.get('жалобщик', f"ID: {complaint['user_id']}")))
+        text = (
+            f"<b>{i}.</b> <code>#{complaint['complaint_id']}</code> - <b>{user}</b>\n"
+            f"<b>Шағым:</b> {field('object')} - {field('aspect')}\n"
+            f"<b>Оқиға:</b> {field('date_time', 'N/A')}\n"
+            f"<b>Орны:</b> {field('location', 'Белгісіз')}\n"
+            f"<b>Маңыздылығы:</b> {field('severty')}\n"
+            f"<b>Сипаттамасы:</b> <i>«{html.escape(str(complaint.get('description'))[:300])}»</i>"
+        )
+        if complaint.get('duplicate_of'):
+            text += f"\n<b>⚠️ Қайталануы мүмкін:</b> <code>#{complaint['duplicate_of']}</code>"
+        if complaint.get('evidence'):
+            text += (f"\n<b>📎 Дәлелдеме:</b> {len(complaint['evidence'])} файл "
+                     f"(/evidence {complaint['complaint_id']})")
+        lines.append(text)
+        buttons.append([
+            InlineKeyboardButton(text=f"✅ {i}", callback_data=f"admin_resolve:{complaint['complaint_id']}"),
+            InlineKeyboardButton(text=f"❌ {i}", callback_data=f"admin_reject:{complaint['complaint_id']}")
+        ])
+    navigation = []
+    if cursor:
+        navigation.append(InlineKeyboardButton(text="⏮ Басына", callback_data="admin_page:"))
+    if next_cursor is not None:
+        navigation.append(InlineKeyboardButton(text="Келесі ▶", callback_data=f"admin_page:{format_cursor(next_cursor)}"))
+    if navigation:
+        buttons.append(navigation)
+    return "\n\n".join(lines), InlineKeyboardMarkup(inline_keyboard=buttons)
+
 @dp.message(Command(commands=["admin"]), StateFilter("*"))
 async def admin_panel(message: Message, state: FSMContext):
     if message.from_user.id != ADMIN_CHAT_ID:
         await message.reply("❌ Сізде бұл командаға рұқсат жоқ.")
         return
         
-    all_complaints = read_db()
-    new_complaints = [c for c in all_complaints if c.get('status') == STATUS_NEW]
-    if not new_complaints:
+    new_count = await store.count(STATUS_NEW)
+    if not new_count:
         await message.reply("👍 Барлық шағымдар өңделген. Жаңа шағымдар жоқ.")
         return
     
-    await message.reply(f"<b>--- 🛡️ БАСҚАРУ ПАНЕЛІ ---</b>\n"
-                        f"Өңделуде тұрған <b>{len(new_complaints)}</b> шағым бар:")
+    try:
+        filters = parse_filters(message.text)
+    except ValueError as e:
+        await message.reply(f"❌ {html.escape(str(e))}\n<i>{ADMIN_USAGE}</i>")
+        return
+    await state.update_data(admin_filters=filters, admin_cursor=None)
+    await message.reply(f"Өңделуде тұрған <b>{new_count}</b> шағым бар.\n<i>{ADMIN_USAGE}</i>")
+    text, keyboard = await render_admin_page(filters)
+    await message.answer(text, reply_markup=keyboard)
 
-    for complaint in reversed(new_complaints[-5:]):
-        user = complaint.get('жалобщик', f"ID: {complaint['user_id']}")
-        
-        text = (
-            f"<b>ID:</b> <code>#{complaint['complaint_id']}</code> - <b>{user}</b>\n"
-            f"<b>Шағым:</b> {complaint.get('object')} - {complaint.get('aspect')}\n"
-            f"<b>Оқиға:</b> {complaint.get('date_time', 'N/A')}\n"
-            f"<b>Орны:</b> {complaint.get('location', 'Белгісіз')}\n"
-            f"<b>Маңыздылығы:</b> {complaint.get('severty')}\n"
-            f"<b>Сипаттамасы:</b> <i>«{complaint.get('description')}»</i>"
-        )
-        
-        admin_kb = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="✅ Шешілді", callback_data=f"admin_resolve:{complaint['complaint_id']}"),
-                InlineKeyboardButton(text="❌ Бас тарту", callback_data=f"admin_reject:{complaint['complaint_id']}")
-            ]
-        ])
-        await message.answer(text, reply_markup=admin_kb)
+@dp.callback_query(F.data.startswith("admin_page:"))
+async def admin_page_callback(callback: CallbackQuery, state: FSMContext):
+    if callback.from_user.id != ADMIN_CHAT_ID:
+        await callback.answer("❌ Рұқсат жоқ!", show_alert=True)
+        return
+    cursor = callback.data.split(":", 1)[1] or None
+    filters = (await state.get_data()).get('admin_filters', {})
+    await state.update_data(admin_cursor=cursor)
+    text, keyboard = await render_admin_page(filters, cursor)
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
+
+@dp.message(Command(commands=["evidence"]), StateFilter("*"))
+async def send_evidence(message: Message, state: FSMContext):
+    if message.from_user.id != ADMIN_CHAT_ID:
+        await message.reply("❌ Сізде бұл командаға рұқсат жоқ.")
+        return
+    args = message.text.split()[1:]
+    if not args or not args[0].lstrip('#').isdigit():
+        await message.reply("Қолданылуы: <code>/evidence &lt;шағым ID&gt;</code>")
+        return
+    complaint_id = int(args[0].lstrip('#'))
+    complaint = await store.get(complaint_id)
+    if complaint is None:
+        await message.reply(f"❌ Шағым #{complaint_id} табылмады.")
+        return
+    evidence = complaint.get('evidence') or []
+    if not evidence:
+        await message.reply(f"Шағым #{complaint_id} үшін дәлелдеме жоқ.")
+        return
+    batches, singles = media_batches(evidence)
+    chat_id = message.chat.id
+    # Бір шақыруда 2-10 файл (send_media_group); жалғыз файл мен дауыстық хабарлама өз әдісімен
+    for batch in batches:
+        notifier.submit(chat_id, lambda batch=batch: bot.send_media_group(chat_id=chat_id, media=batch))
+    for item in singles:
+        notifier.submit(chat_id, lambda item=item: send_single(bot, chat_id, item))
+    text = (f"📎 Шағым #{complaint_id}: <b>{len(evidence)}</b> дәлелдеме "
+            f"({len(batches) + len(singles)} хабарламамен жіберілуде).")
+    if EVIDENCE_ARCHIVE:
+        archived = sum(1 for item in evidence if archive.lookup(item['file_unique_id']))
+        text += f"\nЖергілікті мұрағатта: {archived}."
+    await message.reply(text)
+
+def status_push_text(complaint_ids, new_status):
+    ids = ", ".join(f"#{cid}" for cid in complaint_ids)
+    return (
+        f"🔔 <b>Статус Жаңартуы</b> 🔔\n\n"
+        f"Сіздің <b>{ids}</b> ID-нөмірлі шағымыңыз бойынша жаңа статус:\n\n"
+        f"<b>{new_status}</b>\n\n<i>Көмегіңізге рахмет!</i>"
+    )
+
+@dp.message(Command(commands=["resolve_all", "reject_all"]), StateFilter("*"))
+async def bulk_status(message: Message, state: FSMContext):
+    if message.from_user.id != ADMIN_CHAT_ID:
+        await message.reply("❌ Сізде бұл командаға рұқсат жоқ.")
+        return
+    try:
+        filters = parse_filters(message.text)
+    except ValueError as e:
+        await message.reply(f"❌ {html.escape(str(e))}\n<i>{ADMIN_USAGE}</i>")
+        return
+    filters.pop('sort', None)
+    if not filters:
+        await message.reply("Кемінде бір сүзгі керек. Мысалы: <i>/resolve_all route=12</i>")
+        return
+    new_status = STATUS_RESOLVED if message.text.startswith("/resolve_all") else STATUS_REJECTED
+
+    targets, cursor = [], None
+    while True:
+        page, cursor = await store.page(STATUS_NEW, filters, None, cursor, 500)
+        targets += page
+        if cursor is None:
+            break
+    # Қоймаға бір уақытта BULK_CONCURRENCY жаңартудан артық жіберілмейді
+    updated = []
+    for i in range(0, len(targets), BULK_CONCURRENCY):
+        chunk = targets[i:i + BULK_CONCURRENCY]
+        updated += await asyncio.gather(*(store.update_status(c['complaint_id'], new_status) for c in chunk))
+    admin_query.invalidate()
+
+    # Бір пайдаланушыға бір хабарлама, барлық шағым ID-лерімен
+    by_user = {}
+    for complaint in updated:
+        if complaint:
+            by_user.setdefault(complaint['user_id'], []).append(complaint['complaint_id'])
+    for user_id, complaint_ids in by_user.items():
+        notifier.send_message(user_id, status_push_text(complaint_ids, new_status))
+    changed = sum(len(complaint_ids) for complaint_ids in by_user.values())
+    await message.reply(f"<b>{changed}</b> шағым '{new_status}' деп өзгертілді "
+                        f"({format_filters(filters)}), {len(by_user)} пайдаланушыға хабарлама кезекке қойылды.")
 
 @dp.message(Command(commands=["help"]), StateFilter("*"))
 async def send_help(message: Message, state: FSMContext):
@@ -303,8 +431,8 @@ async def handle_description_and_finalize(message: Message, state: FSMContext):
     location = data.get('location', 'Белгісіз')
     description = message.text
     
-    severity = get_priority(description, aspect) 
-    complaint_id = int(datetime.now().timestamp())
+    severity, suggested_aspect = analyze_complaint(description, aspect)
+    complaint_id = new_complaint_id()
     date_time_combined = f"{incident_date} {incident_time}"
     full_complaint_text = (
         f"Маршрут: {route}. Проблема: {aspect}. \n"
@@ -326,13 +454,25 @@ async def handle_description_and_finalize(message: Message, state: FSMContext):
         'severty': severity,
         'full_complaint': full_complaint_text,
         'status': STATUS_NEW,
-        'recommendation_kz': RECOMMENDATIONS_DB.get(aspect, RECOMMENDATIONS_DB['Басқа']),
+        'recommendation_kz': recommendation_for(aspect),
         'timestamp_filed': datetime.now().isoformat()
     }
+    if BOT_PROCESSES > 1:
+        # Индекс әр процестің жадында: басқа процестер тіркеген соңғы жаңа шағымдар ортақ қоймадан алынады
+        duplicates.sync(await store.by_status(STATUS_NEW, limit=DEDUP_SYNC_LIMIT))
+    match = duplicates.find(result)
+    if match is not None:
+        result['duplicate_of'] = match[0]
     
-    write_db(read_db() + [result])
-    await send_to_webhook(result)
+    await store.append(result)
+    duplicates.add(result)
+    await webhooks.enqueue(result)
         
+    suggestion_line = ""
+    if suggested_aspect and suggested_aspect != aspect:
+        suggestion_line = f"<b>- Ұсынылған санат:</b> {suggested_aspect}\n"
+    if match is not None:
+        suggestion_line += f"<b>- Ескерту:</b> бұл оқиға бойынша #{match[0]} шағым бұрын тіркелген\n"
     response_text = (
         f"<b>✅ Шағымыңыз (ID: #{complaint_id}) қабылданды!</b>\n\n"
         f"<b>Сіздің деректеріңіз:</b>\n"
@@ -342,7 +482,8 @@ async def handle_description_and_finalize(message: Message, state: FSMContext):
         f"<b>- Проблема:</b> {aspect}\n\n"
         f"<b>Талдау нәтижесі:</b>\n"
         f"<b>- Статус:</b> {STATUS_NEW}\n"
-        f"<b>- Маңыздылығы:</b> {severity}\n\n"
+        f"<b>- Маңыздылығы:</b> {severity}\n"
+        f"{suggestion_line}\n"
         f"--- \n"
         f"Енді осы шағымға <b>дәлелдеме (фото/видео/дауыс)</b> қоса аласыз ба?"
     )
@@ -375,18 +516,36 @@ async def handle_media(message: Message, state: FSMContext):
         await message.reply("❌ Қате пайда болды. /start деп қайта бастаңыз.")
         await state.clear()
         return
-    try:
-        caption = (f"⚠️ <b>Жаңа Дәлелдеме</b> ⚠️\n\n<b>Шағым ID:</b> <code>#{complaint_id}</code>\n"
-                   f"<b>Пайдаланушы:</b> @{message.from_user.username} (ID: <code>{message.from_user.id}</code>)")
-        await message.copy_to(chat_id=ADMIN_CHAT_ID, caption=caption)
-        await message.reply(
-            f"✅ Дәлелдемеңіз <b>(Шағым #{complaint_id} үшін)</b> қабылданды.\n\n"
-            "Тағы да дәлелдеме қосасыз ба, әлде шағымды аяқтайсыз ба?",
-            reply_markup=get_action_keyboard()
-        )
-    except Exception as e:
-        logging.error(f"Медиа жіберу қатесі: {e}")
-        await message.reply("❌ Кешірініз, файлды админге жіберу кезінде қате пайда болды.")
+    item = extract_media(message)
+    complaint, added = await link_evidence(store, complaint_id, item)
+    if complaint is None:
+        await message.reply("❌ Қате пайда болды. /start деп қайта бастаңыз.")
+        await state.clear()
+        return
+    if not added:
+        await message.reply("ℹ️ Бұл файл осы шағымға бұрын қосылған.", reply_markup=get_action_keyboard())
+        return
+    admin_query.invalidate()
+    if EVIDENCE_ARCHIVE:
+        archive.submit(complaint_id, item)
+    caption = (f"⚠️ <b>Жаңа Дәлелдеме</b> ⚠️\n\n<b>Шағым ID:</b> <code>#{complaint_id}</code>\n"
+               f"<b>Пайдаланушы:</b> @{message.from_user.username} (ID: <code>{message.from_user.id}</code>)")
+    # Админ чатына жылдамдық шегімен, фондық режимде көшіріледі; сәтсіз болса пайдаланушыға хабарланады
+    copied = notifier.copy_message(message, ADMIN_CHAT_ID, caption=caption)
+    copied.add_done_callback(lambda future: report_copy_failure(message.chat.id, complaint_id, future))
+    await message.reply(
+        f"✅ Дәлелдемеңіз <b>(Шағым #{complaint_id} үшін)</b> қабылданды.\n\n"
+        "Тағы да дәлелдеме қосасыз ба, әлде шағымды аяқтайсыз ба?",
+        reply_markup=get_action_keyboard()
+    )
+
+def report_copy_failure(chat_id, complaint_id, future):
+    if future.cancelled() or future.exception() is None:
+        return
+    error = future.exception()
+    logging.error(f"Медиа жіберу қатесі (#{complaint_id}): {error}")
+    notifier.send_message(chat_id, f"❌ Кешіріңіз, шағым #{complaint_id} файлын админге жіберу кезінде қате "
+                                   f"пайда болды. Файлды қайта жіберіп көріңіз.")
 
 @dp.message(ComplaintFSM.waiting_for_action)
 async def wrong_input_at_action_stage(message: Message, state: FSMContext):
@@ -421,7 +580,7 @@ async def wrong_input_at_action_stage(message: Message, state: FSMContext):
     )
 
 @dp.callback_query(F.data.startswith("admin_resolve:") | F.data.startswith("admin_reject:"))
-async def handle_admin_action(callback: CallbackQuery):
+async def handle_admin_action(callback: CallbackQuery, state: FSMContext):
     if callback.from_user.id != ADMIN_CHAT_ID:
         await callback.answer("❌ Рұқсат жоқ!", show_alert=True)
         return
@@ -429,37 +588,40 @@ async def handle_admin_action(callback: CallbackQuery):
     complaint_id = int(complaint_id_str)
     new_status = STATUS_RESOLVED if action == "admin_resolve" else STATUS_REJECTED
     
-    all_complaints = read_db()
-    target_complaint = None
-    for i, complaint in enumerate(all_complaints):
-        if complaint.get('complaint_id') == complaint_id:
-            all_complaints[i]['status'] = new_status
-            target_complaint = all_complaints[i]
-            break
-            
+    target_complaint = await store.update_status(complaint_id, new_status)
+    admin_query.invalidate()
     if not target_complaint:
         await callback.answer(f"❌ Қате: Шағым #{complaint_id} табылмады.", show_alert=True)
         return
-        
-    write_db(all_complaints) 
     
-    try:
-        user_id_to_notify = target_complaint['user_id']
-        push_message = (
-            f"🔔 <b>Статус Жаңартуы</b> 🔔\n\n"
-            f"Сіздің <b>#{complaint_id}</b> ID-нөмірлі шағымыңыз бойынша жаңа статус:\n\n"
-            f"<b>{new_status}</b>\n\n<i>Көмегіңізге рахмет!</i>"
-        )
-        await bot.send_message(chat_id=user_id_to_notify, text=push_message)
-    except Exception as e:
-        logging.error(f"ПУШ жіберу қатесі (ID: {user_id_to_notify}): {e}")
+    notifier.send_message(target_complaint['user_id'], status_push_text([complaint_id], new_status))
     
-    await callback.message.edit_text(
-        callback.message.text + f"\n\n<b>--- ADMIN: Статус орнатылды: {new_status} ---</b>"
-    )
+    data = await state.get_data()
+    if 'admin_filters' in data:
+        # Бет қайта сызылады: өңделген шағым тізімнен шығады
+        text, keyboard = await render_admin_page(data['admin_filters'], data.get('admin_cursor'))
+        await callback.message.edit_text(text, reply_markup=keyboard)
+    else:
+        await callback.message.edit_text(
+            callback.message.text + f"\n\n<b>--- ADMIN: Статус орнатылды: {new_status} ---</b>"
+        )
     await callback.answer(f"Статус #{complaint_id} үшін '{new_status}' деп өзгертілді!")
 
-async def main():
+async def register_webhook(close_session=False):
+    if not BOT_WEBHOOK_BASE:
+        logging.warning("ЕСКЕРТУ: 'BOT_WEBHOOK_BASE' орнатылмаған, Telegram-да webhook тіркелмеді.")
+        return
+    try:
+        await bot.set_webhook(
+            f"{BOT_WEBHOOK_BASE}{BOT_WEBHOOK_PATH}", secret_token=BOT_WEBHOOK_SECRET,
+            max_connections=min(100, UPDATE_WORKERS * WEBHOOK_PROCESSES), drop_pending_updates=False
+        )
+        logging.info(f"Webhook тіркелді: {BOT_WEBHOOK_BASE}{BOT_WEBHOOK_PATH}")
+    finally:
+        if close_session:
+            await bot.session.close()
+
+async def main(with_registration=True, metrics_port=METRICS_PORT, updates=None):
     if not ADMIN_CHAT_ID:
         logging.critical("ҚАТЕ: 'ADMIN_CHAT_ID' .env файлында орнатылмаған.")
         return
@@ -470,10 +632,70 @@ async def main():
         logging.warning("ЕСКЕРТУ: 'WEBHOOK_URL' .env файлында орнатылмаған. Make.com интеграциясы істемейді.")
     
     logging.info("Бот іске қосылуда (Таза нұсқа: Тек Аялдама)...")
-    await dp.start_polling(bot)
+    await store.start()
+    await webhooks.start()
+    await notifier.start()
+    if EVIDENCE_ARCHIVE:
+        await archive.start()
+    # METRICS_PORT=0 болса /metrics сервері іске қосылмайды
+    stop_metrics = await start_metrics_server(METRICS_HOST, metrics_port) if metrics_port else None
+    logging.info(f"Қайталану индексі: {duplicates.warm(await store.all_records())} соңғы шағым жүктелді.")
+    try:
+        if updates is not None:
+            # Бала процесс: update-тер ата-ана процестен чат бойынша бөлініп келеді
+            pool = UpdateWorkerPool(dp, bot, UPDATE_WORKERS)
+            register_component('updates', lambda: {'queue_depth': pool.depth(), 'processed': pool.processed})
+            pool.start()
+            try:
+                await consume(updates, pool, bot)
+            finally:
+                await pool.stop()
+        elif BOT_MODE == "webhook":
+            if with_registration:
+                await register_webhook()
+            app = create_app(dp, bot, BOT_WEBHOOK_PATH, BOT_WEBHOOK_SECRET, UPDATE_WORKERS)
+            pool = app['pool']
+            register_component('updates', lambda: {'queue_depth': pool.depth(), 'processed': pool.processed})
+            await serve(app, WEBAPP_HOST, WEBAPP_PORT)
+        else:
+            # Сессияны start_polling емес, төмендегі finally жабады: notifier кезегі алдымен босатылуы керек
+            await dp.start_polling(bot, close_bot_session=False)
+    finally:
+        if stop_metrics is not None:
+            await stop_metrics()
+        await notifier.close()
+        if EVIDENCE_ARCHIVE:
+            await archive.close()
+        await webhooks.close()
+        await store.close()
+        if BOT_MODE == "webhook":
+            # Polling режимінде FSM-ді start_polling өзі (shutdown) жабады
+            await dp.fsm.close()
+        await bot.session.close()
+
+def run_worker(index, updates):
+    # Әр процесске жеке ID-генератор worker-і (WORKER_ID + index немесе құлыппен алынған) және жеке outbox
+    if os.getenv("WORKER_ID") is not None:
+        os.environ["WORKER_ID"] = str(int(os.environ["WORKER_ID"]) + index)
+    webhooks.outbox_path = f"webhook_outbox.{index}.jsonl"
+    try:
+        asyncio.run(main(with_registration=False, metrics_port=METRICS_PORT and METRICS_PORT + index,
+                         updates=updates))
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if BOT_MODE == "webhook" and WEBHOOK_PROCESSES > 1:
+            if not shared_across_processes():
+                # Әйтпесе әр процесс шағым шеберінің күйін өз жадында ұстайды
+                logging.critical("ҚАТЕ: WEBHOOK_PROCESSES > 1 үшін FSM_STORAGE=sqlite немесе redis "
+                                 "және FSM_FLUSH_INTERVAL=0 қажет.")
+                raise SystemExit(1)
+            asyncio.run(register_webhook(close_session=True))
+            run_processes(run_worker, WEBHOOK_PROCESSES, WEBAPP_HOST, WEBAPP_PORT,
+                          BOT_WEBHOOK_PATH, BOT_WEBHOOK_SECRET)
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logging.info("Бот тоқтатылды.")
\ No newline at end of file
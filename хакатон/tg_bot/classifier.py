@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+KEYWORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keywords.json')
+
+# Қазақ тіліндегі түбір соңындағы дауыссыздың алмасуы: денсаулық -> денсаулығы
+VOICING = {'қ': 'ғ', 'к': 'г', 'п': 'б'}
+
+
+class KeywordClassifier:
+    """Маңыздылық пен аспектіні бір өтуде анықтайтын сөздік классификатор.
+
+    keywords.json ішіндегі барлық түбірлер (қазақ/орыс) бір regex-ке
+    біріктіріледі: әр түбір сөздің басынан сәйкес келеді және кез келген
+    жалғауды қабылдайды (`\\bтүбір\\w*`), сондықтан «кешікті», «кешігеді»,
+    «опаздывает» сияқты түрлер бөлек жазылмайды; соңғы қ/к/п дауыссызының
+    ұяңдауы (ғ/г/б) да ескеріледі. `=` белгісімен аяқталған сөз
+    («сбил=») тек толық сөз ретінде сәйкес келеді — қысқа түбір бөгде
+    сөздерді ұстайтын жерде. Файл өзгерсе, келесі шақыруда автоматты түрде
+    қайта жүктеледі; pattern мен сөздік бір кортежбен ауыстырылады.
+    """
+
+    def __init__(self, path=KEYWORDS_FILE, reload_interval=2.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self._load()
+
+    def classify(self, text):
+        """(маңыздылық немесе None, ұсынылған аспект немесе None) қайтарады."""
+        self._maybe_reload()
+        pattern, terms, severity_rank = self._compiled
+        best = None
+        aspects = Counter()
+        for stem in pattern.findall(str(text).lower()):
+            if ' ' in stem or '\n' in stem or '\t' in stem:
+                stem = ' '.join(stem.split())
+            for kind, label in terms[stem]:
+                if kind == 'severity':
+                    if best is None or severity_rank[label] < severity_rank[best]:
+                        best = label
+                else:
+                    aspects[label] += 1
+        aspect = aspects.most_common(1)[0][0] if aspects else None
+        return best, aspect
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            try:
+                self._load()
+                logging.info(f"Кілт сөздер қайта жүктелді: '{self.path}'.")
+            except (ValueError, re.error) as e:
+                logging.error(f"Кілт сөздер файлы қате, ескі сөздік қалды: {e}")
+                self._mtime = mtime
+
+    def _load(self):
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            terms, exact = {}, set()
+
+            def add(keyword, category):
+                term = keyword.lower()
+                if term.endswith('='):
+                    term = term[:-1]
+                    exact.add(term)
+                terms.setdefault(term, []).append(category)
+
+            for rank, level in enumerate(config.get('severity', [])):
+                for keyword in level['keywords']:
+                    add(keyword, ('severity', level['level']))
+            for aspect, keywords in config.get('aspects', {}).items():
+                for keyword in keywords:
+                    add(keyword, ('aspect', aspect))
+            for term in list(terms):
+                if term[-1] in VOICING and term not in exact:
+                    terms.setdefault(term[:-1] + VOICING[term[-1]], []).extend(terms[term])
+            # Ұзынырақ түбір қысқасының санаттарын да алады (қауіпті ⊃ қауіп)
+            for term in terms:
+                for other in terms:
+                    if other != term and other not in exact and term.startswith(other):
+                        terms[term] = terms[term] + [c for c in terms[other] if c not in terms[term]]
+            # Ұзын түбірлер бірінші: «адам көп» «адам»-нан бұрын тексеріледі
+            parts = [r'\s+'.join(re.escape(word) for word in term.split()) + (r'(?!\w)' if term in exact else '')
+                     for term in sorted(terms, key=len, reverse=True)]
+            pattern = re.compile(r'\b(' + '|'.join(parts) + r')\w*' if parts else r'(?!x)x')
+            severity_rank = {level['level']: rank for rank, level in enumerate(config.get('severity', []))}
+            self._compiled = (pattern, terms, severity_rank)
+            self._mtime = mtime
+
+
+_default = None
+
+
+def classify(text):
+    global _default
+    if _default is None:
+        _default = KeywordClassifier()
+    return _default.classify(text)
+
+
+SAMPLES = [
+    ("Жүргізуші қауіпті жүргізді, апат болуға сәл қалды", 'Шұғыл', 'Қауіпсіздік'),
+    ("Водитель гонит на красный светофор, это угроза жизни", 'Шұғыл', 'Қауіпсіздік'),
+    ("Автобус үнемі кешігеді, аялдамада 40 минут күттік", 'Жоғары', 'Уақытылы келу'),
+    ("Автобус постоянно опаздывает, расписание не соблюдается", 'Жоғары', 'Уақытылы келу'),
+    ("Кондуктор дөрекі сөйледі", None, 'Қызметкер әрекеті'),
+    ("Водитель нагрубил пассажиру", None, 'Қызметкер әрекеті'),
+    ("Терминал картаны оқымайды, төлем өтпеді", None, 'Төлем'),
+    ("Валидатор не работает, оплата не прошла", None, 'Төлем'),
+    ("Автобус толы, адам көп, кіре алмадық", None, 'Автобус толымдылығы'),
+    ("Каждый день давка, автобус переполнен", 'Жоғары', 'Автобус толымдылығы'),
+    ("Салон лас, орындықтар сынған", None, 'Автобус жағдайы'),
+    ("В салоне грязно и холодно", None, 'Автобус жағдайы'),
+    ("Жүргізуші есікті ашпай кетіп қалды", None, 'Қызметкер әрекеті'),
+    ("Жолаушы құлап, денсаулығына зиян келді", 'Шұғыл', None),
+]
+
+
+def _legacy_priority(text):
+    text_lower = str(text).lower()
+    if any(kw in text_lower for kw in ['апат', 'қауіпті', 'денсаулыққа', 'угроза']): return 'Шұғыл'
+    if any(kw in text_lower for kw in ['үнемі', 'жиі', 'күнде', 'постоянно', 'всегда']): return 'Жоғары'
+    return None
+
+
+if __name__ == "__main__":
+    clf = KeywordClassifier()
+    severity_ok = aspect_ok = legacy_ok = 0
+    for text, severity, aspect in SAMPLES:
+        got_severity, got_aspect = clf.classify(text)
+        severity_ok += got_severity == severity
+        aspect_ok += got_aspect == aspect
+        legacy_ok += _legacy_priority(text) == severity
+        if (got_severity, got_aspect) != (severity, aspect):
+            print(f"  ✗ «{text}»: {got_severity}/{got_aspect} (күтілген {severity}/{aspect})")
+    n = len(SAMPLES)
+    print(f"Маңыздылық дәлдігі: {severity_ok}/{n} (бұрынғы get_priority: {legacy_ok}/{n})")
+    print(f"Аспект дәлдігі: {aspect_ok}/{n}")
+
+    texts = [text for text, _, _ in SAMPLES] * 2000
+    started = time.perf_counter()
+    for text in texts:
+        clf.classify(text)
+    elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    for text in texts:
+        _legacy_priority(text)
+    legacy_elapsed = time.perf_counter() - started
+    print(f"Классификатор: {len(texts) / elapsed:,.0f} мәтін/с ({elapsed / len(texts) * 1e6:.1f} мкс), "
+          f"бұрынғы тек-маңыздылық сканер: {len(texts) / legacy_elapsed:,.0f} мәтін/с")
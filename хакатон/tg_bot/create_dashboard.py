@@ -1,59 +1,94 @@
+import io
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from aggregates import Aggregates, SqliteAggregates
+from timeseries import create_timeseries_visuals
+
+matplotlib.rcParams['font.sans-serif'] = ['DejaVu Sans']
 
 DB_FILE = 'complaints_db.jsonl' # Бот сақтайтын файл
 
-def create_visuals():
-    print("Дашбордты жаңарту басталды...")
+
+def load_aggregates():
+    if os.getenv("DB_BACKEND", "jsonl") == "jsonl":
+        # Тек соңғы жаңартудан кейінгі жаңа жолдар өңделеді
+        aggregates = Aggregates(DB_FILE)
+        new_rows = aggregates.refresh()
+        print(f"Жаңа өңделген жолдар: {new_rows}")
+        return aggregates
+    # SQLite: барлық жазбаларды жадқа жүктемей, санауыштар тікелей кестеден есептеледі
+    aggregates = SqliteAggregates(os.getenv("SQLITE_FILE", os.path.splitext(DB_FILE)[0] + '.sqlite3'))
     try:
-        # JSONL файлын оқу
-        analysis_df = pd.read_json(DB_FILE, lines=True)
-        # Кортежді қалыпқа келтіру
-        analysis_df = pd.concat([analysis_df.drop(['tuple'], axis=1), 
-                                 analysis_df['tuple'].apply(pd.Series)], axis=1)
-    except ValueError:
-        print(f"'{DB_FILE}' файлы бос немесе деректер жоқ.")
-        return
-    except FileNotFoundError:
-        print(f"'{DB_FILE}' файлы табылмады. Алдымен бот арқылы шағым жіберіңіз.")
-        return
+        aggregates.refresh()
+    finally:
+        aggregates.close()
+    return aggregates
 
-    # --- 3. Визуализация (Суреттерді сақтау) ---
-    plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
-    plt.figure(figsize=(10, 6))
 
+def _plot_routes(ax, aggregates):
     # 1. Ең проблемалық маршруттар
-    routes_counts = analysis_df['Объект'].value_counts().nlargest(10)
-    routes_counts.plot(kind='bar', color='skyblue')
-    plt.title('Ең проблемалық маршруттар')
-    plt.ylabel('Шағымдар саны')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.savefig('dashboard_routes.png')
-    print("График 'dashboard_routes.png' сақталды.")
-    plt.clf()
+    routes_counts = pd.Series(aggregates.counters['route'], dtype='int64').nlargest(10)
+    routes_counts.plot(kind='bar', color='skyblue', ax=ax)
+    ax.set_title('Ең проблемалық маршруттар')
+    ax.set_ylabel('Шағымдар саны')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+
 
+def _plot_priority(ax, aggregates):
     # 2. Шағым деңгейлері
-    priority_counts = analysis_df['priority'].value_counts()
-    priority_counts.plot(kind='pie', autopct='%1.1f%%', labels=priority_counts.index)
-    plt.title('Шағымдарды деңгейі бойынша бөлу')
-    plt.ylabel('')
-    plt.tight_layout()
-    plt.savefig('dashboard_priority.png')
-    print("График 'dashboard_priority.png' сақталды.")
-    plt.clf()
+    priority_counts = pd.Series(aggregates.counters['severity'], dtype='int64').sort_values(ascending=False)
+    priority_counts.plot(kind='pie', autopct='%1.1f%%', labels=priority_counts.index, ax=ax)
+    ax.set_title('Шағымдарды деңгейі бойынша бөлу')
+    ax.set_ylabel('')
 
+
+def _plot_aspects(ax, aggregates):
     # 3. Аспектілер жиілігі
-    aspect_counts = analysis_df['Аспект'].value_counts()
-    aspect_counts.plot(kind='bar', color='lightgreen')
-    plt.title('Шағым аспектілерінің жиілігі')
-    plt.ylabel('Шағымдар саны')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.savefig('dashboard_aspects.png')
-    print("График 'dashboard_aspects.png' сақталды.")
+    aspect_counts = pd.Series(aggregates.counters['aspect'], dtype='int64').sort_values(ascending=False)
+    aspect_counts.plot(kind='bar', color='lightgreen', ax=ax)
+    ax.set_title('Шағым аспектілерінің жиілігі')
+    ax.set_ylabel('Шағымдар саны')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+
+
+CHARTS = {'routes': _plot_routes, 'priority': _plot_priority, 'aspects': _plot_aspects}
+
+
+def chart_png(name, aggregates):
+    """Бір графиктің PNG байттары (pyplot күйінсіз, ағындарда қауіпсіз)."""
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    CHARTS[name](figure.add_subplot(), aggregates)
+    figure.tight_layout()
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def create_visuals():
+    print("Дашбордты жаңарту басталды...")
+    aggregates = load_aggregates()
+    if not aggregates.total:
+        print(f"'{DB_FILE}' файлы бос немесе деректер жоқ. Алдымен бот арқылы шағым жіберіңіз.")
+        return
+
+    # --- 3. Визуализация (Суреттерді сақтау) ---
+    for name in CHARTS:
+        path = f'dashboard_{name}.png'
+        with open(path, 'wb') as f:
+            f.write(chart_png(name, aggregates))
+        print(f"График '{path}' сақталды.")
 
     print("\nЖаңарту аяқталды! 'dashboard_*.png' файлдарын Tilda-ға жүктеңіз.")
 
 if __name__ == "__main__":
-    create_visuals()
\ No newline at end of file
+    create_visuals()
+    create_timeseries_visuals(DB_FILE)
\ No newline at end of file
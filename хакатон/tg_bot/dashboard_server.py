@@ -0,0 +1,207 @@
+"""Тірі дашборд сервері.
+
+    python dashboard_server.py --port 8090
+
+    /                   — графиктер мен сандар, жаңа шағым келгенде өздігінен жаңарады
+    /api/summary        — санауыштар JSON (JS графиктер кітапханасы үшін)
+    /charts/<атауы>.png — routes, priority, aspects
+    /events             — Server-Sent Events: санауыштар өзгерген сайын summary
+
+Санауыштар aggregates.Aggregates арқылы инкременттік жаңарады (тек журналдың
+жаңа жолдары, SQLite қоймасында — `revision` су белгісінен кейін өзгерген
+жолдар). Графиктер санауыштардың мазмұн хэші өзгергенде ғана қайта сызылады;
+хэш ETag ретінде беріледі, сондықтан браузер/CDN 304 алады.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from aiohttp import web
+
+from aggregates import Aggregates, SqliteAggregates
+from create_dashboard import CHARTS, DB_FILE, chart_png
+
+PAGE = """<!doctype html>
+<html lang="kk"><head><meta charset="utf-8"><title>Шағымдар дашборды</title>
+<style>body{font-family:sans-serif;margin:2em}img{max-width:48%;margin:.5em}</style></head>
+<body><h1>Шағымдар дашборды</h1><p>Барлығы: <b id="total">…</b></p>
+<div>%IMAGES%</div>
+<script>
+const source = new EventSource('events');
+source.onmessage = (e) => {
+  const summary = JSON.parse(e.data);
+  document.getElementById('total').textContent = summary.total;
+  document.querySelectorAll('img[data-chart]').forEach((img) => {
+    img.src = 'charts/' + img.dataset.chart + '.png?v=' + summary.etag;
+  });
+};
+</script></body></html>
+"""
+
+
+class Dashboard:
+    """Санауыштарды фондық режимде жаңартып, графиктерді хэш бойынша кэштейді."""
+
+    def __init__(self, db_path=DB_FILE, interval=2.0):
+        self.db_path = db_path
+        self.interval = interval
+        self.aggregates = None
+        self.snapshot = None
+        self.summary = None
+        self.etag = None
+        self._charts = {}
+        self._rendering = {}
+        self._changed = None
+        self._task = None
+        # matplotlib бір ағында: Figure API-і бір уақытта бір сурет
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dashboard-render')
+
+    async def start(self):
+        self._changed = asyncio.Condition()
+        await self.refresh()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if isinstance(self.aggregates, SqliteAggregates):
+            self.aggregates.close()
+        self._executor.shutdown()
+
+    async def refresh(self):
+        if self.aggregates is None:
+            if os.getenv("DB_BACKEND", "jsonl") == "jsonl":
+                self.aggregates = Aggregates(self.db_path)
+            else:
+                self.aggregates = SqliteAggregates(
+                    os.getenv("SQLITE_FILE", os.path.splitext(self.db_path)[0] + '.sqlite3'))
+        if not await asyncio.to_thread(self.aggregates.refresh) and self.etag is not None:
+            return False
+        summary = {
+            'total': self.aggregates.total,
+            'routes': dict(self.aggregates.counters['route'].most_common(10)),
+            **{name: dict(self.aggregates.counters[name]) for name in ('severity', 'aspect', 'status')},
+        }
+        etag = hashlib.sha1(json.dumps(summary, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
+        if etag == self.etag:
+            return False
+        # Графиктер өзгермейтін көшірмеден сызылады: келесі refresh санауыштарды ағында өзгертеді
+        self.snapshot = SimpleNamespace(total=self.aggregates.total,
+                                        counters={k: Counter(v) for k, v in self.aggregates.counters.items()})
+        self.summary, self.etag = summary, etag
+        self._charts.clear()
+        async with self._changed:
+            self._changed.notify_all()
+        return True
+
+    async def chart(self, name):
+        """(PNG байттары, etag); бір хэш үшін график бір рет қана сызылады."""
+        etag = self.etag
+        cached = self._charts.get(name)
+        if cached is not None and cached[1] == etag:
+            return cached
+        key = (name, etag)
+        if key not in self._rendering:
+            loop = asyncio.get_running_loop()
+            self._rendering[key] = loop.run_in_executor(self._executor, chart_png, name, self.snapshot)
+        try:
+            png = await self._rendering[key]
+        finally:
+            self._rendering.pop(key, None)
+        if etag == self.etag:
+            self._charts[name] = (png, etag)
+        return png, etag
+
+    async def wait_changed(self, etag):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.etag != etag)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"Дашборд жаңарту қатесі: {e}")
+
+
+def _not_modified(request, etag):
+    return request.headers.get('If-None-Match', '').strip('"W/ ') == etag
+
+
+def create_dashboard_app(dashboard: Dashboard):
+    async def index(request):
+        images = ''.join(f'<img data-chart="{name}" src="charts/{name}.png" alt="{name}">' for name in CHARTS)
+        return web.Response(text=PAGE.replace('%IMAGES%', images), content_type='text/html')
+
+    async def summary(request):
+        etag = dashboard.etag
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+        if _not_modified(request, etag):
+            return web.Response(status=304, headers=headers)
+        return web.json_response({**dashboard.summary, 'etag': etag}, headers=headers,
+                                 dumps=lambda d: json.dumps(d, ensure_ascii=False))
+
+    async def chart(request):
+        name = request.match_info['name']
+        if name not in CHARTS:
+            raise web.HTTPNotFound()
+        if _not_modified(request, dashboard.etag):
+            return web.Response(status=304, headers={'ETag': f'"{dashboard.etag}"'})
+        png, etag = await dashboard.chart(name)
+        return web.Response(body=png, content_type='image/png',
+                            headers={'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+
+    async def events(request):
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+        etag = None
+        try:
+            while True:
+                if dashboard.etag == etag:
+                    try:
+                        await asyncio.wait_for(dashboard.wait_changed(etag), 15)
+                    except asyncio.TimeoutError:
+                        # Прокси байланысты үзбеуі үшін
+                        await response.write(b': keep-alive\n\n')
+                        continue
+                etag = dashboard.etag
+                data = json.dumps({**dashboard.summary, 'etag': etag}, ensure_ascii=False)
+                await response.write(f"data: {data}\n\n".encode())
+        except ConnectionError:
+            # Браузер бетті жапты (reset, broken pipe, жабылып жатқан транспорт);
+            # CancelledError (сервер тоқтауы) әрі қарай өтеді
+            pass
+        return response
+
+    async def on_startup(app):
+        await dashboard.start()
+
+    async def on_cleanup(app):
+        await dashboard.stop()
+
+    app = web.Application()
+    app.router.add_get('/', index)
+    app.router.add_get('/api/summary', summary)
+    app.router.add_get('/charts/{name}.png', chart)
+    app.router.add_get('/events', events)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Тірі дашборд сервері")
+    parser.add_argument('--host', default=os.getenv("DASHBOARD_HOST", "127.0.0.1"))
+    parser.add_argument('--port', type=int, default=int(os.getenv("DASHBOARD_PORT", "8090")))
+    parser.add_argument('--interval', type=float, default=2.0, help="Журналды тексеру аралығы (секунд)")
+    args = parser.parse_args()
+    web.run_app(create_dashboard_app(Dashboard(interval=args.interval)), host=args.host, port=args.port)
@@ -0,0 +1,215 @@
+"""Қайталанған және бір-біріне өте ұқсас шағымдарды анықтау.
+
+Бір оқиғаны (маршрут, аялдама, уақыт) бірнеше рет тіркеген шағымдар
+`duplicate_of` өрісімен алғашқы шағымға байланады. Іздеу екі деңгейлі:
+(маршрут, аялдама, оқиға уақыты терезесі) кілті бойынша себет, себет
+ішінде `description` мәтінінің MinHash қолтаңбасы бойынша LSH жолақтары.
+
+    python dedup.py            # тарихтағы қайталануларды көрсету
+    python dedup.py --apply    # ... және `duplicate_of` өрісін жазу
+"""
+import argparse
+import asyncio
+import logging
+import re
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from timeseries import INCIDENT_FORMATS
+
+_PRIME = (1 << 32) + 15
+_WORD = re.compile(r'\w+')
+
+
+def _incident_ts(record):
+    text = str(record.get('date_time', '')).strip()[:16]
+    for fmt in INCIDENT_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    # Уақыты түсініксіз болса тіркелу уақыты алынады
+    try:
+        return datetime.fromisoformat(str(record.get('timestamp_filed'))).timestamp()
+    except ValueError:
+        return None
+
+
+def _location_key(location):
+    return ' '.join(_WORD.findall(str(location or '').lower().replace('аялдама', '')))
+
+
+class DedupIndex:
+    """Жадтағы инкременттік қайталану индексі.
+
+    `window` секундтан алшақ емес, бір маршрут пен аялдамадағы және
+    сипаттамасының Жаккар ұқсастығы `threshold`-тан кем емес шағым
+    қайталану болып саналады. `retention` секундтан ескі оқиғалар
+    индекстен шығарылады, сондықтан жады шектеулі.
+    """
+
+    def __init__(self, window=2 * 3600, threshold=0.5, num_perm=64, bands=16, retention=3 * 24 * 3600):
+        self.window = window
+        self.threshold = threshold
+        self.bands = bands
+        self.retention = retention
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        self._buckets = {}
+        self._entries = {}
+        self._order = deque()
+        self._latest = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def signature(self, text):
+        words = _WORD.findall(str(text or '').lower())
+        joined = ' '.join(words)
+        # Сөз және 3-әріпті шинглдер: жалғау/қате жазу ұқсастықты бұзбайды
+        shingles = set(words) | {joined[i:i + 3] for i in range(max(len(joined) - 2, 0))}
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+    def find(self, record):
+        """(алғашқы complaint_id, ұқсастық) немесе None."""
+        prepared = self._prepare(record)
+        if prepared is None:
+            return None
+        return self._find(*prepared)
+
+    def add(self, record):
+        """Жазбаны индекске қосу (қоймаға сәтті жазылғаннан кейін); find() нәтижесін қайтарады."""
+        prepared = self._prepare(record)
+        if prepared is None:
+            return None
+        place, ts, signature = prepared
+        match = self._find(place, ts, signature)
+        complaint_id = record['complaint_id']
+        self._remove(complaint_id)
+        self._entries[complaint_id] = (place, ts, signature)
+        self._order.append((ts, complaint_id))
+        for key in self._keys(place, ts, signature):
+            self._buckets.setdefault(key, []).append(complaint_id)
+        # Болашақ күн (қате енгізілген) бүкіл индексті ескіртіп жібермеуі үшін қазіргі уақытпен шектеледі
+        self._latest = max(self._latest, min(ts, time.time()))
+        self._expire()
+        return match
+
+    def warm(self, records):
+        """Іске қосылғанда соңғы `retention` кезеңіндегі шағымдарды жүктеу."""
+        self.sync(records)
+        return len(self)
+
+    def sync(self, records):
+        """Индексте жоқ, `retention` кезеңіндегі шағымдарды қосу; қосылғандар санын қайтарады.
+
+        Индекс процесс жадында: бірнеше процесс бір қойманы бөліссе, басқа
+        процестер тіркеген шағымдар осы арқылы ортақ қоймадан қосылады.
+        """
+        since = time.time() - self.retention
+        recent = [r for r in records
+                  if r['complaint_id'] not in self._entries and (_incident_ts(r) or 0) >= since]
+        for record in sorted(recent, key=lambda r: (_incident_ts(r), r['complaint_id'])):
+            self.add(record)
+        return len(recent)
+
+    def _prepare(self, record):
+        ts = _incident_ts(record)
+        signature = self.signature(record.get('description'))
+        if ts is None or signature is None:
+            return None
+        return (str(record.get('route_number')), _location_key(record.get('location'))), ts, signature
+
+    def _keys(self, place, ts, signature, slots=None):
+        raw = signature.tobytes()
+        width = len(raw) // self.bands
+        bands = [raw[i:i + width] for i in range(0, width * self.bands, width)]
+        return [(place, slot, band, rows) for slot in (slots or (int(ts // self.window),))
+                for band, rows in enumerate(bands)]
+
+    def _find(self, place, ts, signature):
+        slot = int(ts // self.window)
+        candidates = set()
+        for key in self._keys(place, ts, signature, (slot - 1, slot, slot + 1)):
+            candidates.update(self._buckets.get(key, ()))
+        best = None
+        for complaint_id in candidates:
+            entry = self._entries.get(complaint_id)
+            if entry is None or abs(entry[1] - ts) > self.window:
+                continue
+            similarity = float((entry[2] == signature).mean())
+            if similarity >= self.threshold and (best is None or (similarity, -complaint_id) > (best[1], -best[0])):
+                best = (complaint_id, similarity)
+        return best
+
+    def _expire(self):
+        while self._order and self._order[0][0] < self._latest - self.retention:
+            ts, complaint_id = self._order.popleft()
+            entry = self._entries.get(complaint_id)
+            # Қайта қосылған ID: ескі кезек жазбасы жаңа енгізуді өшірмейді
+            if entry is not None and entry[1] == ts:
+                self._remove(complaint_id)
+
+    def _remove(self, complaint_id):
+        entry = self._entries.pop(complaint_id, None)
+        if entry is None:
+            return
+        place, ts, signature = entry
+        for key in self._keys(place, ts, signature):
+            ids = self._buckets.get(key)
+            if ids is not None and complaint_id in ids:
+                ids.remove(complaint_id)
+                if not ids:
+                    del self._buckets[key]
+
+
+def find_duplicates(records, index=None):
+    """Тарихтағы қайталанулар: {complaint_id: (алғашқы complaint_id, ұқсастық)}.
+
+    Жазбалар оқиға уақыты бойынша өтеді; тізбек болса (C ~ B ~ A) бәрі A-ға байланады.
+    """
+    index = index or DedupIndex(retention=float('inf'))
+    duplicates = {}
+    for record in sorted(records, key=lambda r: (_incident_ts(r) or 0, r['complaint_id'])):
+        match = index.add(record)
+        if match is not None:
+            original, similarity = match
+            duplicates[record['complaint_id']] = (duplicates.get(original, (original,))[0], similarity)
+    return duplicates
+
+
+async def dedup_store(apply=False):
+    from storage import open_store
+
+    store = open_store('complaints_db.jsonl')
+    await store.start()
+    try:
+        records = await store.all_records()
+        duplicates = find_duplicates(records)
+        changed = 0
+        for complaint_id, (original, similarity) in duplicates.items():
+            logging.info(f"#{complaint_id} -> #{original} (ұқсастық {similarity:.2f})")
+            record = await store.get(complaint_id)
+            if apply and record.get('duplicate_of') != original:
+                await store.update(complaint_id, duplicate_of=original)
+                changed += 1
+        logging.info(f"{len(records)} шағым: {len(duplicates)} қайталану табылды, {changed} жазба жаңартылды.")
+        return duplicates
+    finally:
+        await store.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Тарихтағы қайталанған шағымдарды табу")
+    parser.add_argument('--apply', action='store_true', help="`duplicate_of` өрісін қоймаға жазу")
+    args = parser.parse_args()
+    asyncio.run(dedup_store(args.apply))
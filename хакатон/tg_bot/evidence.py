@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import threading
+from datetime import datetime
+
+from aiogram import Bot
+from aiogram.types import InputMediaAudio, InputMediaDocument, InputMediaPhoto, InputMediaVideo, Message
+
+MEDIA_GROUP = {'photo': InputMediaPhoto, 'video': InputMediaVideo, 'audio': InputMediaAudio,
+               'document': InputMediaDocument}
+# Telegram медиа тобында фото мен видео араласа алады, аудио/құжат тек өз түрімен
+GROUP_KIND = {'photo': 'visual', 'video': 'visual', 'audio': 'audio', 'document': 'document'}
+DEFAULT_EXT = {'photo': '.jpg', 'video': '.mp4', 'voice': '.ogg', 'audio': '.mp3', 'document': ''}
+# Топқа сыймаған жалғыз файл: (Bot әдісі, параметр атауы)
+SEND_SINGLE = {'photo': ('send_photo', 'photo'), 'video': ('send_video', 'video'), 'voice': ('send_voice', 'voice'),
+               'audio': ('send_audio', 'audio'), 'document': ('send_document', 'document')}
+
+# Альбом бірнеше хабарлама болып қатар келеді: бір шағымның evidence тізімін кезекпен жаңарту.
+# complaint_id -> [құлып, оны күтіп/ұстап тұрған корутиналар саны]
+_locks = {}
+
+
+def extract_media(message: Message):
+    """Хабарламадағы дәлелдеме сипаттамасы немесе None."""
+    if message.photo:
+        media, kind = message.photo[-1], 'photo'
+    elif message.video:
+        media, kind = message.video, 'video'
+    elif message.voice:
+        media, kind = message.voice, 'voice'
+    elif message.audio:
+        media, kind = message.audio, 'audio'
+    elif message.document:
+        media, kind = message.document, 'document'
+    else:
+        return None
+    return {
+        'kind': kind, 'file_id': media.file_id, 'file_unique_id': media.file_unique_id,
+        'file_size': media.file_size, 'mime_type': getattr(media, 'mime_type', None),
+        'file_name': getattr(media, 'file_name', None), 'ts': datetime.now().isoformat(),
+    }
+
+
+async def link_evidence(store, complaint_id, item):
+    """Дәлелдемені шағымның `evidence` тізіміне қосу.
+
+    Бір file_unique_id бір шағымға бір рет қана жазылады: (жазба, қосылды ма).
+    """
+    entry = _locks.setdefault(complaint_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            record = await store.get(complaint_id)
+            if record is None:
+                return None, False
+            evidence = record.get('evidence') or []
+            if any(e.get('file_unique_id') == item['file_unique_id'] for e in evidence):
+                return record, False
+            record = await store.update(complaint_id, evidence=evidence + [item])
+            return record, True
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            _locks.pop(complaint_id, None)
+
+
+def media_batches(evidence):
+    """Шағымның барлық дәлелдемесін send_media_group топтарына (2-10) және жеке файлдарға бөлу.
+
+    Telegram медиа тобы кемінде 2 файл талап етеді, сондықтан жалғыз қалған
+    файл (және дауыстық хабарлама) singles тізіміне түседі.
+    """
+    groups, singles = {}, []
+    for item in evidence:
+        group = GROUP_KIND.get(item['kind'])
+        if group is None:
+            singles.append(item)
+        else:
+            groups.setdefault(group, []).append(item)
+    batches = []
+    for items in groups.values():
+        chunks = [items[i:i + 10] for i in range(0, len(items), 10)]
+        # 11 файл 10 + 1 емес, 9 + 2 болып бөлінеді
+        if len(chunks) > 1 and len(chunks[-1]) == 1:
+            chunks[-2:] = [chunks[-2][:-1], chunks[-2][-1:] + chunks[-1]]
+        for chunk in chunks:
+            if len(chunk) == 1:
+                singles.append(chunk[0])
+            else:
+                batches.append([MEDIA_GROUP[item['kind']](media=item['file_id']) for item in chunk])
+    return batches, singles
+
+
+def send_single(bot: Bot, chat_id, item):
+    """Жалғыз дәлелдемені түріне сай әдіспен жіберу (корутина)."""
+    method, field = SEND_SINGLE[item['kind']]
+    return getattr(bot, method)(chat_id=chat_id, **{field: item['file_id']})
+
+
+class EvidenceArchive:
+    """Дәлелдемелерді фондық режимде жергілікті, мазмұн бойынша адрестелген қоймаға жүктеу.
+
+    Файл `root/ab/cd/<sha256><ext>` жолына бір рет қана жазылады, сондықтан
+    бірдей файлдар (әр түрлі file_unique_id болса да) орынды қайталап алмайды.
+    `index.jsonl` file_unique_id -> sha256 сәйкестігін сақтайды. Бір уақытта
+    `concurrency` жүктеу, жалпы көлем `quota_bytes`-тан аспайды.
+    """
+
+    def __init__(self, bot: Bot, root='evidence_store', concurrency=3, quota_bytes=1 << 30,
+                 max_file_bytes=20 << 20, queue_size=1000):
+        self.bot = bot
+        self.root = root
+        self.concurrency = concurrency
+        self.quota_bytes = quota_bytes
+        self.max_file_bytes = max_file_bytes
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self.stats = {'archived': 0, 'deduplicated': 0, 'skipped_quota': 0, 'failed': 0}
+        self.used_bytes = 0
+        self._index = {}
+        # sha256 -> сақталған файл жолы (кеңейтімі алғашқы жүктеудікі)
+        self._paths = {}
+        # Бірдей мазмұнды файлдар қатар жүктелсе, бір sha256 жолына бір-ақ жазу
+        self._write_lock = threading.Lock()
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks = []
+
+    async def start(self):
+        if self._tasks:
+            return
+        await asyncio.to_thread(self._load_index)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def close(self, drain_timeout=10.0):
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Дәлелдеме мұрағаты кезегі толық босамады ({self._queue.qsize()}).")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, complaint_id, item):
+        if item['file_unique_id'] in self._index:
+            self.stats['deduplicated'] += 1
+            return
+        try:
+            self._queue.put_nowait((complaint_id, item))
+        except asyncio.QueueFull:
+            logging.warning(f"Дәлелдеме мұрағаты кезегі толы, #{complaint_id} файлы жүктелмеді.")
+
+    def lookup(self, file_unique_id):
+        return self._index.get(file_unique_id)
+
+    def metrics(self):
+        return {**self.stats, 'queue_depth': self._queue.qsize(), 'used_bytes': self.used_bytes}
+
+    def _load_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._index[entry['file_unique_id']] = entry
+                    if entry['sha256'] not in self._paths:
+                        self._paths[entry['sha256']] = entry['path']
+                        self.used_bytes += entry['size']
+        except FileNotFoundError:
+            pass
+
+    async def _worker(self):
+        while True:
+            complaint_id, item = await self._queue.get()
+            try:
+                await self._archive(complaint_id, item)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logging.error(f"Дәлелдемені мұрағаттау қатесі (#{complaint_id}): {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _archive(self, complaint_id, item):
+        if item['file_unique_id'] in self._index:
+            self.stats['deduplicated'] += 1
+            return
+        size = item.get('file_size') or 0
+        if size > self.max_file_bytes or self.used_bytes + size > self.quota_bytes:
+            self.stats['skipped_quota'] += 1
+            logging.warning(f"#{complaint_id} дәлелдемесі квотаға сыймайды ({size} байт), жүктелмеді.")
+            return
+        buffer = io.BytesIO()
+        await self.bot.download(item['file_id'], destination=buffer)
+        data = buffer.getvalue()
+        entry = await asyncio.to_thread(self._store, complaint_id, item, data)
+        if entry is not None:
+            self._index[item['file_unique_id']] = entry
+
+    def _store(self, complaint_id, item, data):
+        with self._write_lock:
+            return self._store_locked(complaint_id, item, data)
+
+    def _store_locked(self, complaint_id, item, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._paths.get(digest)
+        if path is not None:
+            self.stats['deduplicated'] += 1
+        elif self.used_bytes + len(data) > self.quota_bytes:
+            self.stats['skipped_quota'] += 1
+            logging.warning(f"#{complaint_id} дәлелдемесі квотаға сыймайды ({len(data)} байт), жүктелмеді.")
+            return None
+        else:
+            ext = (os.path.splitext(item.get('file_name') or '')[1]
+                   or mimetypes.guess_extension(item.get('mime_type') or '') or DEFAULT_EXT[item['kind']])
+            path = os.path.join(self.root, digest[:2], digest[2:4], digest + ext)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            self._paths[digest] = path
+            self.used_bytes += len(data)
+            self.stats['archived'] += 1
+        entry = {'file_unique_id': item['file_unique_id'], 'complaint_id': complaint_id, 'sha256': digest,
+                 'size': len(data), 'path': path, 'ts': datetime.now().isoformat()}
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
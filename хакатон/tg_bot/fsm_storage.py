@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_updated ON fsm (updated_at);
+"""
+
+# Мерзімі өткен (әлі өшірілмеген) жолдың ескі күйі/деректері жаңа жазбаға араласпайды
+UPSERT_SQL = """
+INSERT INTO fsm (key, state, data, updated_at) VALUES (:key, :state, :data, :now)
+ON CONFLICT (key) DO UPDATE SET
+    state = CASE WHEN :set_state THEN excluded.state WHEN fsm.updated_at < :expired THEN NULL ELSE fsm.state END,
+    data = CASE WHEN :set_data THEN excluded.data WHEN fsm.updated_at < :expired THEN '{}' ELSE fsm.data END,
+    updated_at = excluded.updated_at
+"""
+
+_UNSET = object()
+
+
+def _state_name(state):
+    return state.state if isinstance(state, State) else state
+
+
+class SQLiteStorage(BaseStorage):
+    """ComplaintFSM күйлерін SQLite (WAL) файлында сақтау.
+
+    Бір хосттағы бірнеше бот процесі бір файлды бөлісе алады. `ttl`
+    секундтан бері жаңартылмаған (тасталған) шағым шеберлері оқылмайды
+    және мерзімді түрде өшіріледі.
+    """
+
+    def __init__(self, path='fsm_state.sqlite3', ttl=7 * 24 * 3600, sweep_interval=600):
+        self.path = path
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fsm-sqlite')
+        self._conn = None
+        self._last_sweep = 0.0
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self.write(key, state=_state_name(state))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self.read(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self.write(key, data=dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self.read(key)
+        return data
+
+    async def read(self, key):
+        return await self._run(self._read, self.key_builder.build(key))
+
+    async def write(self, key, state=_UNSET, data=_UNSET):
+        await self._run(self._write, [(self.key_builder.build(key), state, data)])
+
+    async def write_many(self, items):
+        """[(key, state, data), ...] — бір транзакцияда жазу (BufferedStorage үшін)."""
+        await self._run(self._write, [(self.key_builder.build(k), s, d) for k, s, d in items])
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown()
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _read(self, key):
+        row = self._connection().execute(
+            "SELECT state, data FROM fsm WHERE key = ? AND updated_at >= ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None, {}
+        return row[0], json.loads(row[1])
+
+    def _write(self, items):
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            for key, state, data in items:
+                if state is None and data is not _UNSET and not data:
+                    conn.execute("DELETE FROM fsm WHERE key = ?", (key,))
+                    continue
+                conn.execute(UPSERT_SQL, {
+                    'key': key, 'now': now, 'expired': now - self.ttl,
+                    'set_state': state is not _UNSET, 'state': None if state is _UNSET else state,
+                    'set_data': data is not _UNSET,
+                    'data': '{}' if data is _UNSET else json.dumps(data, ensure_ascii=False),
+                })
+            if now - self._last_sweep >= self.sweep_interval:
+                self._last_sweep = now
+                deleted = conn.execute("DELETE FROM fsm WHERE updated_at < ?", (now - self.ttl,)).rowcount
+                if deleted:
+                    logging.info(f"FSM: {deleted} тасталған шағым шебері өшірілді.")
+
+
+class BufferedStorage(BaseStorage):
+    """Кез келген FSM қоймасының алдындағы write-behind буфер.
+
+    Бір қадамдағы бірнеше `update_data`/`set_state` шақыруы жадта
+    біріктіріліп, `flush_interval` сайын бір топпен жазылады. Оқу алдымен
+    буферден жүреді, сондықтан handler өз жазғанын бірден көреді. Басқа
+    процестер күйді `flush_interval`-ға дейін кешігіп көреді, сондықтан
+    буфер тек бір процесте қосылады (FSM_FLUSH_INTERVAL > 0). Жазу
+    сәтсіз болса, жазбалар буферге қайтарылып, кейін қайталанады.
+    """
+
+    def __init__(self, storage: BaseStorage, flush_interval=0.2):
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._flusher = None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._buffer(key, state=_state_name(state))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        pending = self._pending.get(key, {})
+        if 'state' in pending:
+            return pending['state']
+        return await self.storage.get_state(key)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        self._buffer(key, data=dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        pending = self._pending.get(key, {})
+        if 'data' in pending:
+            return dict(pending['data'])
+        return await self.storage.get_data(key)
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            if isinstance(self.storage, SQLiteStorage):
+                await self.storage.write_many(
+                    [(key, p.get('state', _UNSET), p.get('data', _UNSET)) for key, p in pending.items()]
+                )
+                return
+            for key in list(pending):
+                p = pending[key]
+                if 'state' in p:
+                    await self.storage.set_state(key, p['state'])
+                    p.pop('state')
+                if 'data' in p:
+                    await self.storage.set_data(key, p['data'])
+                del pending[key]
+        except Exception:
+            # Жазылмағандар буферге оралады; арада келген жаңа мәндер басым
+            for key, p in pending.items():
+                self._pending[key] = {**p, **self._pending.get(key, {})}
+            raise
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logging.error(f"FSM буфері жабылғанда жазылмады ({len(self._pending)} кілт): {e}")
+        finally:
+            await self.storage.close()
+
+    def _buffer(self, key, **fields):
+        self._pending.setdefault(key, {}).update(fields)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        delay = self.flush_interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.flush()
+            except Exception as e:
+                delay = min(delay * 2, 30.0)
+                logging.error(f"FSM буферін жазу қатесі, {len(self._pending)} кілт {delay:.1f} с кейін қайталанады: {e}")
+                continue
+            if not self._pending:
+                return
+            delay = self.flush_interval
+
+
+def shared_across_processes():
+    """FSM күйі бірнеше процеске ортақ па: sqlite/redis және write-behind буфері өшірулі."""
+    kind = os.getenv("FSM_STORAGE", "memory")
+    return kind in ('sqlite', 'redis') and float(os.getenv("FSM_FLUSH_INTERVAL", "0")) <= 0
+
+
+def create_storage():
+    """FSM_STORAGE бойынша қойма: memory (әдепкі), sqlite немесе redis."""
+    kind = os.getenv("FSM_STORAGE", "memory")
+    ttl = int(os.getenv("FSM_TTL", str(7 * 24 * 3600)))
+    # Әдепкі write-through: басқа процестер күйді бірден көреді
+    flush_interval = float(os.getenv("FSM_FLUSH_INTERVAL", "0"))
+    if kind == 'memory':
+        return MemoryStorage()
+    if kind == 'sqlite':
+        storage = SQLiteStorage(os.getenv("FSM_SQLITE_FILE", "fsm_state.sqlite3"), ttl=ttl)
+    elif kind == 'redis':
+        # Redis протоколымен үйлесімді кез келген сервер (Redis, KeyDB, Dragonfly, fakeredis)
+        from aiogram.fsm.storage.redis import RedisStorage
+        storage = RedisStorage.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+            state_ttl=ttl, data_ttl=ttl,
+        )
+    else:
+        raise ValueError(f"Белгісіз FSM_STORAGE: {kind}")
+    return BufferedStorage(storage, flush_interval) if flush_interval > 0 else storage
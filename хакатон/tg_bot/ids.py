@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Snowflake үлгісі: 41 бит миллисекунд | 10 бит worker | 12 бит реттік нөмір
+EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+# Процесс тірі тұрғанда алынған worker ID құлпы ашық ұсталады
+_lease = None
+
+
+def claim_worker_id(directory):
+    """Бос worker ID-ін `directory/<n>.lock` файлын flock арқылы алу.
+
+    Құлып процесс аяқталғанша босамайды, сондықтан бір қойманы бөлісетін
+    процестер бір ID-ді ала алмайды.
+    """
+    global _lease
+    os.makedirs(directory, exist_ok=True)
+    for worker_id in range(MAX_WORKER + 1):
+        f = open(os.path.join(directory, f"{worker_id}.lock"), 'a')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            continue
+        _lease = f
+        return worker_id
+    raise RuntimeError(f"'{directory}' ішінде бос worker ID қалмады (0..{MAX_WORKER}).")
+
+
+def default_worker_id():
+    """WORKER_ID айнымалысы, әйтпесе WORKER_ID_DIR ішінде құлыппен алынған бос ID."""
+    env = os.getenv("WORKER_ID")
+    if env is not None:
+        worker_id = int(env)
+        if not 0 <= worker_id <= MAX_WORKER:
+            raise ValueError(f"WORKER_ID 0..{MAX_WORKER} аралығында болуы керек: {worker_id}")
+        return worker_id
+    if fcntl is None:
+        logging.warning("WORKER_ID орнатылмаған және flock жоқ: 0 қолданылады, тек бір процесс қауіпсіз.")
+        return 0
+    return claim_worker_id(os.getenv("WORKER_ID_DIR", ".worker_ids"))
+
+
+class IdGenerator:
+    """Бірегей, уақыт бойынша өсетін шағым ID-лері (Snowflake).
+
+    Бір процесс ішінде ID-лер қатаң өседі. Процестер арасында бірегейлік
+    worker ID-ге байланысты: WORKER_ID анық беріледі немесе ортақ
+    WORKER_ID_DIR ішінде құлыппен алынады (claim_worker_id).
+    """
+
+    def __init__(self, worker_id=None):
+        self.worker_id = default_worker_id() if worker_id is None else worker_id
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self):
+        with self._lock:
+            now = self._now()
+            if now < self._last_ms:
+                # Сағат кері кетті — соңғы уақытпен жалғастырамыз
+                now = self._last_ms
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    while now <= self._last_ms:
+                        time.sleep(0.0001)
+                        now = max(self._now(), now)
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    @staticmethod
+    def _now():
+        return time.time_ns() // 1_000_000 - EPOCH_MS
+
+
+def id_timestamp(complaint_id):
+    """ID ішіндегі уақыт (Unix секундтары)."""
+    return ((complaint_id >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS) / 1000
+
+
+def id_range(start_ts, end_ts):
+    """[start_ts, end_ts) уақыт аралығына сәйкес ID ауқымы (range-scan үшін)."""
+    shift = WORKER_BITS + SEQUENCE_BITS
+    return (int(start_ts * 1000) - EPOCH_MS) << shift, (int(end_ts * 1000) - EPOCH_MS) << shift
+
+
+_default = None
+
+
+def new_complaint_id():
+    global _default
+    if _default is None:
+        _default = IdGenerator()
+    return _default.next_id()
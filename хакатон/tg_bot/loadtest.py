@@ -0,0 +1,255 @@
+"""Webhook режиміне жүктеме тесті.
+
+Жергілікті жалған Telegram Bot API серверін көтереді, ботты webhook
+режимінде сол API-ге бағыттайды және синтетикалық шағым сценарийлерін
+(/start -> ... -> ✅ Аяқтау) webhook-қа қатар жібереді.
+
+    python loadtest.py --users 500
+    python loadtest.py --serve-api 8081   # бөлек процестердегі бот үшін жалған API
+    python loadtest.py --users 500 --target http://127.0.0.1:8080/telegram --secret s3cret
+    python loadtest.py --notify 2000 --chats 300   # Notifier-ді 429 қайтаратын жалған API-ге қарсы
+"""
+import argparse
+import asyncio
+import itertools
+import math
+import os
+import sys
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+FAKE_TOKEN = '123456789:LOADTEST'
+SECRET = 'loadtest-secret'
+ASPECTS = ['Уақытылы келу', 'Автобус толымдылығы', 'Қызметкер әрекеті', 'Төлем']
+
+
+class FakeTelegramAPI:
+    """Bot API-дің ең аз жалған нұсқасы: әр әдіске дұрыс пішімді жауап қайтарады."""
+
+    def __init__(self, flood_every=0, retry_after=1):
+        # flood_every > 0 болса әр N-ші сұрауға 429 (Too Many Requests) қайтарылады
+        self.flood_every = flood_every
+        self.retry_after = retry_after
+        self.calls = {}
+        self._message_ids = itertools.count(1000)
+        self._runner = None
+        self.url = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        app = web.Application()
+        app.router.add_route('*', '/bot{token}/{method}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://{host}:{port}'
+        return self
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    def total(self):
+        return sum(self.calls.values())
+
+    async def _handle(self, request):
+        method = request.match_info['method']
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.flood_every and self.total() % self.flood_every == 0:
+            return web.json_response({
+                'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry later',
+                'parameters': {'retry_after': self.retry_after},
+            }, status=429)
+        params = dict(await request.post()) if request.can_read_body else {}
+        return web.json_response({'ok': True, 'result': self._result(method, params)})
+
+    def _result(self, method, params):
+        if method == 'getMe':
+            return {'id': 123456789, 'is_bot': True, 'first_name': 'LoadTest', 'username': 'loadtest_bot'}
+        if method == 'copyMessage':
+            return {'message_id': next(self._message_ids)}
+        if method in ('sendMessage', 'editMessageText', 'sendVideo', 'sendPhoto', 'sendDocument'):
+            return {
+                'message_id': next(self._message_ids), 'date': int(time.time()),
+                'chat': {'id': int(params.get('chat_id', 0) or 0), 'type': 'private'},
+                'text': params.get('text', ''),
+            }
+        return True
+
+
+def _message(update_id, user_id, text):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': int(time.time()), 'text': text,
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'User', 'username': f'user{user_id}'},
+        },
+    }
+
+
+def _callback(update_id, user_id, data):
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id), 'chat_instance': str(user_id), 'data': data,
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'User'},
+            'message': {
+                'message_id': update_id, 'date': int(time.time()), 'text': '...',
+                'chat': {'id': user_id, 'type': 'private'},
+            },
+        },
+    }
+
+
+def synthetic_flow(user_id, update_ids, route=None, aspect=None, stop='Керуен',
+                   description='Автобус үнемі кешігеді, аялдамада 40 минут күттік'):
+    """Бір пайдаланушының толық шағым сценарийі (ComplaintFSM барлық қадамы)."""
+    steps = [
+        (_message, '/start'),
+        (_callback, 'start_complaint'),
+        (_message, str(route or user_id % 120 + 1)),
+        (_message, aspect or ASPECTS[user_id % len(ASPECTS)]),
+        (_message, 'Бүгін'),
+        (_message, '🕒 Қазіргі уақыт'),
+        (_message, stop),
+        (_message, description),
+        (_callback, 'finish_complaint'),
+    ]
+    return [build(next(update_ids), user_id, payload) for build, payload in steps]
+
+
+async def replay(target, secret, users, concurrency=100):
+    update_ids = itertools.count(1)
+    flows = [synthetic_flow(100000 + i, update_ids) for i in range(users)]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    rejected = 0
+
+    async def run_flow(session, flow):
+        nonlocal rejected
+        async with semaphore:
+            for update in flow:
+                started = time.perf_counter()
+                async with session.post(target, json=update,
+                                        headers={'X-Telegram-Bot-Api-Secret-Token': secret}) as response:
+                    if response.status != 200:
+                        rejected += 1
+                latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(run_flow(session, flow) for flow in flows))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'updates': len(latencies), 'rejected': rejected, 'seconds': elapsed,
+        'accepted_per_sec': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.99) - 1)] * 1000,
+    }
+
+
+async def run_local(users, concurrency, workers):
+    api = await FakeTelegramAPI().start()
+    os.environ.update({
+        'BOT_TOKEN': FAKE_TOKEN, 'ADMIN_CHAT_ID': '1', 'TELEGRAM_API_URL': api.url,
+        'BOT_MODE': 'webhook', 'BOT_WEBHOOK_SECRET': SECRET, 'UPDATE_WORKERS': str(workers),
+        # Бос мән .env ішіндегі нақты Make.com URL-ін басып тұрады
+        'WEBHOOK_URL': '',
+    })
+    # Бот деректері уақытша каталогқа жазылады
+    os.chdir(tempfile.mkdtemp(prefix='loadtest-'))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bot as bot_module
+    from webhook_server import create_app
+
+    await bot_module.store.start()
+    app = create_app(bot_module.dp, bot_module.bot, '/telegram', SECRET, workers)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        stats = await replay(f'http://127.0.0.1:{port}/telegram', SECRET, users, concurrency)
+        drain_started = time.perf_counter()
+        pool = app['pool']
+        for queue in pool.queues:
+            await queue.join()
+        stats['processed'] = pool.processed
+        stats['processed_per_sec'] = pool.processed / (stats['seconds'] + time.perf_counter() - drain_started)
+        stats['api_calls'] = dict(api.calls)
+        stats['complaints_stored'] = await bot_module.store.count()
+    finally:
+        await runner.cleanup()
+        await bot_module.store.close()
+        await bot_module.bot.session.close()
+        await api.stop()
+    return stats
+
+
+async def notify_test(messages, chats, global_rate=200.0, chat_rate=5.0):
+    """Notifier-ді жалған API-ге қарсы тексеру: шектер сақталады ма, 429-дан кейін бәрі жетеді ме."""
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from notifier import Notifier
+
+    api = await FakeTelegramAPI(flood_every=97).start()
+    bot = Bot(FAKE_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api.url)))
+    notifier = Notifier(bot, global_rate=global_rate, chat_rate=chat_rate, chat_burst=1, concurrency=32)
+    await notifier.start()
+    started = time.perf_counter()
+    try:
+        futures = [notifier.send_message(100000 + i % chats, f"Хабарлама {i}") for i in range(messages)]
+        await asyncio.gather(*futures, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+    finally:
+        await notifier.close()
+        await bot.session.close()
+        await api.stop()
+    stats = notifier.metrics()
+    stats.update(seconds=elapsed, sent_per_sec=stats['sent'] / elapsed, api_calls=api.total(),
+                 expected_min_seconds=max((messages - global_rate) / global_rate, (messages / chats - 1) / chat_rate))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook режиміне жүктеме тесті")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--target', help="Іске қосылған webhook серверінің URL-і (жалған API-ге бағытталған)")
+    parser.add_argument('--secret', default=SECRET)
+    parser.add_argument('--serve-api', type=int, metavar='PORT', help="Тек жалған Bot API серверін іске қосу")
+    parser.add_argument('--notify', type=int, metavar='N', help="Notifier арқылы N хабарлама жіберу")
+    parser.add_argument('--chats', type=int, default=100)
+    args = parser.parse_args()
+    if args.serve_api:
+        async def serve_api():
+            api = await FakeTelegramAPI().start(port=args.serve_api)
+            print(f"Жалған Bot API: {api.url} (TELEGRAM_API_URL)")
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await api.stop()
+        asyncio.run(serve_api())
+        return
+    if args.notify:
+        stats = asyncio.run(notify_test(args.notify, args.chats))
+    elif args.target:
+        stats = asyncio.run(replay(args.target, args.secret, args.users, args.concurrency))
+    else:
+        stats = asyncio.run(run_local(args.users, args.concurrency, args.workers))
+    for key, value in stats.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
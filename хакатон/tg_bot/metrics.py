@@ -0,0 +1,330 @@
+"""Ботты өлшеу: гистограммалар, санауыштар және жергілікті /metrics (Prometheus мәтін пішімі).
+
+    METRICS_PORT=9100 python bot.py                  # әдепкіде сервер өшірулі
+    curl 127.0.0.1:9100/metrics
+    curl '127.0.0.1:9100/debug/profile?seconds=10'   # cProfile, ең ауыр 40 функция
+    kill -USR1 <pid>                                  # профильдеуді қосу/өшіру -> profile-<pid>.prof
+"""
+import asyncio
+import cProfile
+import functools
+import io
+import logging
+import math
+import os
+import pstats
+import signal
+import time
+
+from aiohttp import web
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Шағым шеберінің қадамдары ретімен (воронка)
+FUNNEL = ['start', 'waiting_for_route', 'waiting_for_aspect', 'waiting_for_date', 'waiting_for_time',
+          'waiting_for_bus_stop_name', 'waiting_for_description', 'waiting_for_action', 'finished']
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values = {}
+
+    def inc(self, *labels, value=1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}\n# TYPE {self.name} counter"
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {value}"
+
+
+class Gauge:
+    """Мәні render кезінде `fn()`-нан алынады: {(label, ...): мән} немесе жай сан."""
+
+    def __init__(self, name, help, fn, labels=()):
+        self.name, self.help, self.fn, self.labels = name, help, fn, tuple(labels)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}\n# TYPE {self.name} gauge"
+        try:
+            values = self.fn()
+        except Exception as e:
+            logging.error(f"Метрика {self.name} есептелмеді: {e}")
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {float(value)}"
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, tuple(labels), buckets
+        self.series = {}
+
+    def observe(self, value, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}\n# TYPE {self.name} histogram"
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                yield f"{self.name}_bucket{_labels(self.labels + ('le',), labels + (bound,))} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labels + ('le',), labels + ('+Inf',))} {count}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {count}"
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram, self.labels = histogram, labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return '\n'.join(line for metric in self.metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = Registry()
+HANDLER_SECONDS = REGISTRY.add(Histogram('bot_handler_seconds', "Handler орындалу уақыты", ('handler', 'event')))
+STEP_SECONDS = REGISTRY.add(Histogram('bot_fsm_step_seconds', "ComplaintFSM қадамын өңдеу уақыты", ('step',)))
+HANDLER_ERRORS = REGISTRY.add(Counter('bot_handler_errors_total', "Handler қателері", ('handler',)))
+FSM_TRANSITIONS = REGISTRY.add(Counter('bot_fsm_transitions_total', "FSM ауысулары", ('from', 'to')))
+FUNNEL_ENTERED = REGISTRY.add(Counter('bot_funnel_entered_total', "Воронка қадамына кірген пайдаланушылар", ('step',)))
+CALL_SECONDS = REGISTRY.add(Histogram('bot_call_seconds', "Қойма/webhook/хабарлама шақыруларының уақыты",
+                                      ('component', 'op')))
+LOOP_LAG = REGISTRY.add(Histogram('bot_event_loop_lag_seconds', "Event loop кешігуі",
+                                  buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)))
+
+
+def _step(raw_state):
+    if not raw_state:
+        return 'start'
+    return raw_state.split(':', 1)[-1]
+
+
+def _funnel_dropoff():
+    entered = {labels[0]: value for labels, value in FUNNEL_ENTERED.values.items()}
+    result = {}
+    for step, following in zip(FUNNEL, FUNNEL[1:]):
+        if entered.get(step):
+            result[(step,)] = 1 - entered.get(following, 0) / entered[step]
+    return result
+
+
+REGISTRY.add(Gauge('bot_funnel_dropoff_ratio', "Қадамнан келесіге өтпеген үлес", _funnel_dropoff, ('step',)))
+
+_components = {}
+
+
+def register_component(component, fn):
+    """Кезек тереңдігі сияқты мәндер: fn() -> {атауы: сан} (мысалы WebhookDispatcher.metrics)."""
+    _components[component] = fn
+
+
+def _component_values():
+    return {(component, name): value for component, fn in _components.items()
+            for name, value in fn().items() if isinstance(value, (int, float))}
+
+
+REGISTRY.add(Gauge('bot_component', "Компоненттердің ішкі көрсеткіштері", _component_values, ('component', 'name')))
+
+
+class _TrackedContext(FSMContext):
+    """Handler орнатқан жаңа күйді есте сақтайды: кейін қоймадан қайта оқудың қажеті жоқ."""
+
+    changed = False
+    new_state = None
+
+    async def set_state(self, state=None):
+        await super().set_state(state)
+        self.changed = True
+        self.new_state = state.state if isinstance(state, State) else state
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Inner middleware: handler уақыты, FSM қадамы және ауысулары."""
+
+    def __init__(self, event_type):
+        self.event_type = event_type
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get('handler')
+        name = getattr(getattr(handler_object, 'callback', None), '__name__', 'unknown')
+        before = _step(data.get('raw_state'))
+        state = data.get('state')
+        if state is not None:
+            data['state'] = state = _TrackedContext(state.storage, state.key)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            HANDLER_SECONDS.observe(elapsed, name, self.event_type)
+            STEP_SECONDS.observe(elapsed, before)
+            if name == 'start_complaint_callback':
+                FUNNEL_ENTERED.inc('start')
+            if state is not None and state.changed:
+                after = state.new_state
+                if after is None and before == 'waiting_for_action' and name == 'finish_complaint_callback':
+                    after = 'finished'
+                after = _step(after)
+                if after != before:
+                    FSM_TRANSITIONS.inc(before, after)
+                    if after in FUNNEL[1:]:
+                        FUNNEL_ENTERED.inc(after)
+
+
+def setup_middleware(dp):
+    dp.message.middleware(MetricsMiddleware('message'))
+    dp.callback_query.middleware(MetricsMiddleware('callback_query'))
+
+
+def instrument(obj, component, methods):
+    """obj-тың async әдістерін (данасында) уақыт өлшейтін қабықпен орау."""
+    for op in methods:
+        method = getattr(obj, op, None)
+        if method is None:
+            continue
+
+        @functools.wraps(method)
+        async def wrapper(*args, _method=method, _op=op.lstrip('_'), **kwargs):
+            with CALL_SECONDS.time(component, _op):
+                return await _method(*args, **kwargs)
+
+        setattr(obj, op, wrapper)
+    return obj
+
+
+async def monitor_loop_lag(interval=0.5):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - started - interval))
+
+
+class Profiler:
+    """Жұмыс кезінде қосылатын cProfile (event loop ағынында)."""
+
+    def __init__(self):
+        self._profile = None
+
+    def toggle(self, *_):
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            logging.info("Профильдеу қосылды.")
+            return
+        self._profile.disable()
+        path = f"profile-{os.getpid()}.prof"
+        self._profile.dump_stats(path)
+        self._profile = None
+        logging.info(f"Профиль сақталды: '{path}' (snakeviz/pstats арқылы қараңыз).")
+
+    async def sample(self, seconds):
+        if self._profile is not None:
+            return "Профильдеу SIGUSR1 арқылы қосулы тұр.\n"
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(40)
+        return out.getvalue()
+
+
+def create_metrics_app(registry=REGISTRY, profiler=None):
+    profiler = profiler or Profiler()
+
+    async def metrics(request):
+        return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8')
+
+    async def profile(request):
+        try:
+            seconds = float(request.query.get('seconds', '10'))
+        except ValueError:
+            seconds = math.nan
+        if not 0 < seconds <= 120:
+            return web.Response(status=400, text="seconds: 0-ден 120-ға дейінгі сан болуы керек.\n")
+        return web.Response(text=await profiler.sample(seconds))
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics)
+    app.router.add_get('/debug/profile', profile)
+    return app
+
+
+async def start_metrics_server(host='127.0.0.1', port=9100):
+    """/metrics серверін және loop-lag мониторын фондық режимде іске қосу.
+
+    Порт бос болмаса қате логқа жазылып, None қайтарылады: бот метрикасыз жұмыс істей береді.
+    """
+    profiler = Profiler()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, profiler.toggle)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        pass
+    runner = web.AppRunner(create_metrics_app(profiler=profiler))
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logging.error(f"Метрика сервері {host}:{port} портында іске қосылмады: {e}")
+        await runner.cleanup()
+        return None
+    lag_task = asyncio.create_task(monitor_loop_lag())
+    logging.info(f"Метрикалар: http://{host}:{port}/metrics")
+
+    async def stop():
+        lag_task.cancel()
+        await runner.cleanup()
+    return stop
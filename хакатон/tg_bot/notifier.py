@@ -0,0 +1,223 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import deque
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError,
+)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def delay(self, now):
+        """Келесі токенге дейінгі секунд (токен алынбайды)."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self):
+        self.tokens -= 1
+
+    def full(self, now):
+        return self.delay(now) == 0 and self.tokens >= self.burst
+
+
+class Notifier:
+    """Telegram-ға шығыс хабарламаларды жылдамдық шегімен жіберу.
+
+    Жаһандық және әр чатқа бөлек token bucket. Жаһандық шек тек осы процеске
+    қатысты: бірнеше процесс болса, әрқайсысына жалпы шектің үлесі беріледі. Бір чаттың хабарламалары
+    ретімен, бір-бірден жіберіледі; әр түрлі чаттар `concurrency` шегінде
+    қатар жіберіледі. 429 (retry_after) келсе чат та, жаһандық шек те сол
+    уақытқа тоқтатылады және хабарлама қайта кезекке қойылады; желі/сервер
+    қателері экспоненциалды кідіріспен қайталанады.
+    """
+
+    def __init__(self, bot: Bot, global_rate=25.0, chat_rate=1.0, chat_burst=3, concurrency=8,
+                 max_retries=5, backoff_base=0.5, backoff_cap=30.0):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.stats = {'queued': 0, 'sent': 0, 'failed': 0, 'retries': 0, 'rate_limited': 0,
+                      'latency_sum': 0.0, 'latency_max': 0.0}
+        self._global = TokenBucket(global_rate, max(1.0, global_rate))
+        self._concurrency = concurrency
+        self._buckets = {}
+        self._pending = {}
+        self._ready = []
+        self._scheduled = set()
+        self._in_flight = set()
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._semaphore = None
+        self._dispatcher = None
+        self._tasks = set()
+
+    async def start(self):
+        self._start()
+
+    def _start(self):
+        if self._dispatcher is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def close(self, drain_timeout=5.0):
+        if self._dispatcher is None:
+            return
+        deadline = time.monotonic() + drain_timeout
+        while (self._pending or self._tasks) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pending:
+            logging.warning(f"Хабарлама кезегі толық босамады: {self.depth()} хабарлама жіберілмеді.")
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, *self._tasks, return_exceptions=True)
+        self._dispatcher = None
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self.submit(chat_id, lambda: self.bot.send_message(chat_id=chat_id, text=text, **kwargs))
+
+    def copy_message(self, message, chat_id, **kwargs):
+        return self.submit(chat_id, lambda: message.copy_to(chat_id=chat_id, **kwargs))
+
+    def submit(self, chat_id, call):
+        """Жіберуді кезекке қою; нәтижесі (немесе қатесі) бар Future қайтарады.
+
+        start() шақырылмаса, алғашқы жіберуде іске қосылады.
+        """
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        # Шақырушы күтпесе де қате «retrieved» болып белгіленеді (лог notifier-де)
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pending.setdefault(chat_id, deque()).append([call, future, 0, time.perf_counter()])
+        self.stats['queued'] += 1
+        self._schedule(chat_id)
+        return future
+
+    def depth(self):
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    def metrics(self):
+        sent = self.stats['sent'] or 1
+        return {
+            'queue_depth': self.depth(),
+            'chats_waiting': len(self._pending),
+            'in_flight': len(self._in_flight),
+            'sent': self.stats['sent'],
+            'failed': self.stats['failed'],
+            'retries': self.stats['retries'],
+            'rate_limited': self.stats['rate_limited'],
+            'latency_avg': self.stats['latency_sum'] / sent,
+            'latency_max': self.stats['latency_max'],
+        }
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _schedule(self, chat_id, not_before=0.0):
+        if chat_id in self._scheduled or chat_id in self._in_flight or not self._pending.get(chat_id):
+            return
+        now = time.monotonic()
+        ready_at = max(now + self._bucket(chat_id).delay(now), not_before)
+        heapq.heappush(self._ready, (ready_at, next(self._seq), chat_id))
+        self._scheduled.add(chat_id)
+        self._wakeup.set()
+
+    async def _dispatch_loop(self):
+        while True:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            ready_at, _, chat_id = self._ready[0]
+            now = time.monotonic()
+            wait = max(ready_at - now, self._global.delay(now), self._bucket(chat_id).delay(now))
+            if wait > 0:
+                # Жаңа, ертерек дайын чат келсе ояну
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._ready)
+            self._scheduled.discard(chat_id)
+            await self._semaphore.acquire()
+            self._global.take()
+            self._bucket(chat_id).take()
+            self._in_flight.add(chat_id)
+            job = self._pending[chat_id].popleft()
+            task = asyncio.create_task(self._deliver(chat_id, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, chat_id, job):
+        call, future, attempts, enqueued = job
+        not_before = 0.0
+        try:
+            result = await call()
+        except TelegramRetryAfter as e:
+            self.stats['rate_limited'] += 1
+            not_before = self._requeue(chat_id, job, e.retry_after, global_pause=True)
+        except (TelegramNetworkError, TelegramServerError) as e:
+            if attempts < self.max_retries:
+                delay = min(self.backoff_cap, self.backoff_base * 2 ** attempts)
+                not_before = self._requeue(chat_id, job, random.uniform(delay / 2, delay))
+            else:
+                self._fail(chat_id, future, e)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Пайдаланушы ботты бұғаттаған немесе сұрау қате — қайталаудың мәні жоқ
+            self._fail(chat_id, future, e)
+        except Exception as e:
+            self._fail(chat_id, future, e)
+        else:
+            latency = time.perf_counter() - enqueued
+            self.stats['sent'] += 1
+            self.stats['latency_sum'] += latency
+            self.stats['latency_max'] = max(self.stats['latency_max'], latency)
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._semaphore.release()
+            self._in_flight.discard(chat_id)
+            if not self._pending.get(chat_id):
+                self._pending.pop(chat_id, None)
+                if self._bucket(chat_id).full(time.monotonic()):
+                    self._buckets.pop(chat_id, None)
+            self._schedule(chat_id, not_before)
+
+    def _requeue(self, chat_id, job, delay, global_pause=False):
+        job[2] += 1
+        self.stats['retries'] += 1
+        self._pending.setdefault(chat_id, deque()).appendleft(job)
+        until = time.monotonic() + delay
+        self._bucket(chat_id).blocked_until = until
+        if global_pause:
+            self._global.blocked_until = max(self._global.blocked_until, until)
+        logging.warning(f"Хабарлама (чат {chat_id}) {delay:.1f} с кейін қайта жіберіледі.")
+        return until
+
+    def _fail(self, chat_id, future, error):
+        self.stats['failed'] += 1
+        logging.error(f"Хабарлама жіберілмеді (чат {chat_id}): {error}")
+        if not future.done():
+            future.set_exception(error)
@@ -0,0 +1,181 @@
+import json
+import mmap
+import os
+
+from schema import normalize_record
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+class Filter:
+    """Ағынды оқуға арналған предикат: статус, маршрут, аспект, маңыздылық және filed-күн аралығы.
+
+    Әр шарт алдымен шикі байт жолында тексеріледі, сондықтан сәйкес емес
+    жолдар JSON-ға мүлдем талданбайды.
+    """
+
+    def __init__(self, status=None, route=None, date_from=None, date_to=None, aspect=None, severity=None):
+        self.status = status
+        self.route = None if route is None else str(route)
+        self.date_from = date_from
+        self.date_to = date_to
+        self.aspect = aspect
+        self.severity = severity
+        # Әр топтың кемінде бір нұсқасы жолда болуы керек
+        self._needles = [(json.dumps(value, ensure_ascii=False).encode(),)
+                         for value in (status, aspect, severity) if value is not None]
+        if self.route is not None:
+            route = json.dumps(self.route, ensure_ascii=False)
+            self._needles.append(tuple(
+                [f'"route_number"{sep}{route}'.encode() for sep in (': ', ':')]
+                + [f'"route_number"{sep}{self.route}{end}'.encode() for sep in (': ', ':') for end in (',', '}')]
+                # Ескі жолдар: маршрут тек "Маршрут 12" өрісінде
+                + [f'Маршрут {self.route}"'.encode()]
+            ))
+
+    def quick_reject(self, raw):
+        # Ине мәндері ensure_ascii=False пішімінде; \uXXXX түрінде жазылған ескі жолдар толық тексеріледі
+        if b'\\u' in raw:
+            return False
+        return any(not any(needle in raw for needle in group) for group in self._needles)
+
+    def __call__(self, record):
+        if self.status is not None and record.get('status') != self.status:
+            return False
+        if self.route is not None and str(record.get('route_number')) != self.route:
+            return False
+        if self.aspect is not None and record.get('aspect') != self.aspect:
+            return False
+        if self.severity is not None and record.get('severty') != self.severity:
+            return False
+        if self.date_from or self.date_to:
+            day = str(record.get('timestamp_filed') or '')[:10]
+            if self.date_from and day < self.date_from:
+                return False
+            if self.date_to and day > self.date_to:
+                return False
+        return True
+
+
+def iter_lines(path, start=0, use_mmap=True):
+    """(байт offset, шикі жол) жұптары; аяқталмаған соңғы жол өткізіледі."""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= start:
+            return
+        if use_mmap:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = start
+                while pos < size:
+                    end = mm.find(b'\n', pos)
+                    if end == -1:
+                        return
+                    yield pos, mm[pos:end]
+                    pos = end + 1
+        else:
+            f.seek(start)
+            pos = start
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    return
+                yield pos, raw[:-1]
+                pos += len(raw)
+
+
+def load_overrides(path):
+    """Статус оқиғалары журналынан complaint_id -> өзгерген өрістер."""
+    overrides = {}
+    for _, raw in iter_lines(os.path.splitext(path)[0] + '.events.jsonl', use_mmap=False):
+        if raw.strip():
+            event = _loads(raw)
+            overrides.setdefault(event.get('complaint_id'), {}).update(event.get('set', {}))
+    return overrides
+
+
+def seek_date(path, day):
+    """filed-күні `day`-ден кіші емес бірінші жолдың offset-і (бинарлы іздеу).
+
+    Журнал тіркелу ретімен жазылатындықтан timestamp_filed өседі.
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return 0
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lo, hi = 0, size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                start = mm.rfind(b'\n', 0, mid) + 1
+                end = mm.find(b'\n', start)
+                if end == -1:
+                    hi = start
+                    continue
+                filed = str(_loads(mm[start:end]).get('timestamp_filed') or '')[:10]
+                if filed < day:
+                    lo = end + 1
+                else:
+                    hi = start
+            return lo
+
+
+def iter_records(path, where=None, start=0, limit=None, use_mmap=True, with_offsets=False, events=True):
+    """Журналды жол-жолымен оқып, сүзгіден өткен жазбаларды береді (жады шектеулі).
+
+    events=True болса статус оқиғалары қолданылады. date_from берілсе оқу бинарлы іздеумен
+    табылған offset-тен басталады, date_to-дан кейінгі жолда тоқтайды.
+    with_offsets=True болса (келесі жолдың offset-і, жазба) жұптары беріледі.
+    """
+    overrides = load_overrides(path) if events else {}
+    if where is not None and where.date_from and start == 0:
+        start = seek_date(path, where.date_from)
+    # Оқиғалар статус/маңыздылықты өзгерткен болса, олар бойынша шикі сүзгі сенімсіз
+    quick = where is not None and not (overrides and (where.status is not None or where.severity is not None))
+    found = 0
+    for pos, raw in iter_lines(path, start, use_mmap):
+        if not raw.strip() or (quick and where.quick_reject(raw)):
+            continue
+        record = normalize_record(_loads(raw))
+        changes = overrides.get(record.get('complaint_id'))
+        if changes:
+            record.update(changes)
+        if where is not None and not where(record):
+            if where.date_to and str(record.get('timestamp_filed') or '')[:10] > where.date_to:
+                return
+            continue
+        yield (pos + len(raw) + 1, record) if with_offsets else record
+        found += 1
+        if limit is not None and found >= limit:
+            return
+
+
+def iter_chunks(path, chunk_size=50000, where=None, start=0, use_mmap=True):
+    """Жазбаларды chunk_size өлшемді тізімдер түрінде береді."""
+    chunk = []
+    for record in iter_records(path, where, start, use_mmap=use_mmap):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_frames(path, chunk_size=50000, where=None, columns=None, start=0, use_mmap=True):
+    """Типтелген pandas DataFrame бөліктері (schema.cast_frame арқылы)."""
+    import pandas as pd
+    from schema import cast_frame
+
+    for chunk in iter_chunks(path, chunk_size, where, start, use_mmap):
+        yield cast_frame(pd.DataFrame.from_records(chunk), columns)
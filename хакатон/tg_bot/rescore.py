@@ -0,0 +1,177 @@
+"""Тарихи шағымдарды ағымдағы ережелер бойынша қайта бағалау.
+
+rules.py (get_priority, RECOMMENDATIONS_DB) немесе keywords.json өзгерсе,
+ескі жазбалардағы `severty` мен `recommendation_kz` ескіреді. Бұл команда
+қойманы ағынмен оқып, жазбаларды процестер пулында қайта бағалайды және
+тек өзгерген өрістерді жазады:
+
+- jsonl: статус оқиғалары журналына `set`/`prev` оқиғалары (бот жұмыс
+  істеп тұрғанда да қауіпсіз, ортақ құлыппен);
+- sqlite: бастапқы кілт бойынша `json_patch` жаңартулары (статус өзгерістерін басып тастамайды).
+
+Әр топтан кейін бақылау нүктесі сақталады, үзілсе сол жерден жалғасады.
+
+    python rescore.py --workers 8
+    python rescore.py --restart
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from classifier import KEYWORDS_FILE
+from reader import iter_records
+from rules import RECOMMENDATIONS_DB, score_record
+from storage import append_lines, event_line, write_atomic
+
+DB_FILE = 'complaints_db.jsonl'
+CHECKPOINT_FILE = 'rescore_checkpoint.json'
+
+
+def rules_hash():
+    """Ережелер нұсқасы: ол өзгерсе ескі бақылау нүктесі жарамсыз."""
+    digest = hashlib.sha1(json.dumps(RECOMMENDATIONS_DB, ensure_ascii=False, sort_keys=True).encode())
+    with open(KEYWORDS_FILE, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def rescore_chunk(records):
+    """Пул процесінде: [(complaint_id, өзгерістер, бұрынғы мәндер), ...]."""
+    result = []
+    for record in records:
+        changes = score_record(record)
+        if changes:
+            result.append((record['complaint_id'], changes, {k: record.get(k) for k in changes}))
+    return result
+
+
+def load_checkpoint(path, target, restart=False):
+    if restart or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('target') != os.path.abspath(target) or checkpoint.get('rules') != rules_hash():
+        logging.warning("Бақылау нүктесі басқа қойма/ережелерге тиесілі, басынан басталады.")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path, target, **state):
+    state.update(target=os.path.abspath(target), rules=rules_hash(), ts=time.time())
+    write_atomic(path, [json.dumps(state)])
+
+
+def _pipeline(pool, chunks, workers):
+    """Чанктерді пулға беріп, нәтижелерді сол ретпен қайтару (шектелген кезек)."""
+    pending = []
+    for meta, records in chunks:
+        pending.append((meta, pool.submit(rescore_chunk, records)))
+        if len(pending) >= workers * 2:
+            meta, future = pending.pop(0)
+            yield meta, future.result()
+    for meta, future in pending:
+        yield meta, future.result()
+
+
+def _jsonl_chunks(path, start, chunk_size):
+    chunk, pos = [], start
+    for pos, record in iter_records(path, start=start, with_offsets=True):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield pos, chunk
+            chunk = []
+    if chunk:
+        yield pos, chunk
+
+
+def rescore_jsonl(path=DB_FILE, workers=None, chunk_size=5000, checkpoint_path=CHECKPOINT_FILE, restart=False):
+    checkpoint = load_checkpoint(checkpoint_path, path, restart)
+    ino = os.stat(path).st_ino
+    start = 0
+    if checkpoint is not None:
+        if checkpoint.get('ino') == ino:
+            start = checkpoint['pos']
+        else:
+            # Журнал ықшамдалған: offset жарамсыз, қайта бағалау идемпотентті
+            logging.warning("Журнал ықшамдалған, басынан қайта өтеміз.")
+    events_path = os.path.splitext(path)[0] + '.events.jsonl'
+    lock_path = path + '.lock'
+    workers = workers or os.cpu_count() or 1
+    scanned = changed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        chunks = (((pos, len(chunk)), chunk) for pos, chunk in _jsonl_chunks(path, start, chunk_size))
+        for (pos, size), result in _pipeline(pool, chunks, workers):
+            if result:
+                append_lines(events_path, lock_path, [event_line(cid, changes, prev) for cid, changes, prev in result])
+            scanned += size
+            changed += len(result)
+            save_checkpoint(checkpoint_path, path, pos=pos, ino=ino)
+    return _report(scanned, changed, started)
+
+
+def _sqlite_chunks(conn, after, chunk_size):
+    while True:
+        rows = conn.execute(
+            "SELECT complaint_id, data FROM complaints WHERE complaint_id > ? ORDER BY complaint_id LIMIT ?",
+            (after, chunk_size),
+        ).fetchall()
+        if not rows:
+            return
+        after = rows[-1][0]
+        yield (after, len(rows)), [json.loads(data) for _, data in rows]
+
+
+def rescore_sqlite(path=None, workers=None, chunk_size=5000, checkpoint_path=CHECKPOINT_FILE, restart=False):
+    from sqlite_store import connect
+
+    path = path or os.getenv("SQLITE_FILE", os.path.splitext(DB_FILE)[0] + '.sqlite3')
+    checkpoint = load_checkpoint(checkpoint_path, path, restart)
+    after = checkpoint['last_id'] if checkpoint is not None else -1
+    reader_conn, writer_conn = connect(path), connect(path)
+    writer_conn.execute("PRAGMA busy_timeout = 10000")
+    workers = workers or os.cpu_count() or 1
+    scanned = changed = 0
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            for (last_id, size), result in _pipeline(pool, _sqlite_chunks(reader_conn, after, chunk_size), workers):
+                # Тек өзгерген өрістер: бот бір уақытта жазған статус сақталады
+                with writer_conn:
+                    writer_conn.executemany(
+                        "UPDATE complaints SET data = json_patch(data, ?) WHERE complaint_id = ?",
+                        [(json.dumps(changes, ensure_ascii=False), cid) for cid, changes, _ in result],
+                    )
+                scanned += size
+                changed += len(result)
+                save_checkpoint(checkpoint_path, path, last_id=last_id)
+    finally:
+        reader_conn.close()
+        writer_conn.close()
+    return _report(scanned, changed, started)
+
+
+def _report(scanned, changed, started):
+    elapsed = time.perf_counter() - started
+    rate = scanned / elapsed if elapsed else 0
+    logging.info(f"Қайта бағалау: {scanned} жазба қаралды, {changed} өзгерді ({rate:,.0f} жазба/с).")
+    return scanned, changed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Шағымдарды ағымдағы ережелермен қайта бағалау")
+    parser.add_argument('--backend', choices=['jsonl', 'sqlite'], default=os.getenv("DB_BACKEND", "jsonl"))
+    parser.add_argument('--path', help="Қойма файлы (әдепкі: DB_FILE немесе SQLITE_FILE)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE)
+    parser.add_argument('--restart', action='store_true', help="Бақылау нүктесін елемей басынан бастау")
+    args = parser.parse_args()
+    rescore = rescore_sqlite if args.backend == 'sqlite' else rescore_jsonl
+    default_path = None if args.backend == 'sqlite' else DB_FILE
+    rescore(args.path or default_path, args.workers, args.chunk_size, args.checkpoint, args.restart)
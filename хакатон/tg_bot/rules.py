@@ -0,0 +1,35 @@
+from classifier import classify
+
+RECOMMENDATIONS_DB = {
+    'Қызметкер әрекеті': 'Персоналмен (жүргізушілермен/кондукторлармен) мотивациялық және түсіндіру жұмыстарын күшейту.',
+    'Уақытылы келу': 'Осы маршруттағы автобустар санын көбейту немесе кестені қайта қарастыру.',
+    'Автобус толымдылығы': 'Пик сағаттарында маршрутқа қосымша, сыйымдылығы жоғары автобустарды қосу.',
+    'Автобус жағдайы': 'Автобус паркінің санитарлық және техникалық жағдайын дереу тексеру.',
+    'Қауіпсіздік': 'Жүргізушілерге қауіпсіз жүргізу бойынша қосымша нұсқаулық өткізу.',
+    'Төлем': 'Төлем терминалдарының жұмысын тексеріп, ақауларды жою.',
+    'Басқа': 'Жағдайды нақтылау үшін қосымша тексеру жүргізу.'
+}
+SEVERITY_ORDER = ['Шұғыл', 'Жоғары', 'Орташа', 'Төмен']
+def analyze_complaint(text, aspekt):
+    severity, suggested_aspect = classify(text)
+    if severity is None:
+        severity = 'Орташа' if aspekt not in ['Басқа', 'Уақытылы келу'] else 'Төмен'
+    return severity, suggested_aspect
+
+def get_priority(text, aspekt):
+    return analyze_complaint(text, aspekt)[0]
+
+def recommendation_for(aspect):
+    return RECOMMENDATIONS_DB.get(aspect, RECOMMENDATIONS_DB['Басқа'])
+
+def score_record(record):
+    """Жазбаның ағымдағы ережелер бойынша өзгеруге тиіс өрістері (өзгеріс жоқ болса бос)."""
+    aspect = record.get('aspect', 'Басқа')
+    severity, _ = analyze_complaint(record.get('description', ''), aspect)
+    changes = {}
+    if record.get('severty') != severity:
+        changes['severty'] = severity
+    recommendation = recommendation_for(aspect)
+    if record.get('recommendation_kz') != recommendation:
+        changes['recommendation_kz'] = recommendation
+    return changes
@@ -0,0 +1,146 @@
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.json as pa_json
+except ImportError:
+    pa = None
+
+# Бот жазатын өрістер және олардың pandas типтері
+FIELD_DTYPES = {
+    'complaint_id': 'Int64',
+    'user_id': 'Int64',
+    'жалобщик': 'string',
+    'object': 'category',
+    'route_number': 'category',
+    'date_time': 'string',
+    'location': 'string',
+    'aspect': 'category',
+    'description': 'string',
+    'severty': 'category',
+    'full_complaint': 'string',
+    'status': 'category',
+    'recommendation_kz': 'string',
+    'timestamp_filed': 'datetime64[ns]',
+}
+
+# Ескі (create_dashboard.py күткен) өрістер -> қазіргі өрістер
+LEGACY_FIELDS = {
+    'Объект': 'object',
+    'Аспект': 'aspect',
+    'priority': 'severty',
+}
+
+
+def normalize_record(record):
+    """Бір жазбаны қазіргі схемаға келтіру (ескі 'tuple' пішімін ашу)."""
+    legacy = record.get('tuple')
+    if isinstance(legacy, dict):
+        record = {**legacy, **{k: v for k, v in record.items() if k != 'tuple'}}
+    if not any(old in record for old in LEGACY_FIELDS):
+        return record
+    record = dict(record)
+    for old, new in LEGACY_FIELDS.items():
+        if old in record:
+            value = record.pop(old)
+            if record.get(new) is None:
+                record[new] = value
+    if record.get('route_number') is None and isinstance(record.get('object'), str):
+        record['route_number'] = record['object'].replace('Маршрут', '').strip() or None
+    return record
+
+
+def normalize_frame(df):
+    """DataFrame деңгейінде ескі пішімді қазіргі өрістерге векторлы түрде келтіру.
+
+    Ішкі 'tuple' өрістері `tuple.<өріс>` бағандары ретінде күтіледі (Arrow
+    flatten / json_normalize); сөздіктер бағаны болса, алдымен сол пішімге ашылады.
+    """
+    if 'tuple' in df.columns:
+        nested = df['tuple']
+        mask = nested.notna()
+        expanded = pd.json_normalize(nested[mask].tolist()).add_prefix('tuple.').set_axis(df.index[mask])
+        df = df.drop(columns=['tuple']).join(expanded)
+    for nested_column in [c for c in df.columns if c.startswith('tuple.')]:
+        column = nested_column[len('tuple.'):]
+        values = df.pop(nested_column)
+        # Жоғарғы деңгейдегі мән басым (normalize_record сияқты)
+        df[column] = df[column].fillna(values) if column in df.columns else values
+    for old, new in LEGACY_FIELDS.items():
+        if old in df.columns:
+            df[new] = df[new].fillna(df[old]) if new in df.columns else df[old]
+            df = df.drop(columns=[old])
+    if 'object' in df.columns:
+        route = df['object'].astype('string').str.replace('Маршрут', '', regex=False).str.strip()
+        df['route_number'] = df['route_number'].fillna(route) if 'route_number' in df.columns else route
+    return df
+
+
+def cast_frame(df, columns=None):
+    """Өрістерді FIELD_DTYPES бойынша типтеу; жоқ бағандар бос болып қосылады."""
+    columns = list(columns or FIELD_DTYPES)
+    for column in columns:
+        dtype = FIELD_DTYPES.get(column, 'object')
+        if column not in df.columns:
+            df[column] = pd.Series(pd.NA if dtype != 'datetime64[ns]' else pd.NaT, index=df.index)
+        if dtype == 'datetime64[ns]':
+            df[column] = pd.to_datetime(df[column], errors='coerce', format='ISO8601')
+        elif dtype == 'category':
+            df[column] = df[column].astype('string').astype('category')
+        elif dtype == 'Int64':
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+        else:
+            df[column] = df[column].astype(dtype)
+    return df[columns]
+
+
+def apply_events(df, events):
+    """Статус оқиғаларын (ComplaintStore events журналы) кестеге қолдану."""
+    overrides = {}
+    for event in events:
+        overrides.setdefault(event.get('complaint_id'), {}).update(event.get('set', {}))
+    if not overrides or 'complaint_id' not in df.columns:
+        return df
+    fields = {field for fields in overrides.values() for field in fields}
+    for field in fields:
+        changed = {cid: f[field] for cid, f in overrides.items() if field in f}
+        new_values = df['complaint_id'].map(changed)
+        if field in df.columns:
+            if isinstance(df[field].dtype, pd.CategoricalDtype):
+                df[field] = df[field].astype('string')
+            df[field] = new_values.where(new_values.notna(), df[field])
+        else:
+            df[field] = new_values
+    return df
+
+
+def _read_events(events_path):
+    try:
+        with open(events_path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.endswith('\n') and line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _read_records(path):
+    if pa is not None:
+        try:
+            # Көп ағынды C++ JSON парсері; ескі 'tuple' struct-ы Arrow ішінде `tuple.<өріс>` бағандарына ашылады
+            return pa_json.read_json(path).flatten().to_pandas()
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    with open(path, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.endswith('\n') and line.strip()]
+    return pd.json_normalize(records, max_level=1)
+
+
+def load_frame(path, columns=None):
+    """JSONL журналын (ескі не жаңа пішімде) типтелген DataFrame ретінде жүктеу."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return cast_frame(pd.DataFrame(), columns)
+    df = normalize_frame(_read_records(path))
+    df = apply_events(df, _read_events(os.path.splitext(path)[0] + '.events.jsonl'))
+    return cast_frame(df, columns)
@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import shutil
+import sys
+from datetime import date
+
+from schema import cast_frame, normalize_record
+from storage import file_lock, read_log, read_tail, write_atomic
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+SNAPSHOT_DIR = 'complaints_snapshot'
+DICTIONARY_COLUMNS = ('object', 'route_number', 'aspect', 'severty', 'status')
+COLUMNS = (
+    ('complaint_id', 'int64'), ('user_id', 'int64'), ('жалобщик', 'string'), ('object', 'string'),
+    ('route_number', 'string'), ('date_time', 'string'), ('location', 'string'), ('aspect', 'string'),
+    ('description', 'string'), ('severty', 'string'), ('full_complaint', 'string'), ('status', 'string'),
+    ('recommendation_kz', 'string'), ('timestamp_filed', 'string'),
+)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Бағаналы snapshot үшін pyarrow қажет: pip install pyarrow")
+
+
+def _schema():
+    fields = []
+    for name, kind in COLUMNS:
+        if name in DICTIONARY_COLUMNS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, pa.int64() if kind == 'int64' else pa.string()))
+    return pa.schema(fields)
+
+
+def _to_table(records):
+    records = [normalize_record(r) for r in records]
+    schema = _schema()
+    columns = {}
+    for field in schema:
+        values = [r.get(field.name) for r in records]
+        if field.type == pa.int64():
+            values = [v if isinstance(v, int) else None for v in values]
+            columns[field.name] = pa.array(values, pa.int64())
+        else:
+            values = [None if v is None else str(v) for v in values]
+            array = pa.array(values, pa.string())
+            columns[field.name] = pc.dictionary_encode(array) if pa.types.is_dictionary(field.type) else array
+    return pa.table(columns, schema=schema)
+
+
+def _filed_date(record):
+    value = str(record.get('timestamp_filed') or '')[:10]
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        return 'unknown'
+
+
+def build_snapshot(db_path, out_dir=SNAPSHOT_DIR):
+    """JSONL қоймасын filed_date бойынша бөлінген Arrow IPC файлдарына жазу.
+
+    Файлдар сығылмаған IPC форматында, сондықтан оқу memory-map арқылы
+    көшірусіз (zero-copy) жүреді. manifest.json ішінде snapshot қай журнал
+    позициясына дейін жасалғаны сақталады.
+    """
+    _require_pyarrow()
+    # Тек оқу: жұмыс істеп тұрған бот жазып жатқан соңғы жолды кеспейді, журналды ықшамдамайды
+    records, _, (log_state, events_state) = read_log(db_path)
+    partitions = {}
+    for record in records:
+        partitions.setdefault(_filed_date(record), []).append(record)
+
+    tmp_dir = out_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    for day, rows in partitions.items():
+        part_dir = os.path.join(tmp_dir, f'filed_date={day}')
+        os.makedirs(part_dir)
+        with pa.OSFile(os.path.join(part_dir, 'part.arrow'), 'wb') as sink:
+            table = _to_table(rows)
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    manifest = {'db': os.path.abspath(db_path), 'log': list(log_state), 'events': list(events_state), 'rows': len(records),
+                'partitions': sorted(partitions)}
+    os.makedirs(tmp_dir, exist_ok=True)
+    write_atomic(os.path.join(tmp_dir, 'manifest.json'), [json.dumps(manifest)])
+    old_dir = out_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    logging.info(f"Snapshot '{out_dir}': {len(records)} шағым, {len(partitions)} партиция.")
+    return manifest
+
+
+def snapshot_exists(db_path, snapshot_dir=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(snapshot_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+            return json.load(f).get('db') == os.path.abspath(db_path)
+    except (FileNotFoundError, ValueError):
+        return False
+
+
+def read_table(db_path, columns=None, date_from=None, date_to=None, snapshot_dir=SNAPSHOT_DIR):
+    """Snapshot + одан кейін қосылған жолдар бір Arrow кестесі ретінде.
+
+    Тек керек бағандар оқылады; date_from/date_to (ISO күн) партицияларды
+    сүзеді. Snapshot-тан кейінгі статус өзгерістері де қолданылады. Журнал
+    ықшамдалып кетсе, толық JSONL оқуға көшеді.
+    """
+    _require_pyarrow()
+    columns = list(columns or [name for name, _ in COLUMNS])
+    read_columns = columns if 'complaint_id' in columns else columns + ['complaint_id']
+    try:
+        with open(os.path.join(snapshot_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = None
+    if manifest is not None and manifest.get('db') != os.path.abspath(db_path):
+        manifest = None
+
+    events_path = os.path.splitext(db_path)[0] + '.events.jsonl'
+    tables = []
+    with file_lock(db_path + '.lock', exclusive=False):
+        if manifest is not None:
+            tail = read_tail(db_path, *manifest['log'])
+            events = read_tail(events_path, *manifest['events'])
+            if tail[3] or events[3]:
+                logging.warning("Журнал snapshot-тан кейін ықшамдалған, толық оқу орындалады. Snapshot-ты қайта құрыңыз.")
+                manifest = None
+        if manifest is None:
+            tail = read_tail(db_path, 0, None)
+            events = read_tail(events_path, 0, None)
+
+    # Бір ID қайта жазылса соңғы жол жарамды (ComplaintStore сияқты)
+    new_rows = list({r.get('complaint_id'): r for r in tail[0]}.values())
+    if manifest is not None:
+        replaced = pa.array([r.get('complaint_id') for r in new_rows], pa.int64())
+        for day in manifest['partitions']:
+            if day != 'unknown' and ((date_from and day < date_from) or (date_to and day > date_to)):
+                continue
+            source = pa.memory_map(os.path.join(snapshot_dir, f'filed_date={day}', 'part.arrow'), 'r')
+            part = pa.ipc.open_file(source).read_all().select(read_columns)
+            if len(replaced):
+                part = part.filter(pc.invert(pc.is_in(part.column('complaint_id'), value_set=replaced)))
+            tables.append(part)
+
+    if date_from or date_to:
+        new_rows = [r for r in new_rows if (not date_from or _filed_date(r) >= date_from)
+                    and (not date_to or _filed_date(r) <= date_to)]
+    if new_rows:
+        tables.append(_to_table(new_rows).select(read_columns))
+    if not tables:
+        return _to_table([]).select(columns)
+    table = pa.concat_tables(tables)
+
+    overrides = {}
+    for event in events[0]:
+        overrides.setdefault(event.get('complaint_id'), {}).update(event.get('set', {}))
+    for name in columns:
+        changed = {cid: fields[name] for cid, fields in overrides.items() if name in fields}
+        if not changed or name == 'complaint_id':
+            continue
+        table = _overlay(table, name, changed)
+    return table.select(columns)
+
+
+def _overlay(table, name, changed):
+    """Бағандағы changed {complaint_id: мән} мәндерін Arrow compute арқылы ауыстыру."""
+    keys = pa.array(list(changed), pa.int64())
+    if dict(COLUMNS).get(name) == 'int64':
+        values = pa.array([v if isinstance(v, int) else None for v in changed.values()], pa.int64())
+    else:
+        values = pa.array([None if v is None else str(v) for v in changed.values()], pa.string())
+    positions = pc.index_in(table.column('complaint_id'), value_set=keys)
+    original = table.column(name)
+    if name in DICTIONARY_COLUMNS:
+        original = original.cast(pa.string())
+    merged = pc.if_else(pc.is_valid(positions), pc.take(values, positions), original)
+    if name in DICTIONARY_COLUMNS:
+        merged = pc.dictionary_encode(merged)
+    return table.set_column(table.schema.get_field_index(name), name, merged)
+
+
+def read_frame(db_path, columns=None, **kwargs):
+    """read_table нәтижесі типтелген pandas DataFrame ретінде (сөздік бағандар -> category)."""
+    df = read_table(db_path, columns, **kwargs).to_pandas()
+    return cast_frame(df, list(df.columns))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2 or sys.argv[1] not in ('build', 'query'):
+        print("Қолданылуы: python snapshot.py build | query [баған ...]")
+        sys.exit(1)
+    if sys.argv[1] == 'build':
+        build_snapshot('complaints_db.jsonl')
+    else:
+        print(read_frame('complaints_db.jsonl', sys.argv[2:] or None))
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS complaints (
+    complaint_id INTEGER PRIMARY KEY,
+    user_id INTEGER,
+    route_number TEXT,
+    status TEXT,
+    timestamp_filed TEXT,
+    data TEXT NOT NULL,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_complaints_status ON complaints (status, complaint_id);
+CREATE INDEX IF NOT EXISTS idx_complaints_route ON complaints (route_number);
+CREATE INDEX IF NOT EXISTS idx_complaints_user ON complaints (user_id);
+CREATE INDEX IF NOT EXISTS idx_complaints_filed ON complaints (timestamp_filed);
+CREATE INDEX IF NOT EXISTS idx_complaints_severity ON complaints (status, json_extract(data, '$.severty'), complaint_id);
+"""
+
+# Әр қосылған/өзгерген жолға өспелі `revision`: дашборд тек су белгісінен кейінгі жолдарды оқиды.
+# Триггер барлық жазушыны қамтиды (бот, rescore json_patch, migrate_jsonl).
+REVISION_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_complaints_revision ON complaints (revision);
+CREATE TRIGGER IF NOT EXISTS complaints_revision_insert AFTER INSERT ON complaints BEGIN
+    UPDATE complaints SET revision = (SELECT COALESCE(MAX(revision), 0) + 1 FROM complaints)
+    WHERE complaint_id = NEW.complaint_id;
+END;
+CREATE TRIGGER IF NOT EXISTS complaints_revision_update AFTER UPDATE OF data ON complaints BEGIN
+    UPDATE complaints SET revision = (SELECT COALESCE(MAX(revision), 0) + 1 FROM complaints)
+    WHERE complaint_id = NEW.complaint_id;
+END;
+"""
+
+INSERT_SQL = (
+    "INSERT INTO complaints "
+    "(complaint_id, user_id, route_number, status, timestamp_filed, data) VALUES (?, ?, ?, ?, ?, ?)"
+)
+UPDATE_SQL = (
+    "UPDATE complaints SET user_id = ?, route_number = ?, status = ?, timestamp_filed = ?, data = ? "
+    "WHERE complaint_id = ?"
+)
+
+
+def to_row(record):
+    return (
+        record['complaint_id'], record.get('user_id'), record.get('route_number'),
+        record.get('status'), record.get('timestamp_filed'),
+        json.dumps(record, ensure_ascii=False),
+    )
+
+
+class SqliteComplaintStore:
+    """SQLite (WAL) шағымдар қоймасы.
+
+    ComplaintStore-пен бірдей async интерфейс. Барлық SQL бір арнайы
+    ағында (thread) орындалады, сондықтан aiogram handler-лері дискіні
+    күтпейді. Жазба схемасы өзгермейді: толық жазба `data` бағанында
+    JSON күйінде, іздеуге қажет өрістер бөлек индекстелген бағандарда.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = 0
+        self._conn = None
+        self._executor = None
+
+    async def start(self):
+        if self._executor is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-store')
+        await self._run(self._connect)
+
+    async def close(self):
+        if self._executor is None:
+            return
+        await self._run(self._conn.close)
+        self._executor.shutdown()
+        self._executor = None
+
+    async def append(self, record):
+        try:
+            await self._run(self._execute, INSERT_SQL, to_row(record))
+        except sqlite3.IntegrityError:
+            # Бар жазбаның үстіне жазбау: ID қақтығысы шақырушыға көрінуі керек
+            logging.error(f"Шағым #{record['complaint_id']} қоймада бұрыннан бар, жаңа жазба сақталмады.")
+            raise
+        self.version += 1
+
+    async def update_status(self, complaint_id, status):
+        return await self.update(complaint_id, status=status)
+
+    async def update(self, complaint_id, **fields):
+        record = await self._run(self._update, complaint_id, fields)
+        if record is not None:
+            self.version += 1
+        return record
+
+    async def get(self, complaint_id):
+        rows = await self._run(self._query, "SELECT data FROM complaints WHERE complaint_id = ?", (complaint_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    async def by_status(self, status, limit=None):
+        rows = await self._run(
+            self._query,
+            "SELECT data FROM complaints WHERE status = ? ORDER BY complaint_id DESC LIMIT ?",
+            (status, -1 if limit is None else limit),
+        )
+        return [json.loads(data) for data, in rows]
+
+    async def page(self, status, filters=None, rank=None, after=None, limit=5):
+        """ComplaintStore.page сияқты, бірақ сүзу мен сұрыптау SQL индекстерінде."""
+        filters = filters or {}
+        where, params = ["status = ?"], [status]
+        if filters.get('route') is not None:
+            where.append("route_number = ?")
+            params.append(str(filters['route']))
+        if filters.get('aspect') is not None:
+            where.append("json_extract(data, '$.aspect') = ?")
+            params.append(filters['aspect'])
+        if filters.get('severity') is not None:
+            where.append("json_extract(data, '$.severty') = ?")
+            params.append(filters['severity'])
+        if filters.get('date_from'):
+            where.append("timestamp_filed >= ?")
+            params.append(filters['date_from'])
+        if filters.get('date_to'):
+            where.append("timestamp_filed < ?")
+            params.append((date.fromisoformat(filters['date_to']) + timedelta(days=1)).isoformat())
+        if rank:
+            level = "CASE json_extract(data, '$.severty') " + "WHEN ? THEN ? " * len(rank) + "ELSE ? END"
+            level_params = [v for item in rank.items() for v in item] + [len(rank)]
+        else:
+            level, level_params = "0", []
+        if after is not None:
+            where.append(f"({level} > ? OR ({level} = ? AND complaint_id < ?))")
+            params += level_params + [after[0]] + level_params + [after[0], -after[1]]
+        sql = (f"SELECT {level} AS level, data FROM complaints WHERE {' AND '.join(where)} "
+               f"ORDER BY level, complaint_id DESC LIMIT ?")
+        rows = await self._run(self._query, sql, level_params + params + [limit + 1])
+        records = [json.loads(data) for _, data in rows[:limit]]
+        next_cursor = (rows[limit - 1][0], -records[-1]['complaint_id']) if len(rows) > limit else None
+        return records, next_cursor
+
+    async def current_version(self):
+        """Ең үлкен `revision`: кез келген процестің жазуынан кейін өседі."""
+        rows = await self._run(self._query, "SELECT COALESCE(MAX(revision), 0) FROM complaints", ())
+        return rows[0][0]
+
+    async def count(self, status=None):
+        if status is None:
+            rows = await self._run(self._query, "SELECT COUNT(*) FROM complaints", ())
+        else:
+            rows = await self._run(self._query, "SELECT COUNT(*) FROM complaints WHERE status = ?", (status,))
+        return rows[0][0]
+
+    async def all_records(self):
+        rows = await self._run(self._query, "SELECT data FROM complaints ORDER BY complaint_id", ())
+        return [json.loads(data) for data, in rows]
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            await self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _connect(self):
+        self._conn = connect(self.path)
+
+    def _execute(self, sql, params):
+        with self._conn:
+            self._conn.execute(sql, params)
+
+    def _query(self, sql, params):
+        return self._conn.execute(sql, params).fetchall()
+
+    def _update(self, complaint_id, fields):
+        with self._conn:
+            row = self._conn.execute("SELECT data FROM complaints WHERE complaint_id = ?", (complaint_id,)).fetchone()
+            if row is None:
+                return None
+            record = json.loads(row[0])
+            record.update(fields)
+            row = to_row(record)
+            self._conn.execute(UPDATE_SQL, row[1:] + row[:1])
+            return record
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(complaints)")]
+    if 'revision' not in columns:
+        # revision бағанынан бұрынғы қойма: ескі жолдар 0, дашборд оларды бірінші рет толық оқиды
+        conn.execute("ALTER TABLE complaints ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+    conn.executescript(REVISION_SCHEMA)
+    return conn
+
+
+def read_jsonl(jsonl_path):
+    """Журнал мен оқиғаларды тек оқу: (жазбалар, ығыстырылған жолдар), соңғы жол негізгі."""
+    from storage import read_log
+
+    records, shadowed, _ = read_log(jsonl_path)
+    return records, shadowed
+
+
+def migrate_jsonl(jsonl_path, sqlite_path, batch_size=5000):
+    """complaints_db.jsonl (және оның оқиғалар журналын) SQLite-қа бір рет көшіру.
+
+    Бар жолдардың үстіне жазылмайды: ID қақтығыстары тізімі логқа шығады.
+    (көшірілген, қақтығыстар) қайтарады.
+    """
+    records, shadowed = read_jsonl(jsonl_path)
+    conflicts = [r.get('complaint_id') for r in shadowed]
+    inserted = 0
+    conn = connect(sqlite_path)
+    try:
+        for i in range(0, len(records), batch_size):
+            with conn:
+                for record in records[i:i + batch_size]:
+                    try:
+                        conn.execute(INSERT_SQL, to_row(record))
+                        inserted += 1
+                    except sqlite3.IntegrityError:
+                        conflicts.append(record['complaint_id'])
+    finally:
+        conn.close()
+    logging.info(f"'{jsonl_path}' -> '{sqlite_path}': {inserted} шағым көшірілді.")
+    if conflicts:
+        logging.warning(f"ID қақтығысы, көшірілмеді ({len(conflicts)}): "
+                        f"{', '.join(f'#{cid}' for cid in conflicts[:20])}")
+    return inserted, conflicts
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 3:
+        print("Қолданылуы: python sqlite_store.py complaints_db.jsonl complaints_db.sqlite3")
+        sys.exit(1)
+    migrate_jsonl(sys.argv[1], sys.argv[2])
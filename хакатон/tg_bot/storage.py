@@ -0,0 +1,425 @@
+import asyncio
+import heapq
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path, exclusive):
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def read_tail(path, pos, ino):
+    """pos-тан бастап толық жолдарды оқиды.
+
+    (жазбалар, жаңа pos, inode, файл ауыстырылды ма) қайтарады.
+    """
+    reset = False
+    try:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if (ino is not None and st.st_ino != ino) or st.st_size < pos:
+                pos, reset = 0, True
+            f.seek(pos)
+            data = f.read()
+            ino = st.st_ino
+    except FileNotFoundError:
+        return [], 0, None, ino is not None
+    end = data.rfind(b'\n') + 1
+    lines = []
+    for raw in data[:end].splitlines():
+        if raw.strip():
+            try:
+                lines.append(json.loads(raw))
+            except ValueError:
+                logging.error(f"'{path}' ішінде бүлінген жол өткізілді.")
+    return lines, pos + end, ino, reset
+
+
+def read_log(path):
+    """Журнал мен оқиғаларды тек оқу (ортақ құлыппен): файлдар кесілмейді, ықшамдалмайды.
+
+    Қайталанған ID болса, ComplaintStore сияқты соңғы жол негізгі болады.
+    (жазбалар, ығыстырылған жолдар, (log_state, events_state)) қайтарады.
+    """
+    events_path = os.path.splitext(path)[0] + '.events.jsonl'
+    with file_lock(path + '.lock', exclusive=False):
+        rows, log_pos, log_ino, _ = read_tail(path, 0, None)
+        events, ev_pos, ev_ino, _ = read_tail(events_path, 0, None)
+    latest, shadowed = {}, []
+    for record in rows:
+        old = latest.get(record.get('complaint_id'))
+        if old is not None:
+            shadowed.append(old)
+        latest[record.get('complaint_id')] = record
+    for event in events:
+        record = latest.get(event.get('complaint_id'))
+        if record is not None:
+            record.update(event.get('set', {}))
+    return list(latest.values()), shadowed, ((log_pos, log_ino), (ev_pos, ev_ino))
+
+
+def _truncate_partial_line(path):
+    try:
+        with open(path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            # Соңғы толық жолдың шекарасын табу
+            pos = size
+            while pos > 0:
+                step = min(65536, pos)
+                pos -= step
+                f.seek(pos)
+                idx = f.read(step).rfind(b'\n')
+                if idx != -1:
+                    pos += idx + 1
+                    break
+            f.truncate(pos)
+            f.flush()
+            os.fsync(f.fileno())
+            logging.warning(f"'{path}' соңындағы жартылай жол кесілді ({size - pos} байт).")
+    except FileNotFoundError:
+        pass
+
+
+def append_lines(path, lock_path, lines):
+    """Жолдарды бір write + fsync арқылы қосу (ықшамдаумен бірге жүрмейді)."""
+    with file_lock(lock_path, exclusive=False):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def event_line(complaint_id, fields, prev):
+    return json.dumps({'complaint_id': complaint_id, 'set': fields, 'prev': prev,
+                       'ts': datetime.now().isoformat()}, ensure_ascii=False) + '\n'
+
+
+def matches(record, filters):
+    """Админ сүзгілері: route, aspect, severity, date_from, date_to (filed-күні, YYYY-MM-DD)."""
+    if filters.get('route') is not None and str(record.get('route_number')) != str(filters['route']):
+        return False
+    if filters.get('aspect') is not None and record.get('aspect') != filters['aspect']:
+        return False
+    if filters.get('severity') is not None and record.get('severty') != filters['severity']:
+        return False
+    day = str(record.get('timestamp_filed') or '')[:10]
+    if filters.get('date_from') and day < filters['date_from']:
+        return False
+    if filters.get('date_to') and day > filters['date_to']:
+        return False
+    return True
+
+
+def sort_key(record, rank=None):
+    """Бет курсорының кілті: (маңыздылық реті, -complaint_id); rank жоқ болса тек ең жаңасы бірінші."""
+    level = rank.get(record.get('severty'), len(rank)) if rank else 0
+    return level, -record['complaint_id']
+
+
+def write_atomic(path, lines):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(''.join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def open_store(path, backend=None):
+    """DB_BACKEND бойынша қойма: 'jsonl' (әдепкі) немесе 'sqlite'."""
+    backend = backend or os.getenv("DB_BACKEND", "jsonl")
+    if backend == 'sqlite':
+        from sqlite_store import SqliteComplaintStore
+        return SqliteComplaintStore(os.getenv("SQLITE_FILE", os.path.splitext(path)[0] + '.sqlite3'))
+    if backend != 'jsonl':
+        raise ValueError(f"Белгісіз DB_BACKEND: {backend}")
+    return ComplaintStore(path)
+
+
+class ComplaintStore:
+    """Append-only JSONL шағымдар қоймасы, жадтағы индекстермен.
+
+    Шағымдар негізгі журналға, статус өзгерістері бөлек оқиғалар
+    журналына (`*.events.jsonl`) қосылады. Барлық жазу бір writer-тапсырма
+    арқылы топтап (batch) өтеді және бір fsync-пен бекітіледі. Индекс
+    `complaint_id` және статус бойынша жадта ұсталады, журналдардың тек
+    жаңа бөлігі оқылады, сондықтан бір файлды бірнеше процесс бөлісе алады.
+    Оқиғалар журналы `compact_every` жазбадан асқанда негізгі журналға
+    біріктіріледі. Ескі `int(timestamp)` ID-лері қайталанса, индекс тек
+    соңғы жолды көрсетеді: мұндай журнал ықшамдалмайды, әйтпесе алдыңғы
+    жол дискіден жойылар еді.
+    """
+
+    def __init__(self, path, max_batch=256, flush_interval=0.01, compact_every=10000):
+        self.path = path
+        self.events_path = os.path.splitext(path)[0] + '.events.jsonl'
+        self.lock_path = path + '.lock'
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.version = 0
+        self._records = {}
+        self._by_status = {}
+        self._log_state = (0, None)
+        self._events_state = (0, None)
+        self._events_seen = 0
+        self.duplicate_ids = set()
+        self._queue = None
+        self._writer = None
+        self._sync_lock = None
+        self._compacting = None
+
+    async def start(self):
+        if self._writer is not None:
+            return
+        self._sync_lock = asyncio.Lock()
+        await asyncio.to_thread(self._recover)
+        await self._sync()
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop())
+        if self._events_seen >= self.compact_every and not self.duplicate_ids:
+            await self.compact()
+
+    async def close(self):
+        if self._writer is None:
+            return
+        if self._compacting is not None:
+            await self._compacting
+        await self._queue.put(None)
+        await self._writer
+        self._writer = None
+
+    async def append(self, record):
+        await self._submit(self.path, record)
+        await self._sync()
+
+    async def update_status(self, complaint_id, status):
+        return await self.update(complaint_id, status=status)
+
+    async def update(self, complaint_id, **fields):
+        await self._sync()
+        record = self._records.get(complaint_id)
+        if record is None:
+            return None
+        line = event_line(complaint_id, fields, {k: record.get(k) for k in fields})
+        await self._submit_line(self.events_path, line)
+        await self._sync()
+        if self._events_seen >= self.compact_every and self._compacting is None and not self.duplicate_ids:
+            self._compacting = asyncio.create_task(self.compact())
+        return self._records.get(complaint_id)
+
+    async def get(self, complaint_id):
+        await self._sync()
+        return self._records.get(complaint_id)
+
+    async def by_status(self, status, limit=None):
+        """Берілген статустағы шағымдар, ең жаңасы бірінші."""
+        await self._sync()
+        ids = self._by_status.get(status, {})
+        result = []
+        for cid in reversed(ids):
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(self._records[cid])
+        return result
+
+    async def page(self, status, filters=None, rank=None, after=None, limit=5):
+        """Курсорлы бет: (жазбалар, келесі бет курсоры немесе None).
+
+        Курсор — алдыңғы беттің соңғы жазбасының sort_key мәні.
+        """
+        await self._sync()
+        filters = filters or {}
+        candidates = (self._records[cid] for cid in self._by_status.get(status, ()))
+        found = heapq.nsmallest(
+            limit + 1,
+            (r for r in candidates if matches(r, filters) and (after is None or sort_key(r, rank) > tuple(after))),
+            key=lambda r: sort_key(r, rank),
+        )
+        next_cursor = sort_key(found[limit - 1], rank) if len(found) > limit else None
+        return found[:limit], next_cursor
+
+    async def current_version(self):
+        """Басқа процестердің жазуларын оқып, индекс нұсқасын қайтару."""
+        await self._sync()
+        return self.version
+
+    async def count(self, status=None):
+        await self._sync()
+        if status is None:
+            return len(self._records)
+        return len(self._by_status.get(status, ()))
+
+    async def all_records(self):
+        await self._sync()
+        return list(self._records.values())
+
+    async def checkpoint(self):
+        """Барлық жазбалар және оларға сәйкес журнал позициялары (log, events)."""
+        await self._sync()
+        return list(self._records.values()), (self._log_state, self._events_state)
+
+    async def compact(self):
+        try:
+            async with self._sync_lock:
+                for _ in range(3):
+                    self._apply_tails(await asyncio.to_thread(self._read_tails))
+                    if self.duplicate_ids:
+                        logging.error(f"'{self.path}' ықшамдалмады: қайталанған ID бар "
+                                      f"({len(self.duplicate_ids)}), жолдар жоғалмауы үшін журнал өзгертілмейді.")
+                        return
+                    if await asyncio.to_thread(self._compact_blocking):
+                        logging.info(f"'{self.path}' ықшамдалды: {len(self._records)} шағым.")
+                        return
+        finally:
+            self._compacting = None
+
+    def _compact_blocking(self):
+        with file_lock(self.lock_path, exclusive=True):
+            log, events = self._read_tails(locked=True)
+            if log[0] or events[0] or log[3] or events[3]:
+                # Арада басқа процесс жазды — қайталап көреміз
+                return False
+            write_atomic(self.path, [json.dumps(r, ensure_ascii=False) + '\n' for r in self._records.values()])
+            write_atomic(self.events_path, [])
+            st = os.stat(self.path)
+            self._log_state = (st.st_size, st.st_ino)
+            self._events_state = (0, os.stat(self.events_path).st_ino)
+            self._events_seen = 0
+            return True
+
+    def _recover(self):
+        with file_lock(self.lock_path, exclusive=True):
+            _truncate_partial_line(self.path)
+            _truncate_partial_line(self.events_path)
+
+    async def _sync(self):
+        if self._sync_lock is None:
+            await self.start()
+            return
+        async with self._sync_lock:
+            tails = await asyncio.to_thread(self._read_tails)
+            self._apply_tails(tails)
+
+    def _read_tails(self, locked=False):
+        def read():
+            log = read_tail(self.path, *self._log_state)
+            events = read_tail(self.events_path, *self._events_state)
+            return log, events
+        if locked:
+            return read()
+        with file_lock(self.lock_path, exclusive=False):
+            return read()
+
+    def _apply_tails(self, tails):
+        (records, log_pos, log_ino, log_reset), (events, ev_pos, ev_ino, ev_reset) = tails
+        if log_reset and self._records:
+            # Журнал ауыстырылды (ықшамдау) — индексті қайта құру
+            self._records.clear()
+            self._by_status.clear()
+            self.duplicate_ids.clear()
+            if not ev_reset:
+                events_all = read_tail(self.events_path, 0, ev_ino)
+                events, ev_pos = events_all[0], events_all[1]
+            self._events_seen = 0
+        elif ev_reset:
+            self._events_seen = 0
+        for record in records:
+            cid = record.get('complaint_id')
+            if cid in self._records:
+                if cid not in self.duplicate_ids:
+                    logging.warning(f"'{self.path}': #{cid} ID-і қайталанады, тек соңғы жол оқылады; "
+                                    f"ықшамдау өшірілді.")
+                self.duplicate_ids.add(cid)
+            self._index(record)
+        for event in events:
+            record = self._records.get(event.get('complaint_id'))
+            if record is None:
+                continue
+            self._unindex(record)
+            record.update(event.get('set', {}))
+            self._index(record)
+        self._events_seen += len(events)
+        self._log_state = (log_pos, log_ino)
+        self._events_state = (ev_pos, ev_ino)
+        if records or events:
+            self.version += 1
+
+    def _index(self, record):
+        cid = record.get('complaint_id')
+        old = self._records.get(cid)
+        if old is not None and old is not record:
+            self._unindex(old)
+        self._records[cid] = record
+        self._by_status.setdefault(record.get('status'), {})[cid] = None
+
+    def _unindex(self, record):
+        bucket = self._by_status.get(record.get('status'))
+        if bucket is not None:
+            bucket.pop(record.get('complaint_id'), None)
+
+    async def _submit(self, path, item):
+        await self._submit_line(path, json.dumps(item, ensure_ascii=False) + '\n')
+
+    async def _submit_line(self, path, line):
+        if self._writer is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((path, line, future))
+        await future
+
+    def _write_batch(self, batch):
+        by_path = {}
+        for path, line, _ in batch:
+            by_path.setdefault(path, []).append(line)
+        for path, lines in by_path.items():
+            append_lines(path, self.lock_path, lines)
+
+    async def _write_loop(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            if self.flush_interval:
+                await asyncio.sleep(self.flush_interval)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                logging.error(f"DB жазу қатесі (ComplaintStore): {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result(None)
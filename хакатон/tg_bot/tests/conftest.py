@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Бот модульдері жалпақ импортталады (python bot.py сияқты)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
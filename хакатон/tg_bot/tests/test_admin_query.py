@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from admin_query import SEVERITY_RANK, AdminQuery, format_cursor, parse_cursor, parse_filters
+from rules import SEVERITY_ORDER
+from storage import matches, open_store, sort_key
+
+
+def test_parse_filters_normalizes_values():
+    filters = parse_filters('/admin route=12 aspect="Уақытылы келу" severity=Шұғыл from=2025-03-01 to=2025-03-31 '
+                            'sort=severity unknown=1')
+    assert filters == {'route': '12', 'aspect': 'Уақытылы келу', 'severity': 'Шұғыл',
+                       'date_from': '2025-03-01', 'date_to': '2025-03-31', 'sort': 'severity'}
+    assert parse_filters('/admin aspect=Уақытылы_келу') == {'aspect': 'Уақытылы келу'}
+
+
+@pytest.mark.parametrize('text', ['/admin to=31.03.2025', '/admin from=2025-13-01', '/resolve_all to=ертең'])
+def test_parse_filters_rejects_bad_dates(text):
+    with pytest.raises(ValueError):
+        parse_filters(text)
+
+
+def test_cursor_round_trip():
+    assert parse_cursor(format_cursor((2, -123))) == (2, -123)
+    assert parse_cursor('') is None
+
+
+def make_records():
+    severities = SEVERITY_ORDER + ['белгісіз']
+    return [{'complaint_id': i, 'user_id': i % 7, 'status': 'new' if i % 4 else 'done',
+             'route_number': str(i % 3), 'aspect': 'Төлем' if i % 2 else 'Басқа',
+             'severty': severities[i % len(severities)],
+             'timestamp_filed': f"2025-01-{1 + i % 28:02d}T10:00:00"} for i in range(1, 60)]
+
+
+async def open_filled(backend, tmp_path):
+    store = open_store(str(tmp_path / 'db.jsonl'), backend=backend)
+    await store.start()
+    for record in make_records():
+        await store.append(record)
+    return store
+
+
+def expected(filters, rank):
+    records = [r for r in make_records() if r['status'] == 'new' and matches(r, filters)]
+    return [r['complaint_id'] for r in sorted(records, key=lambda r: sort_key(r, rank))]
+
+
+@pytest.mark.parametrize('backend', ['jsonl', 'sqlite'])
+@pytest.mark.parametrize('rank', [None, SEVERITY_RANK])
+@pytest.mark.parametrize('filters', [{}, {'route': '1'}, {'aspect': 'Төлем', 'date_from': '2025-01-05'},
+                                     {'severity': 'Шұғыл'}, {'date_to': '2025-01-10'}])
+def test_page_walks_to_the_end(backend, rank, filters, tmp_path, monkeypatch):
+    monkeypatch.delenv('SQLITE_FILE', raising=False)
+
+    async def run():
+        store = await open_filled(backend, tmp_path)
+        seen, cursor = [], None
+        try:
+            while True:
+                records, cursor = await store.page('new', filters, rank, cursor, 4)
+                assert len(records) <= 4
+                seen += [r['complaint_id'] for r in records]
+                if cursor is None:
+                    return seen
+        finally:
+            await store.close()
+
+    assert asyncio.run(run()) == expected(filters, rank)
+
+
+@pytest.mark.parametrize('backend', ['jsonl', 'sqlite'])
+def test_cache_follows_writes_from_other_instances(backend, tmp_path, monkeypatch):
+    monkeypatch.delenv('SQLITE_FILE', raising=False)
+
+    async def run():
+        store = await open_filled(backend, tmp_path)
+        other = open_store(str(tmp_path / 'db.jsonl'), backend=backend)
+        await other.start()
+        query = AdminQuery(store, page_size=3)
+        try:
+            first, _ = await query.page('new', {'sort': 'severity'})
+            cached, _ = await query.page('new', {'sort': 'severity'})
+            # Басқа процесс сияқты: бөлек дана статусты өзгертеді
+            await other.update_status(first[0]['complaint_id'], 'done')
+            after, _ = await query.page('new', {'sort': 'severity'})
+            return first, cached, after
+        finally:
+            await other.close()
+            await store.close()
+
+    first, cached, after = asyncio.run(run())
+    assert cached is first
+    assert after[0]['complaint_id'] != first[0]['complaint_id']
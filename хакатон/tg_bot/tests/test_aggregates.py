@@ -0,0 +1,59 @@
+import json
+import os
+
+from aggregates import Aggregates
+
+
+def complaint(complaint_id, status='new', route='12'):
+    return {'complaint_id': complaint_id, 'object': f"Маршрут {route}", 'route_number': route,
+            'aspect': 'Төлем', 'severty': 'Орташа', 'status': status}
+
+
+def append(path, *rows):
+    with open(path, 'a', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def test_resumes_from_saved_offset(tmp_path):
+    db, state = str(tmp_path / 'db.jsonl'), str(tmp_path / 'state.json')
+    append(db, complaint(1), complaint(2))
+    assert Aggregates(db, state).refresh() == 2
+    offset = os.path.getsize(db)
+
+    append(db, complaint(3, route='7'))
+    resumed = Aggregates(db, state)
+    assert resumed.total == 2 and resumed.log_state[0] == offset
+    assert resumed.refresh() == 1
+    assert resumed.refresh() == 0
+    assert resumed.total == 3
+    assert dict(resumed.counters['route']) == {'Маршрут 12': 2, 'Маршрут 7': 1}
+
+
+def test_status_events_move_counters(tmp_path):
+    db, state = str(tmp_path / 'db.jsonl'), str(tmp_path / 'state.json')
+    events = str(tmp_path / 'db.events.jsonl')
+    append(db, complaint(1), complaint(2))
+    aggregates = Aggregates(db, state)
+    aggregates.refresh()
+    append(events, {'complaint_id': 1, 'set': {'status': 'done'}, 'prev': {'status': 'new'}, 'ts': 1})
+    assert aggregates.refresh() == 1
+    assert dict(aggregates.counters['status']) == {'new': 1, 'done': 1}
+    assert Aggregates(db, state).counters['status'] == aggregates.counters['status']
+
+
+def test_compacted_log_is_recounted(tmp_path):
+    db, state = str(tmp_path / 'db.jsonl'), str(tmp_path / 'state.json')
+    events = str(tmp_path / 'db.events.jsonl')
+    append(db, complaint(1), complaint(2))
+    append(events, {'complaint_id': 1, 'set': {'status': 'done'}, 'prev': {'status': 'new'}, 'ts': 1})
+    aggregates = Aggregates(db, state)
+    aggregates.refresh()
+    # Ықшамдау: оқиғалар журналға енгізіліп, екі файл да жаңа inode-пен ауыстырылады
+    tmp = db + '.tmp'
+    append(tmp, complaint(1, status='done'), complaint(2))
+    os.replace(tmp, db)
+    open(events, 'w').close()
+    aggregates.refresh()
+    assert aggregates.total == 2
+    assert dict(aggregates.counters['status']) == {'new': 1, 'done': 1}
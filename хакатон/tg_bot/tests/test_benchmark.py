@@ -0,0 +1,7 @@
+from benchmark import summarize
+
+
+def test_p99_is_nearest_rank():
+    assert summarize([0.001], 1)['p99_ms'] == 1.0
+    assert summarize([i / 1000 for i in range(1, 11)], 1)['p99_ms'] == 10.0
+    assert summarize([i / 1000 for i in range(1, 201)], 1)['p99_ms'] == 198.0
@@ -0,0 +1,61 @@
+import json
+import os
+import threading
+
+import pytest
+
+from classifier import SAMPLES, KeywordClassifier
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return KeywordClassifier()
+
+
+@pytest.mark.parametrize('text, severity, aspect', SAMPLES)
+def test_samples(classifier, text, severity, aspect):
+    assert classifier.classify(text) == (severity, aspect)
+
+
+@pytest.mark.parametrize('text, severity, aspect', [
+    ("Водитель сбился с маршрута", None, 'Қызметкер әрекеті'),
+    ("Водитель сбил пешехода на переходе", 'Шұғыл', 'Қызметкер әрекеті'),
+    ("Толық ақпарат аялдамада жоқ", None, None),
+    ("На остановке висит картина, ласточка на крыше", None, None),
+    ("Картаны терминал оқымады", None, 'Төлем'),
+    ("Салон ластанған", None, 'Автобус жағдайы'),
+])
+def test_short_stems_do_not_match_unrelated_words(classifier, text, severity, aspect):
+    assert classifier.classify(text) == (severity, aspect)
+
+
+def test_reload_swaps_pattern_and_terms_together(tmp_path):
+    path = tmp_path / 'keywords.json'
+
+    def write(words):
+        path.write_text(json.dumps({'severity': [{'level': 'Шұғыл', 'keywords': words}], 'aspects': {}}),
+                        encoding='utf-8')
+
+    write(['апат'])
+    clf = KeywordClassifier(str(path), reload_interval=0)
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            try:
+                clf.classify("апат өрт жарақат")
+            except Exception as e:
+                errors.append(e)
+                return
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for i in range(200):
+        write(['апат'] if i % 2 else ['өрт', 'жарақат'])
+        os.utime(path, ns=(i * 10**9, i * 10**9))
+        clf._checked = 0.0
+        clf._maybe_reload()
+    stop.set()
+    reader.join()
+    assert errors == []
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import sqlite3
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+pytest.importorskip('matplotlib')
+
+from aggregates import SqliteAggregates
+from dashboard_server import Dashboard, create_dashboard_app
+from sqlite_store import SqliteComplaintStore, connect
+
+
+def complaint(complaint_id, status='new', route='12'):
+    return {'complaint_id': complaint_id, 'user_id': 1, 'object': f"Маршрут {route}", 'route_number': route,
+            'aspect': 'Төлем', 'severty': 'Орташа', 'status': status, 'timestamp_filed': '2025-01-01T10:00:00'}
+
+
+def test_sqlite_aggregates_read_only_changed_rows(tmp_path):
+    path = str(tmp_path / 'db.sqlite3')
+
+    async def run():
+        store = SqliteComplaintStore(path)
+        await store.start()
+        aggregates = SqliteAggregates(path)
+        try:
+            for i in range(1, 4):
+                await store.append(complaint(i))
+            assert aggregates.refresh() == 3
+            assert aggregates.refresh() == 0
+            await store.update_status(2, 'done')
+            await store.append(complaint(4, route='7'))
+            assert aggregates.refresh() == 2
+            return aggregates.total, dict(aggregates.counters['status']), dict(aggregates.counters['route'])
+        finally:
+            aggregates.close()
+            await store.close()
+
+    total, status, route = asyncio.run(run())
+    assert total == 4
+    assert status == {'new': 3, 'done': 1}
+    assert route == {'Маршрут 12': 3, 'Маршрут 7': 1}
+
+
+def test_database_without_revision_column_is_migrated(tmp_path):
+    path = str(tmp_path / 'old.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE complaints (complaint_id INTEGER PRIMARY KEY, user_id INTEGER, route_number TEXT, "
+                 "status TEXT, timestamp_filed TEXT, data TEXT NOT NULL)")
+    conn.execute("INSERT INTO complaints VALUES (1, 1, '12', 'new', '2025-01-01', '{\"status\": \"new\"}')")
+    conn.commit()
+    conn.close()
+
+    aggregates = SqliteAggregates(path)
+    assert aggregates.refresh() == 1
+    conn = connect(path)
+    with conn:
+        conn.execute("UPDATE complaints SET data = json_patch(data, '{\"status\": \"done\"}') WHERE complaint_id = 1")
+    conn.close()
+    assert aggregates.refresh() == 1
+    assert dict(aggregates.counters['status']) == {'done': 1}
+    aggregates.close()
+
+
+def test_summary_charts_and_events(tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DB_BACKEND', 'sqlite')
+    monkeypatch.delenv('SQLITE_FILE', raising=False)
+    path = str(tmp_path / 'complaints_db.sqlite3')
+
+    async def run():
+        store = SqliteComplaintStore(path)
+        await store.start()
+        await store.append(complaint(1))
+        dashboard = Dashboard(str(tmp_path / 'complaints_db.jsonl'), interval=0.05)
+        runner = web.AppRunner(create_dashboard_app(dashboard))
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f'{base}/api/summary') as resp:
+                    summary = await resp.json()
+                    etag = resp.headers['ETag']
+                async with session.get(f'{base}/api/summary', headers={'If-None-Match': etag}) as resp:
+                    assert resp.status == 304
+                async with session.get(f'{base}/charts/routes.png') as resp:
+                    assert resp.content_type == 'image/png'
+                async with session.get(f'{base}/events') as resp:
+                    first = await resp.content.readline()
+                    await resp.content.readline()
+                    await store.append(complaint(2))
+                    second = await asyncio.wait_for(resp.content.readline(), 5)
+                # Клиент кетті: келесі өзгерісте жазу қатесі handler ішінде жабылуы керек
+                await store.append(complaint(3))
+                await asyncio.sleep(0.3)
+            return summary, first, second
+        finally:
+            await runner.cleanup()
+            await store.close()
+
+    with caplog.at_level(logging.ERROR):
+        summary, first, second = asyncio.run(run())
+    assert summary['total'] == 1 and summary['status'] == {'new': 1}
+    assert b'"total": 1' in first
+    assert b'"total": 2' in second
+    assert not [r for r in caplog.records if 'Error handling request' in r.getMessage()]
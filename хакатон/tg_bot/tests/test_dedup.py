@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from dedup import DedupIndex, find_duplicates
+
+
+def complaint(complaint_id, when, description='автобус аялдамада тоқтамай өтіп кетті', location='Абай аялдамасы'):
+    return {'complaint_id': complaint_id, 'route_number': '12', 'location': location,
+            'date_time': when.strftime('%Y-%m-%d %H:%M'), 'description': description}
+
+
+def test_find_does_not_index_until_add():
+    index = DedupIndex()
+    now = datetime.now()
+    first = complaint(1, now - timedelta(minutes=30))
+    assert index.find(first) is None
+    assert len(index) == 0
+    index.add(first)
+    assert index.find(complaint(2, now))[0] == 1
+
+
+def test_readding_same_id_expires_cleanly():
+    index = DedupIndex(retention=3600)
+    old = datetime.now() - timedelta(hours=3)
+    index.add(complaint(1, old))
+    index.add(complaint(1, old + timedelta(minutes=5), description='жүргізуші дөрекі сөйледі'))
+    index.add(complaint(2, datetime.now()))
+    assert len(index) == 1
+    assert not any(1 in ids for ids in index._buckets.values())
+
+
+def test_future_incident_does_not_flush_index():
+    index = DedupIndex(retention=3600)
+    now = datetime.now()
+    index.add(complaint(1, now - timedelta(minutes=10)))
+    index.add(complaint(2, now + timedelta(days=30), description='терезе сынған'))
+    assert len(index) == 2
+    assert index.find(complaint(3, now))[0] == 1
+
+
+def test_find_duplicates_chains_to_first():
+    start = datetime(2025, 1, 1, 10, 0)
+    records = [complaint(i, start + timedelta(minutes=10 * i)) for i in range(1, 4)]
+    records.append(complaint(4, start, description='кондиционер істемейді', location='Орталық'))
+    duplicates = find_duplicates(records)
+    assert {cid: original for cid, (original, _) in duplicates.items()} == {2: 1, 3: 1}
+
+
+def test_bot_date_format_is_parsed():
+    index = DedupIndex()
+    now = datetime.now()
+    first = {**complaint(1, now - timedelta(minutes=20)), 'timestamp_filed': now.isoformat()}
+    first['date_time'] = (now - timedelta(minutes=20)).strftime('%d.%m.%Y %H:%M')
+    second = {**complaint(2, now), 'timestamp_filed': (now + timedelta(days=1)).isoformat()}
+    second['date_time'] = now.strftime('%d.%m.%Y %H:%M')
+    index.add(first)
+    # timestamp_filed бір күн алшақ: сәйкестік тек оқиға уақыты талданса табылады
+    assert index.find(second) == (1, 1.0)
+
+
+def test_sync_adds_records_from_other_processes_once():
+    index = DedupIndex()
+    now = datetime.now()
+    shared = [complaint(1, now - timedelta(minutes=5)), complaint(2, now - timedelta(days=10))]
+    assert index.sync(shared) == 1
+    assert index.sync(shared) == 0
+    assert index.find(complaint(3, now))[0] == 1
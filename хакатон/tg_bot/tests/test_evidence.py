@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+
+import evidence
+from evidence import EvidenceArchive, link_evidence, media_batches, send_single
+
+
+def item(n, kind='photo', **extra):
+    return {'kind': kind, 'file_id': f'file{n}', 'file_unique_id': f'u{n}', 'file_size': 4, **extra}
+
+
+class MemoryStore:
+    def __init__(self):
+        self.records = {1: {'complaint_id': 1}}
+
+    async def get(self, complaint_id):
+        await asyncio.sleep(0)
+        record = self.records.get(complaint_id)
+        return dict(record) if record else None
+
+    async def update(self, complaint_id, **fields):
+        await asyncio.sleep(0)
+        self.records[complaint_id].update(fields)
+        return dict(self.records[complaint_id])
+
+
+class FakeBot:
+    def __init__(self, contents=None):
+        self.contents = contents or {}
+        self.calls = []
+
+    async def download(self, file_id, destination):
+        destination.write(self.contents[file_id])
+
+    def __getattr__(self, method):
+        async def call(**kwargs):
+            self.calls.append((method, kwargs))
+        return call
+
+
+def test_media_batches_never_sends_single_item_groups():
+    batches, singles = media_batches([item(1)])
+    assert batches == [] and [s['file_id'] for s in singles] == ['file1']
+
+    batches, singles = media_batches([item(i) for i in range(11)])
+    assert [len(batch) for batch in batches] == [9, 2] and singles == []
+
+    evidence_items = [item(1), item(2, 'video'), item(3, 'document'), item(4, 'voice'), item(5, 'audio')]
+    batches, singles = media_batches(evidence_items)
+    assert [[m.media for m in batch] for batch in batches] == [['file1', 'file2']]
+    assert sorted(s['kind'] for s in singles) == ['audio', 'document', 'voice']
+
+
+def test_send_single_uses_kind_specific_method():
+    bot = FakeBot()
+
+    async def run():
+        for kind in ('photo', 'video', 'voice', 'audio', 'document'):
+            await send_single(bot, 7, item(1, kind))
+
+    asyncio.run(run())
+    assert [method for method, _ in bot.calls] == ['send_photo', 'send_video', 'send_voice', 'send_audio',
+                                                   'send_document']
+    assert bot.calls[0][1] == {'chat_id': 7, 'photo': 'file1'}
+
+
+def test_link_evidence_serializes_album_and_releases_locks():
+    store = MemoryStore()
+
+    async def run():
+        return await asyncio.gather(*(link_evidence(store, 1, item(i % 4)) for i in range(8)))
+
+    results = asyncio.run(run())
+    assert sum(added for _, added in results) == 4
+    assert sorted(e['file_unique_id'] for e in store.records[1]['evidence']) == ['u0', 'u1', 'u2', 'u3']
+    assert evidence._locks == {}
+
+
+def test_archive_reuses_stored_path_for_same_content(tmp_path):
+    root = str(tmp_path / 'store')
+    bot = FakeBot({'file1': b'same', 'file2': b'same', 'file3': b'diff'})
+
+    async def run(archive, items):
+        await archive.start()
+        for i, it in enumerate(items):
+            archive.submit(i, it)
+        await archive.close()
+        return archive
+
+    archive = asyncio.run(run(EvidenceArchive(bot, root=root), [
+        item(1, mime_type='image/jpeg'), item(2, 'document', file_name='scan.pdf'),
+    ]))
+    first, second = archive.lookup('u1'), archive.lookup('u2')
+    assert first['path'] == second['path'] and first['path'].endswith('.jpg')
+    assert os.path.exists(first['path'])
+    assert archive.stats['archived'] == 1 and archive.stats['deduplicated'] == 1
+    assert archive.used_bytes == 4
+
+    # Қайта іске қосылғанда индекстен sha256 -> жол сәйкестігі қалпына келеді
+    reopened = asyncio.run(run(EvidenceArchive(bot, root=root, quota_bytes=8), [
+        item(4, 'document', file_name='copy.png', file_id='file1'), item(3),
+    ]))
+    assert reopened.lookup('u4')['path'] == first['path']
+    assert reopened.lookup('u3') is not None and reopened.used_bytes == 8
+    with open(os.path.join(root, 'index.jsonl'), encoding='utf-8') as f:
+        assert len([json.loads(line) for line in f]) == 4
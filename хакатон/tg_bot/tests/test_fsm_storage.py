@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from fsm_storage import BufferedStorage, SQLiteStorage, create_storage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+def test_write_through_is_the_default(tmp_path, monkeypatch):
+    monkeypatch.setenv("FSM_STORAGE", "sqlite")
+    monkeypatch.setenv("FSM_SQLITE_FILE", str(tmp_path / 'fsm.sqlite3'))
+    monkeypatch.delenv("FSM_FLUSH_INTERVAL", raising=False)
+
+    async def main():
+        first, second = create_storage(), create_storage()
+        assert isinstance(first, SQLiteStorage)
+        await first.set_state(KEY, 'ComplaintFSM:waiting_for_route')
+        await first.set_data(KEY, {'route_number': '12'})
+        # Басқа процесс (бөлек қосылым) күйді бірден көреді
+        assert await second.get_state(KEY) == 'ComplaintFSM:waiting_for_route'
+        assert await second.get_data(KEY) == {'route_number': '12'}
+        await first.close()
+        await second.close()
+
+    asyncio.run(main())
+
+
+def test_sqlite_upsert_drops_data_of_expired_row(tmp_path):
+    async def main():
+        storage = SQLiteStorage(str(tmp_path / 'fsm.sqlite3'), ttl=60)
+        await storage.set_data(KEY, {'route_number': '12'})
+        await storage._run(lambda: storage._connection().execute(
+            "UPDATE fsm SET updated_at = ?", (time.time() - 3600,)).connection.commit())
+        await storage.set_state(KEY, 'ComplaintFSM:waiting_for_route')
+        result = await storage.get_state(KEY), await storage.get_data(KEY)
+        await storage.close()
+        return result
+
+    assert asyncio.run(main()) == ('ComplaintFSM:waiting_for_route', {})
+
+
+class FlakyStorage(SQLiteStorage):
+    failures = 1
+
+    def _write(self, items):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("database is locked")
+        super()._write(items)
+
+
+def test_failed_flush_keeps_pending_writes(tmp_path):
+    async def main():
+        inner = FlakyStorage(str(tmp_path / 'fsm.sqlite3'))
+        buffered = BufferedStorage(inner, flush_interval=0.01)
+        await buffered.set_data(KEY, {'route_number': '12'})
+        with pytest.raises(OSError):
+            await buffered.flush()
+        await buffered.set_state(KEY, 'ComplaintFSM:waiting_for_date')
+        await buffered.flush()
+        result = await inner.get_state(KEY), await inner.get_data(KEY)
+        await buffered.close()
+        return result
+
+    assert asyncio.run(main()) == ('ComplaintFSM:waiting_for_date', {'route_number': '12'})
+
+
+def test_redis_backend_shares_state_between_processes():
+    fakeredis = pytest.importorskip('fakeredis')
+    from aiogram.fsm.storage.base import DefaultKeyBuilder
+    from aiogram.fsm.storage.redis import RedisStorage
+
+    async def main():
+        server = fakeredis.FakeServer()
+
+        def storage():
+            redis = fakeredis.FakeAsyncRedis(server=server)
+            return RedisStorage(redis, key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+                                state_ttl=60, data_ttl=60)
+
+        first, second = storage(), BufferedStorage(storage(), flush_interval=0.01)
+        await first.set_state(KEY, 'ComplaintFSM:waiting_for_aspect')
+        await first.set_data(KEY, {'route_number': '7'})
+        assert await second.get_state(KEY) == 'ComplaintFSM:waiting_for_aspect'
+        await second.set_data(KEY, {'route_number': '7', 'aspect': 'Тазалық'})
+        await second.flush()
+        assert await first.get_data(KEY) == {'route_number': '7', 'aspect': 'Тазалық'}
+        await first.close()
+        await second.close()
+
+    asyncio.run(main())
@@ -0,0 +1,19 @@
+import ids
+from ids import IdGenerator, claim_worker_id, id_timestamp
+
+
+def test_claimed_worker_ids_are_distinct(tmp_path):
+    first = claim_worker_id(str(tmp_path))
+    held = ids._lease
+    second = claim_worker_id(str(tmp_path))
+    assert first != second
+    held.close()
+
+
+def test_ids_increase_and_carry_worker(monkeypatch):
+    monkeypatch.setenv("WORKER_ID", "7")
+    generator = IdGenerator()
+    values = [generator.next_id() for _ in range(5000)]
+    assert values == sorted(set(values))
+    assert all((v >> ids.SEQUENCE_BITS) & ids.MAX_WORKER == 7 for v in values)
+    assert id_timestamp(values[0]) > 1735689600
@@ -0,0 +1,87 @@
+import asyncio
+import socket
+
+import aiohttp
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiohttp import web
+
+from metrics import (
+    Counter, FSM_TRANSITIONS, MetricsMiddleware, create_metrics_app, start_metrics_server,
+)
+
+
+class Form(StatesGroup):
+    waiting_for_route = State()
+
+
+class CountingStorage(MemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    async def get_state(self, key):
+        self.reads += 1
+        return await super().get_state(key)
+
+
+def test_label_values_are_escaped():
+    counter = Counter('c', 'help', ('step',))
+    counter.inc('a"b\\c\nd')
+    assert list(counter.render())[1] == 'c{step="a\\"b\\\\c\\nd"} 1'
+
+
+def test_middleware_tracks_state_without_reading_storage():
+    storage = CountingStorage()
+    key = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+    class Handler:
+        @staticmethod
+        async def callback():
+            pass
+
+    async def handler(event, data):
+        await data['state'].set_state(Form.waiting_for_route)
+
+    async def run():
+        data = {'state': FSMContext(storage, key), 'raw_state': None, 'handler': Handler()}
+        await MetricsMiddleware('message')(handler, object(), data)
+
+    before = FSM_TRANSITIONS.values.get(('start', 'waiting_for_route'), 0)
+    asyncio.run(run())
+    assert FSM_TRANSITIONS.values[('start', 'waiting_for_route')] == before + 1
+    assert storage.reads == 0
+
+
+def test_profile_rejects_bad_seconds():
+    async def run():
+        runner = web.AppRunner(create_metrics_app())
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                statuses = []
+                for query in ('abc', 'nan', '-1', '1000'):
+                    async with session.get(f'http://127.0.0.1:{port}/debug/profile?seconds={query}') as resp:
+                        statuses.append(resp.status)
+                async with session.get(f'http://127.0.0.1:{port}/metrics') as resp:
+                    statuses.append(resp.status)
+                return statuses
+        finally:
+            await runner.cleanup()
+
+    assert asyncio.run(run()) == [400, 400, 400, 400, 200]
+
+
+def test_busy_port_does_not_stop_startup():
+    async def run():
+        with socket.socket() as busy:
+            busy.bind(('127.0.0.1', 0))
+            busy.listen()
+            return await start_metrics_server('127.0.0.1', busy.getsockname()[1])
+
+    assert asyncio.run(run()) is None
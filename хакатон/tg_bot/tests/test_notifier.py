@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import SendMessage
+
+from loadtest import FAKE_TOKEN, FakeTelegramAPI
+from notifier import Notifier
+
+
+async def with_fake_api(flood_every, body):
+    api = await FakeTelegramAPI(flood_every=flood_every, retry_after=1).start()
+    bot = Bot(FAKE_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api.url)))
+    try:
+        return await body(api, bot)
+    finally:
+        await bot.session.close()
+        await api.stop()
+
+
+def test_retry_after_is_honoured_and_everything_arrives():
+    async def body(api, bot):
+        notifier = Notifier(bot, global_rate=50.0, chat_rate=20.0, chat_burst=5, concurrency=8)
+        # start() шақырылмайды: алғашқы жіберу диспетчерді өзі қосады
+        started = time.monotonic()
+        futures = [notifier.send_message(1000 + i % 4, f"Хабарлама {i}") for i in range(20)]
+        results = await asyncio.gather(*futures)
+        elapsed = time.monotonic() - started
+        await notifier.close()
+        return notifier.metrics(), results, elapsed, api.calls
+
+    metrics, results, elapsed, calls = asyncio.run(with_fake_api(15, body))
+    assert len(results) == 20
+    assert metrics['sent'] == 20 and metrics['failed'] == 0
+    assert metrics['rate_limited'] == calls['sendMessage'] - 20 > 0
+    # 429 келгенде жаһандық шек retry_after уақытына тоқтайды
+    assert elapsed >= 1.0
+
+
+def test_global_rate_is_respected():
+    async def body(api, bot):
+        notifier = Notifier(bot, global_rate=20.0, chat_rate=100.0, chat_burst=100)
+        await notifier.start()
+        started = time.monotonic()
+        await asyncio.gather(*(notifier.send_message(2000 + i, "x") for i in range(40)))
+        elapsed = time.monotonic() - started
+        await notifier.close()
+        return elapsed
+
+    # 20 burst + 20 хабарлама 20/с жылдамдықпен
+    assert asyncio.run(with_fake_api(0, body)) >= 0.9
+
+
+def test_permanent_error_fails_future_without_retry():
+    async def body(api, bot):
+        notifier = Notifier(bot)
+        calls = []
+
+        async def rejected():
+            calls.append(1)
+            raise TelegramBadRequest(SendMessage(chat_id=1, text='x'), 'Bad Request: chat not found')
+
+        future = notifier.submit(1, rejected)
+        with pytest.raises(TelegramBadRequest):
+            await future
+        await notifier.close()
+        return notifier.metrics(), calls
+
+    metrics, calls = asyncio.run(with_fake_api(0, body))
+    assert calls == [1]
+    assert metrics['failed'] == 1 and metrics['retries'] == 0
@@ -0,0 +1,35 @@
+import json
+
+from reader import Filter, iter_records
+
+ROWS = [
+    {'complaint_id': 1120, 'route_number': '5', 'status': 'new', 'severty': 'Шұғыл'},
+    {'complaint_id': 2, 'route_number': '12', 'status': 'new', 'severty': 'Төмен'},
+    {'complaint_id': 3, 'route_number': 12, 'status': 'new', 'severty': 'Шұғыл'},
+    {'complaint_id': 4, 'object': 'Маршрут 12', 'status': 'new', 'priority': 'Шұғыл'},
+    {'complaint_id': 5, 'route_number': '123', 'status': 'new', 'severty': 'Шұғыл'},
+]
+
+
+def write_log(path, ensure_ascii):
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in ROWS:
+            f.write(json.dumps(row, ensure_ascii=ensure_ascii) + '\n')
+
+
+def test_route_needle_is_anchored_on_its_key(tmp_path):
+    path = tmp_path / 'db.jsonl'
+    write_log(path, ensure_ascii=False)
+    where = Filter(route='12')
+    raw = {row['complaint_id']: json.dumps(row, ensure_ascii=False).encode() for row in ROWS}
+    assert where.quick_reject(raw[1120])
+    assert where.quick_reject(raw[5])
+    assert not where.quick_reject(raw[4])
+    assert [r['complaint_id'] for r in iter_records(str(path), where)] == [2, 3, 4]
+
+
+def test_escaped_rows_are_not_rejected(tmp_path):
+    path = tmp_path / 'db.jsonl'
+    write_log(path, ensure_ascii=True)
+    found = [r['complaint_id'] for r in iter_records(str(path), Filter(severity='Шұғыл'))]
+    assert found == [1120, 3, 4, 5]
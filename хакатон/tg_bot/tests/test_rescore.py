@@ -0,0 +1,55 @@
+import json
+
+from rescore import rescore_jsonl, rescore_sqlite
+from rules import score_record
+from sqlite_store import connect, migrate_jsonl, read_jsonl
+
+
+def write_log(path, records):
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def make_records(count):
+    # Әдейі ескірген бағалар: әр жазба қайта бағалануы тиіс
+    return [{'complaint_id': i, 'status': 'new', 'aspect': 'Басқа', 'description': f'шағым {i}',
+             'severty': 'ескі', 'recommendation_kz': 'ескі'} for i in range(count)]
+
+
+def test_rescore_jsonl_writes_events(tmp_path):
+    db = str(tmp_path / 'db.jsonl')
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    write_log(db, make_records(25))
+
+    assert rescore_jsonl(db, workers=2, chunk_size=10, checkpoint_path=checkpoint) == (25, 25)
+    records, _ = read_jsonl(db)
+    assert all(not score_record(record) for record in records)
+    with open(str(tmp_path / 'db.events.jsonl'), encoding='utf-8') as f:
+        events = [json.loads(line) for line in f]
+    assert len(events) == 25
+    assert events[0]['prev'] == {'severty': 'ескі', 'recommendation_kz': 'ескі'}
+
+    # Бақылау нүктесінен жалғасу: жаңа жазбалар ғана қаралады
+    write_log(db, make_records(30)[25:])
+    assert rescore_jsonl(db, workers=2, chunk_size=10, checkpoint_path=checkpoint) == (5, 5)
+
+
+def test_rescore_sqlite_patches_only_changed_fields(tmp_path):
+    db = str(tmp_path / 'db.jsonl')
+    sqlite_path = str(tmp_path / 'db.sqlite3')
+    write_log(db, make_records(12))
+    assert migrate_jsonl(db, sqlite_path)[0] == 12
+    conn = connect(sqlite_path)
+    # Қайта бағалау кезінде бот жазған статус басылмауы тиіс
+    with conn:
+        conn.execute("UPDATE complaints SET status = 'done', data = json_set(data, '$.status', 'done') "
+                     "WHERE complaint_id = 3")
+
+    result = rescore_sqlite(sqlite_path, workers=2, chunk_size=5, checkpoint_path=str(tmp_path / 'cp.json'))
+    assert result == (12, 12)
+    rows = {cid: json.loads(data) for cid, data in conn.execute("SELECT complaint_id, data FROM complaints")}
+    conn.close()
+    assert all(not score_record(record) for record in rows.values())
+    assert rows[3]['status'] == 'done'
+    assert rows[4]['status'] == 'new'
@@ -0,0 +1,78 @@
+import json
+import time
+
+import pandas as pd
+import pytest
+
+import schema
+from schema import load_frame, normalize_frame
+
+CURRENT = {'complaint_id': 2, 'user_id': 20, 'object': 'Маршрут 12', 'route_number': '12', 'aspect': 'Тазалық',
+           'severty': 'Шұғыл', 'status': 'new', 'timestamp_filed': '2025-01-02T10:00:00'}
+LEGACY = {'complaint_id': 1, 'user_id': 10, 'status': 'new', 'timestamp_filed': '2025-01-01T09:00:00',
+          'tuple': {'Объект': 'Маршрут 7', 'Аспект': 'Уақытылы келу', 'priority': 'Жоғары', 'description': 'кешікті'}}
+
+
+def write_log(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def check_mixed(df):
+    rows = df.set_index('complaint_id')
+    assert rows.loc[1, 'object'] == 'Маршрут 7'
+    assert rows.loc[1, 'route_number'] == '7'
+    assert rows.loc[1, 'aspect'] == 'Уақытылы келу'
+    assert rows.loc[1, 'severty'] == 'Жоғары'
+    assert rows.loc[1, 'description'] == 'кешікті'
+    assert rows.loc[2, 'route_number'] == '12'
+    assert rows.loc[2, 'severty'] == 'Шұғыл'
+    assert str(df['complaint_id'].dtype) == 'Int64'
+    assert isinstance(df['aspect'].dtype, pd.CategoricalDtype)
+    assert str(df['timestamp_filed'].dtype).startswith('datetime64')
+    assert not {'tuple', 'Объект', 'Аспект', 'priority'} & set(df.columns)
+
+
+@pytest.mark.parametrize('use_arrow', [True, False])
+def test_load_frame_maps_legacy_and_current_layouts(tmp_path, monkeypatch, use_arrow):
+    if use_arrow:
+        pytest.importorskip('pyarrow')
+    else:
+        monkeypatch.setattr(schema, 'pa', None)
+    path = tmp_path / 'db.jsonl'
+    write_log(path, [LEGACY, CURRENT])
+    write_log(tmp_path / 'db.events.jsonl', [{'complaint_id': 1, 'set': {'status': 'done'}}])
+    df = load_frame(str(path))
+    check_mixed(df)
+    assert df.set_index('complaint_id').loc[1, 'status'] == 'done'
+
+
+def test_normalize_frame_expands_dict_column():
+    df = normalize_frame(pd.DataFrame([LEGACY, CURRENT]))
+    check_mixed(schema.cast_frame(df))
+
+
+def best_of(func, repeat=3):
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def test_load_frame_is_order_of_magnitude_faster_than_row_wise_expansion(tmp_path):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'db.jsonl'
+    write_log(path, [{**(LEGACY if i % 2 else CURRENT), 'complaint_id': i} for i in range(3000)])
+
+    def old_path():
+        old = pd.read_json(path, lines=True)
+        pd.concat([old.drop(['tuple'], axis=1), old['tuple'].apply(pd.Series)], axis=1)
+
+    # Бір реттік өлшеу тұрақсыз: алдын ала қыздырып, үш өлшеудің ең жақсысын аламыз
+    old_seconds = best_of(old_path)
+    new_seconds = best_of(lambda: load_frame(str(path)))
+    assert old_seconds / new_seconds >= 10
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from snapshot import build_snapshot, read_table
+
+
+def write_log(path, records):
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def test_overlay_events_and_replaced_rows(tmp_path):
+    db = str(tmp_path / 'db.jsonl')
+    snapshot_dir = str(tmp_path / 'snap')
+    write_log(db, [{'complaint_id': i, 'status': 'new', 'severty': 'Төмен',
+                    'timestamp_filed': '2025-01-01T10:00:00'} for i in range(10)])
+    build_snapshot(db, snapshot_dir)
+    write_log(str(tmp_path / 'db.events.jsonl'), [{'complaint_id': 3, 'set': {'status': 'done', 'severty': 'Шұғыл'}}])
+    write_log(db, [{'complaint_id': 4, 'status': 'rewritten', 'timestamp_filed': '2025-01-01T10:00:00'},
+                   {'complaint_id': 10, 'status': 'new', 'timestamp_filed': '2025-01-02T10:00:00'}])
+
+    table = read_table(db, ['complaint_id', 'status', 'severty'], snapshot_dir=snapshot_dir)
+    rows = {row['complaint_id']: row for row in table.to_pylist()}
+    assert table.num_rows == 11
+    assert rows[3] == {'complaint_id': 3, 'status': 'done', 'severty': 'Шұғыл'}
+    assert rows[4]['status'] == 'rewritten'
+    assert rows[0]['status'] == 'new'
+    assert table.schema.field('status').type.value_type == 'string'
+
+
+def test_build_snapshot_leaves_live_files_untouched(tmp_path):
+    db = str(tmp_path / 'db.jsonl')
+    events = str(tmp_path / 'db.events.jsonl')
+    write_log(db, [{'complaint_id': i, 'status': 'new', 'timestamp_filed': '2025-01-01T10:00:00'} for i in range(3)])
+    write_log(events, [{'complaint_id': 1, 'set': {'status': 'done'}, 'prev': {'status': 'new'}}])
+    # Бот әлі жазып жатқан жол
+    with open(db, 'a', encoding='utf-8') as f:
+        f.write('{"complaint_id": 3, "sta')
+    before = {path: open(path, 'rb').read() for path in (db, events)}
+
+    manifest = build_snapshot(db, str(tmp_path / 'snap'))
+    assert manifest['rows'] == 3
+    assert {path: open(path, 'rb').read() for path in (db, events)} == before
+    table = read_table(db, ['complaint_id', 'status'], snapshot_dir=str(tmp_path / 'snap'))
+    assert {row['complaint_id']: row['status'] for row in table.to_pylist()}[1] == 'done'
@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+from storage import ComplaintStore, open_store, read_tail
+
+
+def complaint(complaint_id, status='new', **extra):
+    return {'complaint_id': complaint_id, 'status': status, 'route_number': '12',
+            'timestamp_filed': '2025-01-01T10:00:00', **extra}
+
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batched_appends_survive_reopen(tmp_path):
+    db = str(tmp_path / 'db.jsonl')
+
+    async def run():
+        store = open_store(db, backend='jsonl')
+        await store.start()
+        await asyncio.gather(*(store.append(complaint(i)) for i in range(50)))
+        await store.close()
+        reopened = ComplaintStore(db)
+        await reopened.start()
+        try:
+            return await reopened.count(), await reopened.get(49)
+        finally:
+            await reopened.close()
+
+    count, record = asyncio.run(run())
+    assert count == 50 and record['complaint_id'] == 49
+    assert len(read_lines(db)) == 50
+
+
+def test_torn_last_line_is_truncated_on_start(tmp_path):
+    db = str(tmp_path / 'db.jsonl')
+    with open(db, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(complaint(1)) + '\n' + '{"complaint_id": 2, "sta')
+
+    async def run():
+        store = ComplaintStore(db)
+        await store.start()
+        await store.append(complaint(3))
+        await store.close()
+        return await store.count()
+
+    assert asyncio.run(run()) == 2
+    assert [r['complaint_id'] for r in read_lines(db)] == [1, 3]
+
+
+def test_update_status_writes_event_overlay(tmp_path):
+    db = str(tmp_path / 'db.jsonl')
+
+    async def run():
+        store = ComplaintStore(db)
+        await store.start()
+        for i in range(3):
+            await store.append(complaint(i))
+        updated = await store.update_status(1, 'done')
+        missing = await store.update_status(99, 'done')
+        new = [r['complaint_id'] for r in await store.by_status('new')]
+        await store.close()
+        return updated, missing, new
+
+    updated, missing, new = asyncio.run(run())
+    assert updated['status'] == 'done' and missing is None
+    assert new == [2, 0]
+    assert [r['complaint_id'] for r in read_lines(db)] == [0, 1, 2]
+    event, = read_lines(str(tmp_path / 'db.events.jsonl'))
+    assert event['set'] == {'status': 'done'} and event['prev'] == {'status': 'new'}
+
+
+def test_compaction_at_compact_every(tmp_path):
+    db = str(tmp_path / 'db.jsonl')
+    events = str(tmp_path / 'db.events.jsonl')
+
+    async def run():
+        store = ComplaintStore(db, compact_every=3)
+        await store.start()
+        for i in range(3):
+            await store.append(complaint(i))
+        for i in range(3):
+            await store.update_status(i, 'done')
+        while store._compacting is not None:
+            await asyncio.sleep(0.01)
+        await store.close()
+
+    asyncio.run(run())
+    assert read_lines(events) == []
+    assert [r['status'] for r in read_lines(db)] == ['done'] * 3
+
+
+def test_duplicate_ids_block_compaction(tmp_path):
+    db = str(tmp_path / 'db.jsonl')
+    with open(db, 'w', encoding='utf-8') as f:
+        for record in (complaint(1, route_number='1'), complaint(1, route_number='2'), complaint(2)):
+            f.write(json.dumps(record) + '\n')
+    with open(str(tmp_path / 'db.events.jsonl'), 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'complaint_id': 2, 'set': {'status': 'done'}, 'prev': {'status': 'new'}}) + '\n')
+    before = open(db, 'rb').read()
+
+    async def run():
+        store = ComplaintStore(db, compact_every=1)
+        await store.start()
+        await store.compact()
+        try:
+            return store.duplicate_ids, await store.get(1)
+        finally:
+            await store.close()
+
+    duplicates, record = asyncio.run(run())
+    assert duplicates == {1}
+    assert record['route_number'] == '2'
+    assert open(db, 'rb').read() == before
+
+
+def test_second_instance_tails_other_writer(tmp_path):
+    db = str(tmp_path / 'db.jsonl')
+
+    async def run():
+        writer, reader = ComplaintStore(db), ComplaintStore(db)
+        await writer.start()
+        await reader.start()
+        try:
+            await writer.append(complaint(1))
+            version = reader.version
+            first = (await reader.get(1))['status']
+            await writer.update_status(1, 'done')
+            return first, (await reader.get(1))['status'], reader.version > version
+        finally:
+            await writer.close()
+            await reader.close()
+
+    first, second, bumped = asyncio.run(run())
+    assert (first, second) == ('new', 'done')
+    assert bumped
+
+
+def test_read_tail_skips_partial_line_and_detects_replacement(tmp_path):
+    path = str(tmp_path / 'log.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"a": 1}\n{"a": 2')
+    lines, pos, ino, reset = read_tail(path, 0, None)
+    assert lines == [{'a': 1}] and pos == 9 and not reset
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"b": 1}\n')
+    assert read_tail(path, 100, ino)[3]
@@ -0,0 +1,14 @@
+import pandas as pd
+
+from timeseries import with_incident_time
+
+
+def test_incident_time_accepts_formats_the_bot_asks_for():
+    df = pd.DataFrame({
+        'date_time': ['2025-11-06 10:30', '06.11.2025 9:05', 'Белгісіз N/A'],
+        'timestamp_filed': ['2025-11-07T01:00:00'] * 3,
+        'route_number': ['1', '2', '3'],
+    })
+    result = with_incident_time(df)['incident_time'].tolist()
+    assert result == [pd.Timestamp('2025-11-06 10:30'), pd.Timestamp('2025-11-06 09:05'),
+                      pd.Timestamp('2025-11-07 01:00')]
@@ -0,0 +1,183 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from webhook_queue import WebhookDispatcher
+
+
+async def start_stub(handler):
+    app = web.Application()
+    app.router.add_post('/hook', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/hook"
+
+
+def outbox_pending(path):
+    pending = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry['op'] == 'add':
+                pending[entry['id']] = entry['data']
+            else:
+                pending.pop(entry['id'], None)
+    return pending
+
+
+def test_delivers_batches_and_acks(tmp_path):
+    received = []
+
+    async def hook(request):
+        received.append(await request.json())
+        return web.Response(text='ok')
+
+    async def main():
+        runner, url = await start_stub(hook)
+        dispatcher = WebhookDispatcher(url, outbox_path=str(tmp_path / 'outbox.jsonl'), batch_size=5, workers=1)
+        await dispatcher.start()
+        for i in range(12):
+            await dispatcher.enqueue({'complaint_id': i})
+        await dispatcher.close()
+        await runner.cleanup()
+        return dispatcher
+
+    dispatcher = asyncio.run(main())
+    delivered = [item['complaint_id'] for batch in received for item in batch]
+    assert all(isinstance(cid, str) for cid in delivered)
+    assert sorted(map(int, delivered)) == list(range(12))
+    assert all(len(batch) <= 5 for batch in received)
+    assert dispatcher.stats['delivered'] == 12
+    assert outbox_pending(tmp_path / 'outbox.jsonl') == {}
+
+
+def test_failed_items_are_retried_from_outbox_by_timer(tmp_path):
+    calls = []
+
+    async def hook(request):
+        calls.append(await request.json())
+        # Алғашқы екі POST сәтсіз: оқиға outbox-та қалып, таймер арқылы қайта жіберілуі керек
+        if len(calls) <= 2:
+            return web.Response(status=400, text='bad')
+        return web.Response(text='ok')
+
+    async def main():
+        runner, url = await start_stub(hook)
+        dispatcher = WebhookDispatcher(url, outbox_path=str(tmp_path / 'outbox.jsonl'), workers=1,
+                                       retry_interval=0.05)
+        await dispatcher.start()
+        await dispatcher.enqueue({'complaint_id': 1})
+        await dispatcher.enqueue({'complaint_id': 2})
+        for _ in range(100):
+            if dispatcher.stats['delivered'] == 2:
+                break
+            await asyncio.sleep(0.02)
+        # Келесі таймер айналымы outbox-ты ықшамдайды
+        await asyncio.sleep(0.2)
+        await dispatcher.close()
+        await runner.cleanup()
+        return dispatcher
+
+    dispatcher = asyncio.run(main())
+    assert dispatcher.stats['delivered'] == 2
+    assert dispatcher.stats['failed'] == 2
+    lines = (tmp_path / 'outbox.jsonl').read_text(encoding='utf-8').splitlines()
+    assert outbox_pending(tmp_path / 'outbox.jsonl') == {}
+    # Жұмыс кезінде ықшамдалған: жеткізілген оқиғалардың add/ack жұптары тазаланды
+    assert lines == []
+
+
+def test_worker_survives_unexpected_errors(tmp_path):
+    async def hook(request):
+        return web.Response(text='ok')
+
+    async def main():
+        runner, url = await start_stub(hook)
+        dispatcher = WebhookDispatcher(url, outbox_path=str(tmp_path / 'outbox.jsonl'), workers=1,
+                                       retry_interval=0.05)
+        await dispatcher.start()
+        real_write = dispatcher._outbox_write
+        failures = []
+
+        async def flaky_write(entries):
+            if entries[0]['op'] == 'ack' and not failures:
+                failures.append(entries)
+                raise OSError("disk full")
+            await real_write(entries)
+
+        dispatcher._outbox_write = flaky_write
+        await dispatcher.enqueue({'complaint_id': 1})
+        await dispatcher.enqueue({'complaint_id': 2})
+        for _ in range(100):
+            if not outbox_pending(tmp_path / 'outbox.jsonl'):
+                break
+            await asyncio.sleep(0.02)
+        await dispatcher.close()
+        await runner.cleanup()
+        return dispatcher, failures
+
+    dispatcher, failures = asyncio.run(main())
+    assert failures
+    assert outbox_pending(tmp_path / 'outbox.jsonl') == {}
+    assert dispatcher.stats['delivered'] >= 2
+
+
+def test_rejected_event_moves_to_dead_letter(tmp_path, caplog):
+    posts = []
+
+    async def hook(request):
+        batch = await request.json()
+        posts.append(batch)
+        if any(item['complaint_id'] == '13' for item in batch):
+            return web.Response(status=422, text='bad complaint')
+        return web.Response(text='ok')
+
+    async def main():
+        runner, url = await start_stub(hook)
+        dispatcher = WebhookDispatcher(url, outbox_path=str(tmp_path / 'outbox.jsonl'), batch_size=3, workers=1,
+                                       retry_interval=0.05, max_rejections=2)
+        await dispatcher.start()
+        for i in (11, 12, 13, 14):
+            await dispatcher.enqueue({'complaint_id': i})
+        for _ in range(100):
+            if dispatcher.stats['dead_lettered']:
+                break
+            await asyncio.sleep(0.02)
+        await dispatcher.close()
+        await runner.cleanup()
+        return dispatcher
+
+    with caplog.at_level('ERROR'):
+        dispatcher = asyncio.run(main())
+    assert dispatcher.stats['delivered'] == 3 and dispatcher.stats['dead_lettered'] == 1
+    assert outbox_pending(tmp_path / 'outbox.jsonl') == {}
+    dead, = [json.loads(line) for line in (tmp_path / 'outbox.dead.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert dead['data'] == {'complaint_id': 13} and dead['attempts'] == 2 and dead['reason'].startswith('422')
+    assert any('outbox.dead.jsonl' in r.getMessage() for r in caplog.records)
+    # Пакеттегі басқа оқиғалар жарамсыз оқиғамен бірге бөгелмеді
+    accepted = {item['complaint_id'] for batch in posts if all(i['complaint_id'] != '13' for i in batch)
+                for item in batch}
+    assert accepted == {'11', '12', '14'}
+
+
+def test_unserializable_event_is_dead_lettered(tmp_path):
+    async def hook(request):
+        return web.Response(text='ok')
+
+    async def main():
+        runner, url = await start_stub(hook)
+        dispatcher = WebhookDispatcher(url, outbox_path=str(tmp_path / 'outbox.jsonl'), workers=1,
+                                       retry_interval=0.05, max_rejections=1)
+        await dispatcher.start()
+        await dispatcher.enqueue({'complaint_id': 1, 'score': float('nan')})
+        await dispatcher.close()
+        await runner.cleanup()
+        return dispatcher
+
+    dispatcher = asyncio.run(main())
+    assert dispatcher.stats['dead_lettered'] == 1
+    assert outbox_pending(tmp_path / 'outbox.jsonl') == {}
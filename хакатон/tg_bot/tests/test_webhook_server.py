@@ -0,0 +1,83 @@
+import asyncio
+import queue
+
+import aiohttp
+from aiohttp import web
+from aiogram import Bot
+
+from webhook_server import SECRET_HEADER, UpdateWorkerPool, consume, create_router_app, raw_chat_key
+
+
+def message(update_id, chat_id, text):
+    return {'update_id': update_id, 'message': {'message_id': update_id, 'date': 0, 'text': text,
+                                                  'chat': {'id': chat_id, 'type': 'private'}}}
+
+
+def callback(update_id, chat_id):
+    return {'update_id': update_id, 'callback_query': {
+        'id': str(update_id), 'chat_instance': '1', 'data': 'finish_complaint',
+        'from': {'id': chat_id, 'is_bot': False, 'first_name': 'u'},
+        'message': {'message_id': 1, 'date': 0, 'chat': {'id': chat_id, 'type': 'private'}}}}
+
+
+def test_router_keeps_each_chat_on_one_process():
+    queues = [queue.Queue(maxsize=3) for _ in range(4)]
+
+    async def main():
+        runner = web.AppRunner(create_router_app(queues, '/telegram', 'secret'))
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/telegram"
+        statuses = []
+        async with aiohttp.ClientSession(headers={SECRET_HEADER: 'secret'}) as session:
+            for update in [message(1, 42, 'a'), callback(2, 42), message(3, 42, 'b'), message(4, 42, 'c')]:
+                async with session.post(url, json=update) as response:
+                    statuses.append(response.status)
+            async with session.post(url, json=message(5, 42, 'd'), headers={SECRET_HEADER: 'wrong'}) as response:
+                statuses.append(response.status)
+        await runner.cleanup()
+        return statuses
+
+    statuses = asyncio.run(main())
+    # Кезек толса 503 (Telegram кейін қайталайды), құпия қате болса 401
+    assert statuses == [200, 200, 200, 503, 401]
+    target = queues[hash(42) % 4]
+    assert [target.get_nowait()['update_id'] for _ in range(3)] == [1, 2, 3]
+    assert all(q.empty() for q in queues)
+
+
+def test_raw_chat_key_matches_chat_or_sender():
+    assert raw_chat_key(message(1, 7, 'x')) == 7
+    assert raw_chat_key(callback(2, 9)) == 9
+    assert raw_chat_key({'update_id': 3, 'inline_query': {'from': {'id': 5}}}) == 5
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.seen = []
+
+    async def feed_update(self, bot, update):
+        await asyncio.sleep(0.001 * (update.update_id % 3))
+        self.seen.append((update.message.chat.id, update.message.text))
+
+
+def test_consume_preserves_per_chat_order():
+    updates = queue.Queue()
+    for i in range(30):
+        updates.put(message(i, i % 3, str(i)))
+    updates.put(None)
+
+    async def main():
+        dp = RecordingDispatcher()
+        pool = UpdateWorkerPool(dp, Bot('1:test'), workers=4)
+        pool.start()
+        await consume(updates, pool, pool.bot)
+        await pool.stop()
+        await pool.bot.session.close()
+        return dp.seen
+
+    seen = asyncio.run(main())
+    for chat in range(3):
+        texts = [int(text) for chat_id, text in seen if chat_id == chat]
+        assert texts == sorted(texts) and len(texts) == 10
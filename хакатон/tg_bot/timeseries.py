@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from schema import load_frame
+
+DB_FILE = 'complaints_db.jsonl'
+COLUMNS = ['complaint_id', 'route_number', 'date_time', 'timestamp_filed']
+
+
+def load_events(path=DB_FILE):
+    """Маршрут және оқиға уақыты бойынша кесте (snapshot болса, бағаналы оқу)."""
+    try:
+        from snapshot import read_frame, snapshot_exists
+        df = read_frame(path, COLUMNS) if snapshot_exists(path) else load_frame(path, COLUMNS)
+    except RuntimeError:
+        df = load_frame(path, COLUMNS)
+    return with_incident_time(df)
+
+
+# Бот «Бүгін/Кеше» үшін ISO күнін жазады, қолмен енгізуде 06.11.2025 үлгісін сұрайды
+INCIDENT_FORMATS = ('%Y-%m-%d %H:%M', '%d.%m.%Y %H:%M')
+
+
+def with_incident_time(df):
+    """`date_time` (INCIDENT_FORMATS) оқиға уақытына; талданбаса timestamp_filed алынады."""
+    text = df['date_time'].astype('string').str.strip()
+    incident = pd.to_datetime(text, format=INCIDENT_FORMATS[0], errors='coerce')
+    for fmt in INCIDENT_FORMATS[1:]:
+        incident = incident.fillna(pd.to_datetime(text, format=fmt, errors='coerce'))
+    filed = pd.to_datetime(df['timestamp_filed'], errors='coerce')
+    df = df.assign(incident_time=incident.fillna(filed).astype('datetime64[ns]'))
+    df = df[df['incident_time'].notna() & df['route_number'].notna()]
+    df['route_number'] = df['route_number'].astype('string').astype('category')
+    return df
+
+
+def route_hour_matrix(df):
+    """Маршрут × тәулік сағаты бойынша шағымдар саны (бір bincount өтуімен)."""
+    routes = df['route_number'].cat.remove_unused_categories()
+    route_codes = routes.cat.codes.to_numpy().astype(np.int64)
+    hours = df['incident_time'].dt.hour.to_numpy().astype(np.int64)
+    n_routes = len(routes.cat.categories)
+    counts = np.bincount(route_codes * 24 + hours, minlength=n_routes * 24).reshape(n_routes, 24)
+    return pd.DataFrame(counts, index=routes.cat.categories, columns=range(24))
+
+
+def route_rates(df, freq='h', window=24 * 7):
+    """Әр маршрут үшін `freq` аралықтағы шағымдар және жылжымалы орташа жиілік."""
+    counts = (
+        df.groupby([pd.Grouper(key='incident_time', freq=freq), 'route_number'], observed=True)
+        .size()
+        .unstack('route_number', fill_value=0)
+        .asfreq(freq, fill_value=0)
+    )
+    return counts, counts.rolling(window, min_periods=1).mean()
+
+
+def detect_anomalies(counts, span=24 * 7, threshold=4.0, min_count=3, min_periods=24):
+    """EWMA/z-score бойынша секірістер: өткен EWMA-дан threshold сигмадан жоғары мәндер.
+
+    counts — route_rates() қайтаратын уақыт × маршрут кестесі. Барлық маршрут
+    бір векторлы өтуде есептеледі; әр нүкте тек өзінен бұрынғы деректермен
+    салыстырылады (shift). Сирек маршруттарда шу болмауы үшін std кемінде 1.
+    """
+    ewm = counts.ewm(span=span, adjust=False, min_periods=min_periods)
+    mean = ewm.mean().shift(1)
+    std = ewm.std().shift(1).clip(lower=1.0)
+    z = (counts - mean) / std
+    flagged = (z > threshold) & (counts >= min_count)
+    result = pd.DataFrame({
+        'z_score': z.stack(),
+        'count': counts.stack(),
+        'expected': mean.stack(),
+    })[flagged.stack()]
+    result = result.rename_axis(['time', 'route_number']).reset_index()
+    return result.sort_values('z_score', ascending=False, ignore_index=True)
+
+
+def render_heatmap(matrix, path='dashboard_route_hour.png', top=20):
+    import matplotlib.pyplot as plt
+
+    matrix = matrix.loc[matrix.sum(axis=1).nlargest(top).index]
+    plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
+    fig, ax = plt.subplots(figsize=(12, max(4, len(matrix) * 0.4)))
+    image = ax.imshow(matrix.to_numpy(), aspect='auto', cmap='YlOrRd')
+    ax.set_xticks(range(24))
+    ax.set_yticks(range(len(matrix)))
+    ax.set_yticklabels([f"Маршрут {r}" for r in matrix.index])
+    ax.set_xlabel('Тәулік сағаты')
+    ax.set_title('Маршрут × сағат бойынша шағымдар')
+    fig.colorbar(image, ax=ax, label='Шағымдар саны')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    print(f"График '{path}' сақталды.")
+
+
+def create_timeseries_visuals(path=DB_FILE):
+    df = load_events(path)
+    if df.empty:
+        print(f"'{path}' файлында уақыт бойынша талдауға деректер жоқ.")
+        return None
+    render_heatmap(route_hour_matrix(df))
+    counts, _ = route_rates(df)
+    anomalies = detect_anomalies(counts)
+    if anomalies.empty:
+        print("Аномалиялық секірістер табылмады.")
+    else:
+        print("⚠️ Аномалиялық секірістер (маршрут, уақыт, саны, күтілген):")
+        for row in anomalies.head(20).itertuples():
+            print(f"  Маршрут {row.route_number}: {row.time:%Y-%m-%d %H:00} — {row.count} (≈{row.expected:.1f}, z={row.z_score:.1f})")
+    return anomalies
+
+
+if __name__ == "__main__":
+    create_timeseries_visuals()
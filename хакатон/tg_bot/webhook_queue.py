@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+
+import aiohttp
+
+# Snowflake ID-лері 2^53-тен үлкен: JavaScript тұтынушылары (Make.com) дәлдікті жоғалтпауы үшін жолмен
+ID_FIELDS = ('complaint_id', 'duplicate_of')
+
+
+def to_payload(item):
+    return {k: str(v) if k in ID_FIELDS and v is not None else v for k, v in item.items()}
+
+
+class WebhookRejected(Exception):
+    """Қабылдаушы оқиғаны қайталағанда да қабылдамайды (4xx немесе JSON-ға айналмайды)."""
+
+
+class WebhookDispatcher:
+    """Шағымдарды webhook-қа фондық режимде жеткізу.
+
+    Бір ортақ aiohttp сессиясы (connection pool), шектелген жадтағы кезек
+    және дискідегі outbox журналы. Жіберілмеген оқиғалар outbox-та қалады
+    және әр `retry_interval` секунд сайын (сондай-ақ келесі іске қосылуда)
+    қайта жіберіледі; сол кезде outbox ықшамдалады, сондықтан ол тек
+    жеткізілмеген оқиғалардан тұрады. Қате болса экспоненциалды кідіріспен
+    (jitter-мен) қайталанады. batch_size > 1 болса бір POST-та бірнеше
+    шағым тізім ретінде жіберіледі.
+
+    Қабылдаушы біржола қабылдамаған (4xx, 408/429-дан басқа) немесе
+    JSON-ға айналмайтын оқиға `max_rejections` реттен кейін outbox-тан
+    `<outbox>.dead.jsonl` файлына көшіріледі, кезекті бөгемеуі үшін.
+    Қабылданбаған пакеттің оқиғалары жеке-жеке қайта жіберіледі.
+    """
+
+    def __init__(self, url, outbox_path='webhook_outbox.jsonl', queue_size=1000, batch_size=1,
+                 max_retries=8, backoff_base=0.5, backoff_cap=60.0, timeout=10.0, workers=2,
+                 retry_interval=30.0, max_rejections=5):
+        self.url = url
+        self.outbox_path = outbox_path
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.workers = workers
+        self.retry_interval = retry_interval
+        self.max_rejections = max_rejections
+        self.stats = {'enqueued': 0, 'delivered': 0, 'failed': 0, 'retries': 0, 'dropped_to_outbox': 0,
+                      'dead_lettered': 0, 'latency_sum': 0.0, 'latency_max': 0.0, 'posts': 0}
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._session = None
+        self._tasks = []
+        self._next_id = 0
+        self._in_memory = set()
+        self._rejections = {}
+        self._outbox_lock = None
+
+    async def start(self):
+        if self._session is not None or not self.url:
+            return
+        self._outbox_lock = asyncio.Lock()
+        connector = aiohttp.TCPConnector(limit=self.workers * 2, ttl_dns_cache=300, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout))
+        pending = await asyncio.to_thread(self._load_outbox)
+        for item_id, data in pending:
+            self._offer(item_id, data)
+        if pending:
+            logging.info(f"Outbox-тан {len(pending)} жіберілмеген webhook оқиғасы қайта кезекке қойылды.")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._retry_loop()))
+
+    async def close(self, drain_timeout=5.0):
+        if self._session is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Webhook кезегі толық босамады ({self._queue.qsize()}), қалғаны outbox-та сақталды.")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._session.close()
+        self._session = None
+
+    async def enqueue(self, data: dict):
+        if not self.url:
+            logging.warning("WEBHOOK_URL .env файлында орнатылмаған. Webhook жіберілмеді.")
+            return
+        if self._session is None:
+            await self.start()
+        self._next_id += 1
+        item_id = f"{time.time_ns()}-{os.getpid()}-{self._next_id}"
+        await self._outbox_write([{'op': 'add', 'id': item_id, 'data': data}])
+        self.stats['enqueued'] += 1
+        self._offer(item_id, data)
+
+    def metrics(self):
+        posts = self.stats['posts'] or 1
+        return {
+            'queue_depth': self._queue.qsize(),
+            'in_flight': len(self._in_memory),
+            'delivered': self.stats['delivered'],
+            'failed': self.stats['failed'],
+            'retries': self.stats['retries'],
+            'dropped_to_outbox': self.stats['dropped_to_outbox'],
+            'dead_lettered': self.stats['dead_lettered'],
+            'latency_avg': self.stats['latency_sum'] / posts,
+            'latency_max': self.stats['latency_max'],
+        }
+
+    def _offer(self, item_id, data):
+        try:
+            self._queue.put_nowait((item_id, data))
+            self._in_memory.add(item_id)
+        except asyncio.QueueFull:
+            # Оқиға outbox-та бар, кезек босағанда қайта оқылады
+            self.stats['dropped_to_outbox'] += 1
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._send(batch)
+            except Exception as e:
+                # Worker тоқтамауы керек: оқиға outbox-та қалады, таймер қайта жібереді
+                self.stats['failed'] += len(batch)
+                logging.error(f"Webhook worker қатесі: {e!r}")
+            finally:
+                for item_id, _ in batch:
+                    self._in_memory.discard(item_id)
+                    self._queue.task_done()
+            if self._queue.empty() and self.stats['dropped_to_outbox']:
+                try:
+                    await self._refill()
+                except Exception as e:
+                    logging.error(f"Outbox-ты қайта оқу қатесі: {e!r}")
+
+    async def _send(self, batch):
+        try:
+            delivered = await self._deliver([data for _, data in batch])
+        except WebhookRejected as e:
+            if len(batch) > 1:
+                # Пакетті бір ғана жарамсыз оқиға бұзуы мүмкін: қалғандары жеке жеткізіледі
+                for entry in batch:
+                    await self._send([entry])
+            else:
+                await self._reject(*batch[0], str(e))
+            return
+        if delivered:
+            await self._outbox_write([{'op': 'ack', 'id': item_id} for item_id, _ in batch])
+            self.stats['delivered'] += len(batch)
+            for item_id, _ in batch:
+                self._rejections.pop(item_id, None)
+        else:
+            self.stats['failed'] += len(batch)
+
+    async def _reject(self, item_id, data, reason):
+        self.stats['failed'] += 1
+        count = self._rejections.get(item_id, 0) + 1
+        if count < self.max_rejections:
+            self._rejections[item_id] = count
+            return
+        dead_path = os.path.splitext(self.outbox_path)[0] + '.dead.jsonl'
+        entry = {'id': item_id, 'data': data, 'reason': reason, 'attempts': count, 'ts': time.time()}
+        line = json.dumps(entry, ensure_ascii=False, default=repr) + '\n'
+        async with self._outbox_lock:
+            await asyncio.to_thread(self._append_outbox, line, dead_path)
+        await self._outbox_write([{'op': 'ack', 'id': item_id}])
+        self._rejections.pop(item_id, None)
+        self.stats['dead_lettered'] += 1
+        logging.error(f"Webhook оқиғасы {count} рет қабылданбады (ID: {data.get('complaint_id')}), "
+                      f"{dead_path} файлына көшірілді: {reason}")
+
+    async def _retry_loop(self):
+        while True:
+            await asyncio.sleep(self.retry_interval)
+            try:
+                await self._refill()
+            except Exception as e:
+                logging.error(f"Outbox-ты қайта оқу қатесі: {e!r}")
+
+    async def _deliver(self, items):
+        items = [to_payload(item) for item in items]
+        payload = items[0] if self.batch_size == 1 else items
+        ids = ', '.join(str(item.get('complaint_id')) for item in items)
+        try:
+            body = json.dumps(payload, ensure_ascii=False, allow_nan=False)
+        except (TypeError, ValueError) as e:
+            raise WebhookRejected(f"JSON қатесі: {e}") from e
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+                delay = min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1))
+                await asyncio.sleep(random.uniform(delay / 2, delay))
+            started = time.perf_counter()
+            try:
+                async with self._session.post(self.url, data=body.encode(),
+                                              headers={'Content-Type': 'application/json'}) as response:
+                    body = await response.text()
+                    if 200 <= response.status < 300:
+                        latency = time.perf_counter() - started
+                        self.stats['posts'] += 1
+                        self.stats['latency_sum'] += latency
+                        self.stats['latency_max'] = max(self.stats['latency_max'], latency)
+                        logging.info(f"Webhook-қа сәтті жіберілді (ID: {ids})")
+                        return True
+                    logging.warning(f"Webhook қатесі: {response.status} - {body}")
+                    if 400 <= response.status < 500 and response.status not in (408, 429):
+                        raise WebhookRejected(f"{response.status} - {body[:200]}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.error(f"Webhook-қа қосылу қатесі: {e}")
+        logging.error(f"Webhook жеткізілмеді (ID: {ids}), оқиға outbox-та қалды.")
+        return False
+
+    async def _refill(self):
+        # Ықшамдау кезінде жаңа add/ack жолдары жоғалмауы үшін outbox құлпымен
+        async with self._outbox_lock:
+            pending = await asyncio.to_thread(self._load_outbox)
+        self.stats['dropped_to_outbox'] = 0
+        for item_id, data in pending:
+            if item_id not in self._in_memory:
+                self._offer(item_id, data)
+
+    async def _outbox_write(self, entries):
+        lines = ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in entries)
+        async with self._outbox_lock:
+            await asyncio.to_thread(self._append_outbox, lines)
+
+    def _append_outbox(self, lines, path=None):
+        with open(path or self.outbox_path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _load_outbox(self):
+        pending = {}
+        try:
+            with open(self.outbox_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('op') == 'add':
+                        pending[entry['id']] = entry['data']
+                    elif entry.get('op') == 'ack':
+                        pending.pop(entry['id'], None)
+        except FileNotFoundError:
+            return []
+        tmp = self.outbox_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for item_id, data in pending.items():
+                f.write(json.dumps({'op': 'add', 'id': item_id, 'data': data}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.outbox_path)
+        return list(pending.items())
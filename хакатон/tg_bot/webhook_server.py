@@ -0,0 +1,195 @@
+import asyncio
+import hmac
+import logging
+import multiprocessing
+import os
+import queue
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def _chat_key(update: Update):
+    event = update.event
+    chat = getattr(event, 'chat', None)
+    if chat is None and getattr(event, 'message', None) is not None:
+        chat = event.message.chat
+    if chat is not None:
+        return chat.id
+    user = getattr(event, 'from_user', None)
+    return user.id if user is not None else update.update_id
+
+
+def raw_chat_key(data: dict):
+    """_chat_key сияқты, бірақ талданбаған update JSON-ы бойынша (бөлу процесі үшін)."""
+    for name, event in data.items():
+        if not isinstance(event, dict):
+            continue
+        chat = event.get('chat') or (event.get('message') or {}).get('chat')
+        if chat is not None:
+            return chat.get('id')
+        user = event.get('from') or event.get('user')
+        if user is not None:
+            return user.get('id')
+    return data.get('update_id')
+
+
+class UpdateWorkerPool:
+    """Webhook арқылы келген update-терді шектелген воркерлер пулында өңдеу.
+
+    Бір чаттың update-тері әрқашан бір воркердің кезегіне түседі, сондықтан
+    олар келген ретімен өңделеді; әр түрлі чаттар қатар өңделеді.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, workers=16, queue_size=256):
+        self.dp = dp
+        self.bot = bot
+        self.queues = [asyncio.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.processed = 0
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker(q)) for q in self.queues]
+
+    async def stop(self):
+        for q in self.queues:
+            await q.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, update: Update):
+        """Кезек толы болса False — Telegram update-ті кейін қайта жібереді."""
+        queue = self.queues[hash(_chat_key(update)) % len(self.queues)]
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def put(self, update: Update):
+        """submit сияқты, бірақ кезек босағанша күтеді (процестер арасындағы кезектен оқу үшін)."""
+        await self.queues[hash(_chat_key(update)) % len(self.queues)].put(update)
+
+    def depth(self):
+        return sum(q.qsize() for q in self.queues)
+
+    async def _worker(self, queue):
+        while True:
+            update = await queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logging.error(f"Update өңдеу қатесі (update_id={update.update_id}): {e}")
+            finally:
+                self.processed += 1
+                queue.task_done()
+
+
+def create_app(dp: Dispatcher, bot: Bot, path='/webhook', secret=None, workers=16, queue_size=256):
+    pool = UpdateWorkerPool(dp, bot, workers, queue_size)
+
+    async def handle(request: web.Request):
+        if secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ''), secret):
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except ValueError:
+            return web.Response(status=400)
+        if not pool.submit(update):
+            return web.Response(status=503)
+        return web.Response()
+
+    async def on_startup(app):
+        pool.start()
+
+    async def on_shutdown(app):
+        await pool.stop()
+
+    app = web.Application()
+    app['pool'] = pool
+    app.router.add_post(path, handle)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+
+def create_router_app(queues, path='/webhook', secret=None):
+    """Бірнеше процесс режимі: update чат бойынша бір процестің кезегіне жіберіледі.
+
+    Бір чаттың update-тері әрқашан бір процеске түседі, сондықтан олардың
+    реті процестер арасында да сақталады.
+    """
+    async def handle(request: web.Request):
+        if secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ''), secret):
+            return web.Response(status=401)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        if not isinstance(data, dict):
+            return web.Response(status=400)
+        try:
+            queues[hash(raw_chat_key(data)) % len(queues)].put_nowait(data)
+        except queue.Full:
+            return web.Response(status=503)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(path, handle)
+    return app
+
+
+async def consume(updates, pool: UpdateWorkerPool, bot: Bot):
+    """Бөлу процесінің кезегінен update-терді оқып, пулға беру (None — тоқтау)."""
+    while True:
+        data = await asyncio.to_thread(updates.get)
+        if data is None:
+            return
+        try:
+            update = Update.model_validate(data, context={"bot": bot})
+        except ValueError as e:
+            logging.error(f"Update талданбады: {e}")
+            continue
+        await pool.put(update)
+
+
+async def serve(app, host='0.0.0.0', port=8080):
+    """Қолданбаны іске қосып, тапсырма тоқтатылғанша күту."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logging.info(f"Webhook сервері {host}:{port} тыңдап тұр (PID {os.getpid()}).")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def run_processes(target, processes, host='0.0.0.0', port=8080, path='/webhook', secret=None, queue_size=1024):
+    """target(i, updates)-ті `processes` бөлек процесте іске қосу.
+
+    Webhook-ты тек осы (ата-ана) процесс тыңдайды және әр update-ті чат
+    бойынша бір бала процестің `updates` кезегіне жібереді.
+    """
+    queues = [multiprocessing.Queue(maxsize=queue_size) for _ in range(processes)]
+    children = [multiprocessing.Process(target=target, args=(i, q), daemon=False) for i, q in enumerate(queues)]
+    for child in children:
+        child.start()
+    try:
+        asyncio.run(serve(create_router_app(queues, path, secret), host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for q in queues:
+            q.put(None)
+        for child in children:
+            child.join(timeout=30)
+            if child.is_alive():
+                child.terminate()
+                child.join()